@@ -0,0 +1,54 @@
+"""JSON API в сравнении с HTML-страницами тех же лент.
+
+    python benchmarks/bench_api.py
+
+Для каждой пары замеряется полный цикл запроса через тестовый клиент:
+HTML-страница ленты (10 постов) и страница API того же размера,
+а также крупная страница API, которая отдается потоком.
+"""
+from common import measure, report, seed, setup_database
+
+from django.test import Client
+
+
+def fetch(client, url):
+    response = client.get(url)
+    if response.streaming:
+        return b''.join(response.streaming_content)
+    return response.content
+
+
+def main():
+    setup_database()
+    seed(posts=300)
+    client = Client()
+    post_id = client.get('/api/posts/?limit=1').json()['results'][0]['id']
+    pairs = (
+        ('Лента', '/', '/api/posts/?limit=10'),
+        (
+            'Лента категории',
+            '/category/category-0/',
+            '/api/categories/category-0/posts/?limit=10',
+        ),
+        ('Пост', f'/posts/{post_id}/', f'/api/posts/{post_id}/'),
+    )
+    for title, html_url, api_url in pairs:
+        report(f'{title}: {html_url} / {api_url}', {
+            'HTML': measure(lambda: fetch(client, html_url)),
+            'JSON API': measure(lambda: fetch(client, api_url)),
+        })
+    report('Крупная страница API (300 постов)', {
+        'HTML, 30 страниц по 10': measure(
+            lambda: [
+                fetch(client, f'/?page={page}') for page in range(1, 31)
+            ],
+            repeat=10,
+        ),
+        'JSON API, поток': measure(
+            lambda: fetch(client, '/api/posts/?limit=300'), repeat=10
+        ),
+    })
+
+
+if __name__ == '__main__':
+    main()
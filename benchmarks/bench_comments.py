@@ -0,0 +1,94 @@
+"""Запись комментариев несколькими одновременными авторами.
+
+    python benchmarks/bench_comments.py
+
+База SQLite создается во временном файле (потоки открывают собственные
+соединения). Каждый поток от имени своего пользователя отправляет
+комментарии через тестовый клиент; замеряется число комментариев
+в секунду и число ответов с ошибкой для обычного журнала (delete)
+и для режима WAL (core.db.configure_sqlite).
+"""
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from common import seed, setup_database
+
+from django.conf import settings
+from django.db import connection, connections
+from django.test import Client
+
+COMMENTS_PER_WRITER = 200
+
+
+def write_comments(user, post_ids, results):
+    client = Client(raise_request_exception=False)
+    client.force_login(user)
+    errors = 0
+    for i in range(COMMENTS_PER_WRITER):
+        response = client.post(
+            f'/posts/{post_ids[i % len(post_ids)]}/comment/',
+            {'text': f'Комментарий {i}'},
+        )
+        errors += response.status_code != 302
+    connections.close_all()
+    results.append(errors)
+
+
+def run(users, post_ids, writers):
+    results = []
+    threads = [
+        threading.Thread(
+            target=write_comments, args=(users[n], post_ids, results)
+        )
+        for n in range(writers)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return writers * COMMENTS_PER_WRITER / elapsed, sum(results)
+
+
+def main():
+    from blog.models import Post, User
+
+    db_dir = tempfile.mkdtemp()
+    connection.settings_dict['TEST']['NAME'] = str(
+        Path(db_dir) / 'bench.sqlite3'
+    )
+    setup_database()
+    seed(posts=20, comments_per_post=0)
+    post_ids = list(Post.objects.values_list('pk', flat=True))
+    # Сотрудники не ограничиваются blog.ratelimit
+    users = [
+        User.objects.create_user(
+            f'writer_{n}', password='bench', is_staff=True
+        )
+        for n in range(8)
+    ]
+    modes = {
+        'delete': {'journal_mode': 'delete', 'busy_timeout': 5000},
+        'wal': {
+            'journal_mode': 'wal',
+            'synchronous': 'normal',
+            'busy_timeout': 5000,
+        },
+    }
+    print('Комментарии в секунду (ошибок)')
+    for title, pragmas in modes.items():
+        settings.SQLITE_PRAGMAS = pragmas
+        connections.close_all()
+        for writers in (1, 4, 8):
+            rate, errors = run(users, post_ids, writers)
+            print(
+                f'  {title:<8} писателей: {writers}  '
+                f'{rate:8.1f} комм./с  ({errors})'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""Отрисовка лент шаблонами Django и Jinja2.
+
+    python benchmarks/bench_jinja2.py
+
+Требует установленного пакета jinja2. Перед замером проверяется,
+что обе версии страниц совпадают с точностью до пробельных символов.
+"""
+import re
+
+from common import measure, report, seed, setup_database
+
+from django.test import Client, override_settings
+
+URLS = (
+    '/',
+    '/category/category-0/',
+    '/profile/bench_author/',
+)
+
+
+def normalize(html):
+    html = re.sub(r'\s+', ' ', html)
+    return re.sub(r'>\s+<', '><', html).strip()
+
+
+def get(client, url, engine):
+    with override_settings(BLOG_FEED_TEMPLATE_ENGINE=engine):
+        return client.get(url)
+
+
+def main():
+    setup_database()
+    seed(posts=50)
+    client = Client()
+    client.login(username='bench_author', password='bench')
+    for url in URLS:
+        django_html = normalize(get(client, url, None).content.decode())
+        jinja_html = normalize(get(client, url, 'jinja2').content.decode())
+        assert django_html == jinja_html, f'HTML страницы {url} отличается'
+        report(f'GET {url}', {
+            'Django Templates': measure(lambda: get(client, url, None)),
+            'Jinja2': measure(lambda: get(client, url, 'jinja2')),
+        })
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Время отрисовки главной страницы с кэширующим загрузчиком и без него.
+
+    python benchmarks/bench_templates.py
+"""
+from common import measure, report, seed, setup_database
+
+from django.conf import settings
+from django.test import Client, override_settings
+
+BASE_TEMPLATES = settings.TEMPLATES[0]
+
+LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+
+def templates_with(loaders):
+    return [{
+        **BASE_TEMPLATES,
+        'APP_DIRS': False,
+        'OPTIONS': {**BASE_TEMPLATES['OPTIONS'], 'loaders': loaders},
+    }]
+
+
+def bench_index(loaders):
+    client = Client()
+    # Движки шаблонов создаются заново после override_settings
+    with override_settings(TEMPLATES=templates_with(loaders)):
+        return measure(lambda: client.get('/'), repeat=200)
+
+
+def bench_first_request(loaders, warmup=False):
+    client = Client()
+    with override_settings(TEMPLATES=templates_with(loaders)):
+        if warmup:
+            from core.warmup import warmup_templates
+            warmup_templates()
+        return measure(lambda: client.get('/'), repeat=1, warmup=0)
+
+
+def main():
+    setup_database()
+    seed(posts=30)
+    cached = [('django.template.loaders.cached.Loader', LOADERS)]
+    report('Главная страница, 10 карточек постов', {
+        'без кэша (чтение и разбор с диска)': bench_index(LOADERS),
+        'cached.Loader': bench_index(cached),
+    })
+    report('Первый запрос после старта процесса', {
+        'cached.Loader без прогрева': bench_first_request(cached),
+        'cached.Loader + прогрев': bench_first_request(cached, warmup=True),
+    })
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Общая подготовка окружения для бенчмарков.
+
+Бенчмарки запускаются из корня репозитория:
+    python benchmarks/bench_templates.py
+
+Каждый скрипт поднимает Django с настройками проекта, создает временную
+базу данных SQLite в памяти и наполняет ее тестовыми данными.
+"""
+import os
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+sys.path.insert(0, str(ROOT_DIR / 'blogicum'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogicum.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+
+def setup_database(**settings_overrides):
+    """Создать временную БД и применить миграции."""
+    setup_test_environment()
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = ['*']
+    for name, value in settings_overrides.items():
+        setattr(settings, name, value)
+    connection.creation.create_test_db(verbosity=0, keepdb=False)
+
+
+def seed(posts=100, comments_per_post=3, categories=5, text_words=300):
+    """Наполнить БД постами, комментариями, категориями и авторами."""
+    from blog.models import Category, Comment, Location, Post, User
+
+    author = User.objects.create_user('bench_author', password='bench')
+    reader = User.objects.create_user('bench_reader', password='bench')
+    category_list = [
+        Category.objects.create(
+            title=f'Категория {i}', description='Описание',
+            slug=f'category-{i}',
+        )
+        for i in range(categories)
+    ]
+    location = Location.objects.create(name='Москва')
+    now = timezone.now()
+    text = ' '.join(['слово'] * text_words)
+    for i in range(posts):
+        post = Post.objects.create(
+            title=f'Пост {i}',
+            text=f'{text}\n{i}',
+            pub_date=now - timedelta(minutes=i),
+            author=author,
+            category=category_list[i % categories],
+            location=location,
+        )
+        for j in range(comments_per_post):
+            Comment.objects.create(
+                post=post, author=reader, text=f'Комментарий {j}'
+            )
+    return author, reader
+
+
+def measure(func, repeat=200, warmup=5):
+    """Вернуть среднее время вызова func в миллисекундах."""
+    for _ in range(warmup):
+        func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def report(title, results):
+    """Напечатать таблицу результатов {название: миллисекунды}."""
+    print(title)
+    baseline = None
+    for name, value in results.items():
+        if baseline is None:
+            baseline = value
+        print(f'  {name:<40} {value:8.3f} ms  x{baseline / value:.2f}')
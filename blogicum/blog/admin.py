@@ -1,6 +1,12 @@
-from django.contrib import admin
+from django import forms
 
-from blog.models import Category, Comment, Location, Post
+from django.contrib import admin, messages
+
+# Базовая форма выбора действия в списке объектов админки
+from django.contrib.admin.helpers import ActionForm
+
+from blog import deletion, moderation
+from blog.models import Category, Comment, DeletionJob, Location, Post
 
 # Стандартный класс для админки пользователей
 from django.contrib.auth.admin import UserAdmin
@@ -11,13 +17,103 @@ from django.contrib.auth import get_user_model
 # Константа для текста описания
 TEXT = 'Описание публикации.'
 
+# Сообщение о постановке массовой операции в фоновую задачу
+QUEUED_MESSAGE = (
+    'Выбрано слишком много записей: операция поставлена в очередь '
+    'и будет выполнена в фоне.'
+)
+
+# Сообщение о постановке удаления в фоновую задачу
+DELETION_QUEUED_MESSAGE = (
+    'Объект скрыт, связанные записи удаляются в фоне '
+    '(см. раздел «Фоновые удаления»).'
+)
+
+
+class PostActionForm(ActionForm):
+    """
+    Форма действий над постами с дополнительным выбором категории
+    для действия "Перенести в категорию".
+    """
+    category = forms.ModelChoiceField(
+        queryset=Category.objects.all(),
+        required=False,
+        label='Категория',
+    )
+
+
+class BulkActionsMixin:
+    """
+    Миксин для админ-классов с массовыми действиями.
+    Все действия выполняются множественными UPDATE/DELETE
+    через модуль blog.moderation, без сохранения объектов по одному.
+    """
+
+    def run_bulk_action(self, request, func, queryset, *args, **kwargs):
+        """
+        Запускает массовую операцию и сообщает результат модератору.
+        """
+        count = moderation.run_bulk(func, queryset, *args, **kwargs)
+        if count is None:
+            self.message_user(request, QUEUED_MESSAGE, messages.WARNING)
+        else:
+            self.message_user(request, f'Обработано записей: {count}.')
+
+
+class BackgroundDeletionMixin:
+    """
+    Миксин для админ-классов, объекты которых удаляются в фоне
+    (blog.deletion): объект скрывается сразу, а комментарии и посты
+    удаляются пачками. Страница подтверждения не собирает список
+    всех зависимых объектов (это загрузило бы их в память).
+    """
+
+    # Функция постановки объектов QuerySet в фоновое удаление
+    # (все выбранные объекты удаляются одной задачей)
+    schedule_deletion = None
+
+    def delete_model(self, request, obj):
+        self.schedule_deletion(
+            self.model._base_manager.filter(pk=obj.pk)
+        )
+        self.message_user(request, DELETION_QUEUED_MESSAGE, messages.INFO)
+
+    def delete_queryset(self, request, queryset):
+        self.schedule_deletion(queryset)
+        self.message_user(request, DELETION_QUEUED_MESSAGE, messages.INFO)
+
+    def get_deleted_objects(self, objs, request):
+        """
+        Возвращает только сами удаляемые объекты, без зависимых.
+        """
+        objs = list(objs)
+        perms_needed = set()
+        if not self.has_delete_permission(request):
+            perms_needed.add(self.opts.verbose_name)
+        model_count = {self.opts.verbose_name_plural: len(objs)}
+        return [str(obj) for obj in objs], model_count, perms_needed, []
+
 
 # Регистрация модели Post с кастомным админ-классом ---
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(BackgroundDeletionMixin, BulkActionsMixin, admin.ModelAdmin):
     """
     Админ-класс для управления постами (публикациями).
     """
+
+    # Форма действий с выбором категории для переноса постов
+    action_form = PostActionForm
+
+    # Пост скрывается сразу, комментарии удаляются в фоне
+    schedule_deletion = staticmethod(deletion.schedule_posts_deletion)
+
+    # Массовые действия, выполняемые одним запросом на пачку строк
+    actions = (
+        'publish',
+        'unpublish',
+        'move_to_category',
+        'delete_by_author',
+    )
     
     # Поля, которые будут отображаться в списке записей
     list_display = (
@@ -66,6 +162,45 @@ class PostAdmin(admin.ModelAdmin):
         }),
     )
 
+    @admin.action(description='Опубликовать выбранные публикации')
+    def publish(self, request, queryset):
+        self.run_bulk_action(
+            request, moderation.update_posts, queryset, is_published=True
+        )
+
+    @admin.action(description='Снять с публикации выбранные публикации')
+    def unpublish(self, request, queryset):
+        self.run_bulk_action(
+            request, moderation.update_posts, queryset, is_published=False
+        )
+
+    @admin.action(description='Перенести выбранные публикации в категорию')
+    def move_to_category(self, request, queryset):
+        form = self.action_form(request.POST)
+        form.fields['action'].choices = self.get_action_choices(request)
+        if not form.is_valid() or form.cleaned_data['category'] is None:
+            self.message_user(
+                request, 'Выберите категорию для переноса.', messages.ERROR
+            )
+            return
+        self.run_bulk_action(
+            request,
+            moderation.update_posts,
+            queryset,
+            category_id=form.cleaned_data['category'].pk,
+        )
+
+    @admin.action(description='Удалить все публикации авторов выбранных')
+    def delete_by_author(self, request, queryset):
+        author_ids = queryset.order_by().values_list(
+            'author_id', flat=True
+        ).distinct()
+        self.run_bulk_action(
+            request,
+            moderation.delete_posts,
+            Post.objects.filter(author_id__in=list(author_ids)),
+        )
+
 
 
 # Встроенная форма для отображения постов внутри других моделей
@@ -132,10 +267,17 @@ class LocationAdmin(admin.ModelAdmin):
 
 # Регистрация модели Comment с кастомным админ-классом ---
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(BulkActionsMixin, admin.ModelAdmin):
     """
     Админ-класс для управления комментариями.
     """
+
+    # Массовые действия, выполняемые одним запросом на пачку строк
+    actions = (
+        'publish',
+        'unpublish',
+        'delete_by_author',
+    )
     
     # Поля для отображения в списке комментариев
     list_display = (
@@ -151,6 +293,29 @@ class CommentAdmin(admin.ModelAdmin):
     # Поля, редактируемые прямо из списка
     list_editable = ('is_published',) 
 
+    @admin.action(description='Опубликовать выбранные комментарии')
+    def publish(self, request, queryset):
+        self.run_bulk_action(
+            request, moderation.update_comments, queryset, is_published=True
+        )
+
+    @admin.action(description='Снять с публикации выбранные комментарии')
+    def unpublish(self, request, queryset):
+        self.run_bulk_action(
+            request, moderation.update_comments, queryset, is_published=False
+        )
+
+    @admin.action(description='Удалить все комментарии авторов выбранных')
+    def delete_by_author(self, request, queryset):
+        author_ids = queryset.order_by().values_list(
+            'author_id', flat=True
+        ).distinct()
+        self.run_bulk_action(
+            request,
+            moderation.delete_comments,
+            Comment.objects.filter(author_id__in=list(author_ids)),
+        )
+
 
 
 # Получаем модель пользователя (стандартную User или кастомную, если она определена)
@@ -163,11 +328,16 @@ admin.site.unregister(User)
 
 # Регистрируем модель пользователя с кастомным админ-классом --- 2.9
 @admin.register(User)
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(BackgroundDeletionMixin, UserAdmin):
     """
     Кастомизированный админ-класс для управления пользователями.
     Наследуется от стандартного UserAdmin для сохранения безопасности работы с паролями.
+    Пользователь при удалении сразу отключается, его посты и комментарии
+    удаляются в фоне.
     """
+
+    # Пользователь отключается сразу, его записи удаляются в фоне
+    schedule_deletion = staticmethod(deletion.schedule_users_deletion)
     
     # Поля, которые будут отображаться в списке пользователей
     list_display = (
@@ -227,4 +397,34 @@ class CustomUserAdmin(UserAdmin):
             'classes': ('wide',),      # CSS-классы для оформления
             'fields': ('username', 'password1', 'password2'),  # Поля при создании
         }),
-    )
\ No newline at end of file
+    )
+
+
+# Фоновые удаления: только просмотр состояния и прогресса
+@admin.register(DeletionJob)
+class DeletionJobAdmin(admin.ModelAdmin):
+    """
+    Админ-класс для просмотра фоновых удалений.
+    """
+
+    list_display = (
+        'target',
+        'object_id',
+        'title',
+        'status',
+        'progress_display',
+        'created_at',
+        'finished_at',
+    )
+    list_filter = ('status', 'target')
+    readonly_fields = [field.name for field in DeletionJob._meta.fields]
+
+    @admin.display(description='Прогресс')
+    def progress_display(self, obj):
+        return f'{obj.progress}% ({obj.deleted} из {obj.total})'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
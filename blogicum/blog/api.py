@@ -0,0 +1,359 @@
+import hashlib  # Для ETag по содержимому ответа
+
+import json  # Для сериализации ответов
+
+from itertools import islice  # Для обработки строк пачками
+
+from base64 import urlsafe_b64decode, urlsafe_b64encode  # Для курсора в URL
+
+from django.conf import settings  # Для размеров страниц API
+
+from django.core.serializers.json import DjangoJSONEncoder  # Даты в JSON
+
+from django.db.models import Count, Q  # Подсчет комментариев и условия курсора
+
+from django.http import (Http404, HttpResponse, HttpResponseNotModified,
+                         StreamingHttpResponse)
+
+from django.shortcuts import get_object_or_404  # Для проверки категории
+
+from django.utils.dateparse import parse_datetime  # Для разбора курсора
+
+from django.views import View  # Базовый контроллер (только GET)
+
+from blog.models import Category, Comment, Post
+from blog.rendering import RENDERER_VERSION, render_text
+from blog.utils import published_only, visible_to
+
+# Размер страницы по умолчанию и максимальный (параметр ?limit=)
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 500
+
+# Страницы больше этого размера отдаются потоком, без буферизации
+API_STREAM_THRESHOLD = 100
+
+# Сколько строк сериализуется за один шаг (один запрос счетчиков)
+API_CHUNK_SIZE = 100
+
+# Поля постов, которые читаются из БД для списка
+POST_FIELDS = (
+    'id', 'title', 'excerpt', 'pub_date', 'image', 'author__username',
+    'category__slug', 'category__title', 'location__name',
+    'location__is_published', 'like_count',
+)
+
+
+def get_setting(name, default):
+    """
+    Возвращает значение настройки BLOG_API_<name> или значение по умолчанию.
+    """
+    return getattr(settings, f'BLOG_API_{name}', default)
+
+
+def dumps(data):
+    """
+    Сериализует данные в компактный JSON.
+    """
+    return json.dumps(
+        data, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')
+    )
+
+
+def encode_cursor(date, pk):
+    """
+    Кодирует позицию последнего элемента страницы в строку для URL.
+    Дата сохраняется с микросекундами (DjangoJSONEncoder их отбрасывает).
+    """
+    raw = json.dumps([date.isoformat(), pk]).encode()
+    return urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Раскодирует курсор в (дата, id). При ошибке возвращает 404.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw_date, pk = json.loads(urlsafe_b64decode(padded))
+        date = parse_datetime(raw_date)
+        if date is None:
+            raise ValueError
+        return date, int(pk)
+    except (ValueError, TypeError):
+        raise Http404('Неверный курсор')
+
+
+def serialize_post(row):
+    """
+    Преобразует строку values() поста в словарь ответа API.
+    Объект модели не создается.
+    """
+    location = row['location__name'] if row['location__is_published'] else None
+    return {
+        'id': row['id'],
+        'title': row['title'],
+        'excerpt': row['excerpt'],
+        'pub_date': row['pub_date'],
+        'author': row['author__username'],
+        'category': {
+            'slug': row['category__slug'],
+            'title': row['category__title'],
+        },
+        'location': location,
+        'image': Post.image.field.storage.url(row['image'])
+        if row['image'] else None,
+        'comment_count': row.get('comment_count', 0),
+        'like_count': row['like_count'],
+    }
+
+
+def add_comment_counts(rows):
+    """
+    Добавляет к строкам постов количество комментариев одним запросом
+    по id страницы. Это дешевле, чем GROUP BY по всей ленте с JOIN
+    комментариев до применения LIMIT.
+    """
+    counts = dict(
+        Comment.objects.filter(
+            post_id__in=[row['id'] for row in rows]
+        ).order_by().values_list('post_id').annotate(Count('pk'))
+    )
+    for row in rows:
+        row['comment_count'] = counts.get(row['id'], 0)
+    return rows
+
+
+def serialize_comment(row):
+    """
+    Преобразует строку values() комментария в словарь ответа API.
+    """
+    return {
+        'id': row['id'],
+        'parent': row['parent_id'],
+        'depth': row['depth'],
+        'author': row['author__username'],
+        'created_at': row['created_at'],
+        'text': row['text'],
+        'like_count': row['like_count'],
+    }
+
+
+def json_response(request, data):
+    """
+    Возвращает JSON с ETag по содержимому.
+    Если у клиента актуальная копия, возвращается 304 без тела.
+    """
+    body = dumps(data).encode()
+    etag = '"{}"'.format(hashlib.md5(body).hexdigest())
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+    if etag in {tag.strip() for tag in if_none_match.split(',')}:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    return response
+
+
+class ApiListView(View):
+    """
+    Базовый контроллер списка API с курсорной пагинацией.
+    Курсор - позиция последнего элемента страницы (дата, id), поэтому
+    каждая страница читается одним индексным запросом без OFFSET
+    и не сдвигается при появлении новых записей.
+    """
+
+    # Поле даты, по которому упорядочен список, и направление
+    cursor_field = 'pub_date'
+    descending = True
+
+    def get_queryset(self):
+        raise NotImplementedError
+
+    def serialize(self, row):
+        raise NotImplementedError
+
+    def prepare_rows(self, rows):
+        """
+        Дополняет пачку строк данными из других таблиц.
+        """
+        return rows
+
+    def serialize_rows(self, rows):
+        """
+        Сериализует строки пачками по API_CHUNK_SIZE.
+        """
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, API_CHUNK_SIZE))
+            if not chunk:
+                return
+            for row in self.prepare_rows(chunk):
+                yield self.serialize(row)
+
+    def get_limit(self):
+        """
+        Возвращает размер страницы из параметра ?limit=.
+        """
+        try:
+            limit = int(self.request.GET.get('limit', 0))
+        except ValueError:
+            limit = 0
+        if limit <= 0:
+            limit = get_setting('PAGE_SIZE', API_PAGE_SIZE)
+        return min(limit, get_setting('MAX_PAGE_SIZE', API_MAX_PAGE_SIZE))
+
+    def get_page_queryset(self):
+        """
+        Возвращает QuerySet страницы (values), начиная с курсора.
+        """
+        field = self.cursor_field
+        prefix = '-' if self.descending else ''
+        queryset = self.get_queryset().order_by(prefix + field, prefix + 'pk')
+        cursor = self.request.GET.get('cursor')
+        if cursor:
+            date, pk = decode_cursor(cursor)
+            op = 'lt' if self.descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{field}__{op}': date})
+                | Q(**{field: date, f'pk__{op}': pk})
+            )
+        return queryset
+
+    def get_next_url(self, row):
+        """
+        Возвращает URL следующей страницы после строки row.
+        """
+        params = self.request.GET.copy()
+        params['cursor'] = encode_cursor(row[self.cursor_field], row['id'])
+        return self.request.build_absolute_uri(
+            f'{self.request.path}?{params.urlencode()}'
+        )
+
+    def get(self, request, *args, **kwargs):
+        limit = self.get_limit()
+        # Лишняя строка показывает, есть ли следующая страница
+        queryset = self.get_page_queryset()[:limit + 1]
+        if limit > get_setting('STREAM_THRESHOLD', API_STREAM_THRESHOLD):
+            return StreamingHttpResponse(
+                self.stream(queryset.iterator(), limit),
+                content_type='application/json',
+            )
+        rows = list(queryset)
+        return json_response(request, {
+            'results': list(self.serialize_rows(rows[:limit])),
+            'next': self.get_next_url(rows[limit - 1])
+            if len(rows) > limit else None,
+        })
+
+    def stream(self, rows, limit):
+        """
+        Отдает страницу по частям: строки читаются из курсора БД
+        и сериализуются пачками, весь ответ в памяти не собирается.
+        """
+        rows = iter(rows)
+        page = islice(rows, limit)
+        last = {}
+
+        def remember(page):
+            for row in page:
+                last['row'] = row
+                yield row
+
+        yield '{"results":['
+        for index, item in enumerate(self.serialize_rows(remember(page))):
+            yield (',' if index else '') + dumps(item)
+        has_next = next(rows, None) is not None
+        next_url = self.get_next_url(last['row']) if has_next else None
+        yield '],"next":' + dumps(next_url) + '}'
+
+
+class PostListMixin:
+    """
+    Общий QuerySet списков постов API (те же правила, что у лент).
+    """
+
+    def get_posts(self):
+        return published_only().values(*POST_FIELDS)
+
+    def prepare_rows(self, rows):
+        return add_comment_counts(rows)
+
+    def serialize(self, row):
+        return serialize_post(row)
+
+
+class ApiPostListView(PostListMixin, ApiListView):
+    """
+    Лента опубликованных постов: /api/posts/.
+    """
+
+    def get_queryset(self):
+        return self.get_posts()
+
+
+class ApiCategoryPostListView(PostListMixin, ApiListView):
+    """
+    Лента постов опубликованной категории: /api/categories/<slug>/posts/.
+    """
+
+    def get_queryset(self):
+        category = get_object_or_404(
+            Category.objects.only('pk'),
+            slug=self.kwargs['category_slug'],
+            is_published=True,
+        )
+        return self.get_posts().filter(category=category)
+
+
+def get_visible_posts(request):
+    """
+    Возвращает посты, доступные пользователю: опубликованные
+    и (для автора) его собственные, как в PostDetailView.
+    """
+    return visible_to(request.user)
+
+
+class ApiPostDetailView(View):
+    """
+    Пост с полным текстом: /api/posts/<id>/.
+    """
+
+    def get(self, request, pk):
+        row = get_visible_posts(request).filter(pk=pk).annotate(
+            comment_count=Count('comments')
+        ).values(
+            *POST_FIELDS, 'comment_count', 'text',
+            'rendered__html', 'rendered__version',
+        ).first()
+        if row is None:
+            raise Http404('Пост не найден')
+        data = serialize_post(row)
+        data['text'] = row['text']
+        data['html'] = (
+            row['rendered__html']
+            if row['rendered__version'] == RENDERER_VERSION
+            else render_text(row['text'])
+        )
+        return json_response(request, data)
+
+
+class ApiCommentListView(ApiListView):
+    """
+    Комментарии к доступному посту: /api/posts/<id>/comments/.
+    """
+
+    cursor_field = 'created_at'
+    descending = False
+
+    def get_queryset(self):
+        if not get_visible_posts(self.request).filter(
+            pk=self.kwargs['pk']
+        ).exists():
+            raise Http404('Пост не найден')
+        return Comment.objects.filter(post_id=self.kwargs['pk']).values(
+            'id', 'parent_id', 'depth', 'author__username', 'created_at',
+            'text', 'like_count',
+        )
+
+    def serialize(self, row):
+        return serialize_comment(row)
@@ -1,7 +1,19 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
     verbose_name = 'Блог'
+
+    def ready(self):
+        # Подписка лент, RSS/Atom, карты сайта, статистики авторов,
+        # рейтинга обсуждаемых постов, похожих постов, личных лент
+        # и вариантов выбора в формах на изменения моделей
+        from blog import (choices, feeds, following, related,  # noqa: F401
+                          sitemaps, stats, timeline, trending)
+
+        # PRAGMA SQLite (режим WAL и т.п.) для каждого нового соединения
+        from core.db import configure_sqlite
+        connection_created.connect(configure_sqlite)
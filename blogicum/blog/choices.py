@@ -0,0 +1,150 @@
+import hashlib  # Для ключа кэша по тексту запроса
+
+import uuid  # Для версии списка вариантов
+
+from django import forms  # Базовые поля и ошибки валидации
+
+from django.conf import settings  # Для выбора кэша и срока хранения
+
+from django.core.cache import caches  # Кэш списков вариантов
+
+from django.db.models.signals import post_delete, post_save  # Для смены версии
+
+from django.forms.models import ModelChoiceIterator, ModelChoiceIteratorValue
+
+from blog.models import Category, Location
+
+# Срок хранения списка вариантов в кэше (секунды); обычно список
+# устаревает раньше - при изменении категорий и местоположений
+CHOICES_TIMEOUT = 24 * 60 * 60
+
+
+def get_cache():
+    """
+    Возвращает кэш для списков вариантов (тот же, что у лент).
+    """
+    return caches[getattr(settings, 'BLOG_TIMELINE_CACHE', 'default')]
+
+
+def version_key(model):
+    """
+    Возвращает ключ текущей версии списков вариантов модели.
+    """
+    return f'choices-version:{model._meta.label_lower}'
+
+
+def get_version(model):
+    """
+    Возвращает версию списков вариантов модели. Если версия пропала
+    из кэша, создается новая: старые списки становятся недоступны.
+    """
+    cache = get_cache()
+    version = cache.get(version_key(model))
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(version_key(model), version, None):
+            version = cache.get(version_key(model), version)
+    return version
+
+
+def bump_version(sender, **kwargs):
+    """
+    Изменение категории или местоположения сбрасывает все списки
+    вариантов этой модели.
+    """
+    get_cache().set(version_key(sender), uuid.uuid4().hex, None)
+
+
+def get_choice_objects(queryset):
+    """
+    Возвращает объекты QuerySet из кэша (или из БД при первом обращении).
+    Ключ учитывает текст запроса, поэтому поля с разными фильтрами
+    (limit_choices_to) не смешиваются.
+    """
+    model = queryset.model
+    digest = hashlib.md5(str(queryset.query).encode()).hexdigest()
+    key = f'choices:{model._meta.label_lower}:{get_version(model)}:{digest}'
+    cache = get_cache()
+    objects = cache.get(key)
+    if objects is None:
+        objects = list(queryset)
+        cache.set(
+            key, objects,
+            getattr(settings, 'BLOG_CHOICES_TIMEOUT', CHOICES_TIMEOUT),
+        )
+    return objects
+
+
+class CachedModelChoiceIterator(ModelChoiceIterator):
+    """
+    Варианты выбора из кэшированного списка объектов.
+    """
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for obj in self.field.get_objects():
+            yield self.choice(obj)
+
+    def __len__(self):
+        return (
+            len(self.field.get_objects())
+            + (1 if self.field.empty_label is not None else 0)
+        )
+
+    def __bool__(self):
+        return (
+            self.field.empty_label is not None
+            or bool(self.field.get_objects())
+        )
+
+    def choice(self, obj):
+        return (
+            ModelChoiceIteratorValue(self.field.prepare_value(obj), obj),
+            self.field.label_from_instance(obj),
+        )
+
+
+class CachedModelChoiceField(forms.ModelChoiceField):
+    """
+    Поле выбора объекта, которое при отрисовке и проверке значения
+    не обращается к БД: варианты читаются из кэша один раз на форму.
+    """
+
+    iterator = CachedModelChoiceIterator
+
+    def get_objects(self):
+        """
+        Возвращает варианты поля (кэш на время жизни формы).
+        """
+        if not hasattr(self, '_objects'):
+            self._objects = get_choice_objects(self.queryset)
+        return self._objects
+
+    def _set_queryset(self, queryset):
+        self.__dict__.pop('_objects', None)
+        super()._set_queryset(queryset)
+
+    queryset = property(
+        forms.ModelChoiceField._get_queryset, _set_queryset
+    )
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        key = self.to_field_name or 'pk'
+        if isinstance(value, self.queryset.model):
+            value = getattr(value, key)
+        for obj in self.get_objects():
+            if str(obj.serializable_value(key)) == str(value):
+                return obj
+        raise forms.ValidationError(
+            self.error_messages['invalid_choice'],
+            code='invalid_choice',
+            params={'value': value},
+        )
+
+
+for model in (Category, Location):
+    post_save.connect(bump_version, sender=model)
+    post_delete.connect(bump_version, sender=model)
@@ -0,0 +1,193 @@
+import atexit  # Сброс накопленных просмотров при завершении процесса
+
+import logging  # Для записи ошибок сброса
+
+import threading  # Блокировка буфера и таймер сброса
+
+import time  # Для интервала между сбросами
+
+from collections import Counter  # Накопленные изменения счетчиков по ключу
+
+from django.conf import settings  # Для порога и интервала сброса
+
+from django.db.models import (Case, F, PositiveIntegerField, Value,
+                              When)  # UPDATE ... CASE
+
+from blog.models import Post
+from blog.signals import post_views_recorded
+from blog.tasks import run_in_background
+
+logger = logging.getLogger(__name__)
+
+# Сброс, когда в буфере накопилось столько просмотров...
+VIEW_FLUSH_THRESHOLD = 100
+
+# ...или с предыдущего сброса прошло столько секунд
+VIEW_FLUSH_INTERVAL = 30
+
+# Сколько постов обновляется одним UPDATE (ограничение числа параметров)
+VIEW_FLUSH_BATCH = 500
+
+
+def write_view_counts(counts):
+    """
+    Прибавляет просмотры к Post.view_count: один UPDATE с CASE
+    на пачку постов вместо UPDATE на каждый просмотр.
+    """
+    items = sorted(counts.items())
+    for start in range(0, len(items), VIEW_FLUSH_BATCH):
+        batch = dict(items[start:start + VIEW_FLUSH_BATCH])
+        Post._base_manager.filter(pk__in=batch).update(
+            view_count=F('view_count') + Case(
+                *(When(pk=pk, then=Value(count))
+                  for pk, count in batch.items()),
+                default=Value(0),
+                output_field=PositiveIntegerField(),
+            )
+        )
+    post_views_recorded.send(sender=Post, counts=dict(counts))
+
+
+class CounterBuffer:
+    """
+    Буфер изменений счетчиков в памяти процесса. Изменение - это
+    увеличение значения в словаре; в БД изменения записываются функцией
+    flush пачкой по порогу или интервалу (настройки
+    BLOG_<prefix>_FLUSH_THRESHOLD и BLOG_<prefix>_FLUSH_INTERVAL),
+    а также при завершении процесса. Первое изменение после сброса
+    заводит таймер на интервал, поэтому изменения записываются, даже
+    если новых не поступает. При аварийном завершении теряется
+    не больше порога или интервала изменений.
+    """
+
+    def __init__(self, prefix='VIEW', threshold=VIEW_FLUSH_THRESHOLD,
+                 interval=VIEW_FLUSH_INTERVAL, flush=None):
+        self.prefix = prefix
+        self.threshold = threshold
+        self.interval = interval
+        self.flush = flush
+        self._counts = Counter()
+        self._pending = 0
+        self._flushed_at = time.monotonic()
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def get_setting(self, name, default):
+        """
+        Возвращает значение настройки BLOG_<prefix>_<name>.
+        """
+        return getattr(settings, f'BLOG_{self.prefix}_{name}', default)
+
+    def add(self, key):
+        """
+        Учитывает изменение. Возвращает накопленные изменения, если
+        пора их записать (например, передать в write_view_counts).
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._counts[key] += 1
+            self._pending += 1
+            if self._timer is None and self.flush is not None:
+                self._start_timer()
+            if (
+                self._pending < self.get_setting('FLUSH_THRESHOLD',
+                                                 self.threshold)
+                and now - self._flushed_at
+                < self.get_setting('FLUSH_INTERVAL', self.interval)
+            ):
+                return None
+            return self._take(now)
+
+    def _start_timer(self):
+        self._timer = threading.Timer(
+            self.get_setting('FLUSH_INTERVAL', self.interval), self.flush_due
+        )
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush_due(self):
+        """
+        Срабатывание таймера: записывает накопленные изменения в фоновой
+        задаче. Следующее изменение заведет таймер заново.
+        """
+        with self._lock:
+            self._timer = None
+            counts = self._take(time.monotonic())
+        if counts:
+            run_in_background(self.flush, counts)
+
+    def take(self):
+        """
+        Забирает все накопленные изменения.
+        """
+        with self._lock:
+            return self._take(time.monotonic())
+
+    def clear(self):
+        """
+        Отбрасывает накопленные изменения и останавливает таймер.
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._take(time.monotonic())
+
+    def _take(self, now):
+        counts, self._counts = self._counts, Counter()
+        self._pending = 0
+        self._flushed_at = now
+        return counts
+
+    def restore(self, counts):
+        """
+        Возвращает в буфер изменения, которые не удалось записать.
+        """
+        with self._lock:
+            self._counts.update(counts)
+            self._pending += sum(counts.values())
+
+
+def flush(counts):
+    """
+    Записывает просмотры в БД; при ошибке возвращает их в буфер
+    (будут записаны при следующем сбросе).
+    """
+    try:
+        write_view_counts(counts)
+    except Exception:
+        logger.exception('Не удалось записать просмотры постов')
+        _buffer.restore(counts)
+
+
+_buffer = CounterBuffer(flush=flush)
+
+
+def record_view(post_id):
+    """
+    Учитывает просмотр поста. Запрос к БД выполняется только при
+    сбросе буфера, и то в фоновой задаче.
+    """
+    counts = _buffer.add(post_id)
+    if counts:
+        run_in_background(flush, counts)
+
+
+def flush_views():
+    """
+    Сразу записывает все накопленные просмотры (при завершении
+    процесса и в тестах).
+    """
+    counts = _buffer.take()
+    if counts:
+        flush(counts)
+
+
+def reset_buffer():
+    """
+    Отбрасывает накопленные просмотры без записи (используется в тестах).
+    """
+    _buffer.clear()
+
+
+atexit.register(flush_views)
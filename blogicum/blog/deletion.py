@@ -0,0 +1,245 @@
+import logging  # Для записи ошибок фонового удаления
+
+from datetime import timedelta  # Срок аренды задачи
+
+from django.conf import settings  # Для срока аренды задачи
+
+from django.db import transaction  # Скрытие объекта и создание задачи вместе
+
+from django.db.models import F, Q  # Счетчик прогресса в SQL и выбор подписок
+
+from django.utils import timezone  # Для времени завершения задачи
+
+from blog.following import delete_follows
+from blog.models import Comment, DeletionJob, Follow, Post, User
+from blog.moderation import delete_comments, delete_posts, update_posts
+from blog.tasks import iter_pk_batches, run_in_background
+
+logger = logging.getLogger(__name__)
+
+# Задача в состоянии running без продвижения дольше этого срока
+# (секунды) считается прерванной и может быть подхвачена снова
+DELETION_LEASE = 10 * 60
+
+
+def get_setting(name, default):
+    """
+    Возвращает значение настройки BLOG_DELETION_<name> или значение
+    по умолчанию.
+    """
+    return getattr(settings, f'BLOG_DELETION_{name}', default)
+
+
+def hide_posts(queryset):
+    """
+    Скрывает посты сразу: снимает с публикации и помечает удаляемыми.
+    Обновление идет пачками и рассылает posts_bulk_changed, поэтому
+    ленты, статистика авторов и карта сайта обновляются до удаления.
+    """
+    return update_posts(queryset, is_published=False, is_deleted=True)
+
+
+def job_title(objects, count):
+    """
+    Возвращает название задачи: первый объект и количество остальных.
+    """
+    title = str(objects.order_by('pk').first())
+    if count > 1:
+        title += f' и еще {count - 1}'
+    return title[:256]
+
+
+def start_job(target, ids, title, total):
+    """
+    Создает задачу удаления объектов ids и запускает ее в фоне.
+    """
+    job = DeletionJob.objects.create(
+        target=target,
+        object_id=ids[0],
+        object_ids=ids,
+        title=title,
+        total=total,
+    )
+    run_in_background(run_deletion_job, job.pk)
+    return job
+
+
+def schedule_posts_deletion(queryset):
+    """
+    Скрывает посты и ставит удаление их комментариев и самих постов
+    в одну фоновую задачу. Возвращает задачу удаления или None,
+    если постов нет.
+    """
+    ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+    if not ids:
+        return None
+    posts = Post._base_manager.filter(pk__in=ids)
+    with transaction.atomic():
+        hide_posts(posts)
+        return start_job(
+            DeletionJob.POST, ids, job_title(posts, len(ids)),
+            Comment.objects.filter(post_id__in=ids).count() + len(ids),
+        )
+
+
+def schedule_post_deletion(post):
+    """
+    Скрывает пост и ставит его удаление в фоновую задачу.
+    """
+    return schedule_posts_deletion(Post._base_manager.filter(pk=post.pk))
+
+
+def schedule_users_deletion(queryset):
+    """
+    Отключает пользователей (они больше не могут войти), скрывает
+    их посты и ставит удаление комментариев, постов и учетных записей
+    в одну фоновую задачу. Возвращает задачу удаления или None,
+    если пользователей нет.
+    """
+    ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+    if not ids:
+        return None
+    users = User.objects.filter(pk__in=ids)
+    with transaction.atomic():
+        users.update(is_active=False)
+        posts = Post._base_manager.filter(author_id__in=ids)
+        hide_posts(posts)
+        comments = Comment.objects.filter(author_id__in=ids).count()
+        comments += Comment.objects.filter(post__author_id__in=ids).exclude(
+            author_id__in=ids
+        ).count()
+        follows = user_follows(ids).count()
+        return start_job(
+            DeletionJob.USER, ids, job_title(users, len(ids)),
+            follows + comments + posts.count() + len(ids),
+        )
+
+
+def schedule_user_deletion(user):
+    """
+    Отключает пользователя и ставит его удаление в фоновую задачу.
+    """
+    return schedule_users_deletion(User.objects.filter(pk=user.pk))
+
+
+def user_follows(user_ids):
+    """
+    Возвращает подписки пользователей и подписки на них.
+    """
+    return Follow.objects.filter(
+        Q(follower_id__in=user_ids) | Q(author_id__in=user_ids)
+    )
+
+
+def job_object_ids(job):
+    """
+    Возвращает id удаляемых объектов задачи.
+    """
+    return job.object_ids or [job.object_id]
+
+
+def iter_steps(job):
+    """
+    Возвращает шаги удаления: пары (функция, QuerySet) для пакетного
+    удаления зависимых строк. Шаги можно выполнять повторно: каждый
+    удаляет только то, что еще осталось.
+    """
+    ids = job_object_ids(job)
+    if job.target == DeletionJob.POST:
+        yield delete_comments, Comment.objects.filter(post_id__in=ids)
+        return
+    # Подписки популярного автора удаляются пачками, а не каскадом
+    # с загрузкой каждой строки
+    yield delete_follows, user_follows(ids)
+    yield delete_comments, Comment.objects.filter(author_id__in=ids)
+    yield delete_comments, Comment.objects.filter(post__author_id__in=ids)
+    yield delete_posts, Post._base_manager.filter(author_id__in=ids)
+
+
+def touch(job_id):
+    """
+    Отмечает, что задача продвинулась (продлевает аренду).
+    """
+    DeletionJob.objects.filter(pk=job_id).update(heartbeat_at=timezone.now())
+
+
+def delete_target(job):
+    """
+    Удаляет сами объекты, когда зависимых строк уже нет. Стандартное
+    удаление (с сигналами post_delete) загружает лишь несколько строк
+    на объект. Возвращает количество удаленных объектов.
+    """
+    model = Post if job.target == DeletionJob.POST else User
+    deleted = 0
+    for batch in iter_pk_batches(
+        model._base_manager.filter(pk__in=job_object_ids(job))
+    ):
+        for obj in model._base_manager.filter(pk__in=batch):
+            obj.delete()
+            deleted += 1
+        touch(job.pk)
+    return deleted
+
+
+def claim_job(job_id):
+    """
+    Переводит задачу в состояние running одним UPDATE с условием
+    на состояние. Задачу получает только один воркер: ожидающую,
+    завершившуюся ошибкой или выполняемую без продвижения дольше
+    BLOG_DELETION_LEASE. Возвращает True, если задача получена.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=get_setting('LEASE', DELETION_LEASE))
+    return DeletionJob.objects.filter(pk=job_id).filter(
+        Q(status__in=(DeletionJob.PENDING, DeletionJob.FAILED))
+        | Q(status=DeletionJob.RUNNING, heartbeat_at__lt=stale)
+        | Q(status=DeletionJob.RUNNING, heartbeat_at__isnull=True)
+    ).update(status=DeletionJob.RUNNING, error='', heartbeat_at=now) > 0
+
+
+def run_deletion_job(job_id):
+    """
+    Выполняет задачу удаления: зависимые строки удаляются пачками
+    (каждая пачка - отдельная короткая транзакция), после каждой пачки
+    сохраняется прогресс. При ошибке задача помечается failed; ее можно
+    запустить снова командой run_deletion_jobs. Задача, которую уже
+    выполняет другой воркер, пропускается. Возвращает True, если
+    задача была получена.
+    """
+    if not claim_job(job_id):
+        return False
+    job = DeletionJob.objects.get(pk=job_id)
+
+    def on_batch(count):
+        DeletionJob.objects.filter(pk=job_id).update(
+            deleted=F('deleted') + count, heartbeat_at=timezone.now()
+        )
+
+    try:
+        for func, queryset in iter_steps(job):
+            func(queryset, on_batch=on_batch)
+        deleted = delete_target(job)
+    except Exception as error:
+        logger.exception('Фоновое удаление %s завершилось с ошибкой', job)
+        DeletionJob.objects.filter(pk=job_id).update(
+            status=DeletionJob.FAILED, error=repr(error)
+        )
+        return True
+    DeletionJob.objects.filter(pk=job_id).update(
+        status=DeletionJob.DONE,
+        deleted=F('deleted') + deleted,
+        finished_at=timezone.now(),
+    )
+    return True
+
+
+def resume_deletion_jobs():
+    """
+    Выполняет незавершенные задачи (например, прерванные перезапуском
+    процесса). Задачи, которые сейчас выполняет другой воркер,
+    пропускаются. Возвращает количество выполненных задач.
+    """
+    job_ids = list(DeletionJob.objects.exclude(
+        status=DeletionJob.DONE
+    ).order_by('pk').values_list('pk', flat=True))
+    return sum(run_deletion_job(job_id) for job_id in job_ids)
@@ -0,0 +1,309 @@
+import hashlib  # Для ETag снимка ленты
+
+from django.conf import settings  # Для размера и срока жизни снимков
+
+from django.core.cache import caches  # Общий кэш для снимков лент
+
+from django.db.models import Min  # Для поиска ближайшей отложенной публикации
+
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_delete)  # Для сброса снимков
+
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+
+from django.shortcuts import get_object_or_404  # Проверка автора
+
+from django.urls import reverse  # Для ссылок на посты и страницы лент
+
+from django.utils import timezone  # Для проверки даты публикации
+
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed  # XML
+
+from django.utils.http import http_date  # Для заголовка Last-Modified
+
+from django.views import View  # Базовый контроллер
+
+from blog.models import Category, Post, User
+from blog.signals import posts_bulk_changed, posts_bulk_deleted
+from blog.utils import published_only
+from core.http import is_not_modified
+
+# Сколько последних постов попадает в ленту
+SYNDICATION_ITEMS = 20
+
+# Срок жизни снимка в кэше (секунды); обычно снимок сбрасывается раньше,
+# при изменении постов ленты
+SYNDICATION_TIMEOUT = 24 * 60 * 60
+
+# Генераторы XML по формату из URL
+GENERATORS = {
+    'rss': Rss201rev2Feed,
+    'atom': Atom1Feed,
+}
+
+
+def get_setting(name, default):
+    """
+    Возвращает значение настройки BLOG_SYNDICATION_<name> или значение
+    по умолчанию.
+    """
+    return getattr(settings, f'BLOG_SYNDICATION_{name}', default)
+
+
+def get_cache():
+    """
+    Возвращает кэш для снимков (тот же, что у лент blog.timeline).
+    """
+    return caches[getattr(settings, 'BLOG_TIMELINE_CACHE', 'default')]
+
+
+def snapshot_key(kind, value=''):
+    """
+    Возвращает ключ снимка ленты: общей, категории или автора.
+    """
+    return f'syndication:{kind}:{value}'
+
+
+def build_snapshot(kind, value, queryset, title, link):
+    """
+    Собирает снимок ленты: данные последних постов без XML.
+    XML для каждого формата и домена собирается из снимка
+    при первом запросе и кэшируется вместе с ним.
+    """
+    now = timezone.now()
+    rows = list(
+        published_only(queryset).order_by('-pub_date', '-pk').values(
+            'id', 'title', 'excerpt', 'pub_date', 'author__username',
+            'category__title',
+        )[:get_setting('ITEMS', SYNDICATION_ITEMS)]
+    )
+    next_pub_date = queryset.filter(
+        is_published=True,
+        category__is_published=True,
+        pub_date__gt=now,
+    ).aggregate(next_pub_date=Min('pub_date'))['next_pub_date']
+    return {
+        'title': title,
+        'link': link,
+        'rows': rows,
+        # ETag не меняется, если после сброса снимок собран с тем же
+        # содержимым; Last-Modified - время сборки снимка
+        'etag': hashlib.md5(repr((title, rows)).encode()).hexdigest(),
+        'last_modified': now.timestamp(),
+        'valid_until': next_pub_date.timestamp() if next_pub_date else None,
+        'bodies': {},
+    }
+
+
+def render_feed(snapshot, feed_format, request):
+    """
+    Возвращает XML ленты из снимка (без запросов к базе).
+    """
+    generator = GENERATORS[feed_format](
+        title=snapshot['title'],
+        link=request.build_absolute_uri(snapshot['link']),
+        description=snapshot['title'],
+        language=settings.LANGUAGE_CODE,
+        feed_url=request.build_absolute_uri(request.path),
+    )
+    for row in snapshot['rows']:
+        link = request.build_absolute_uri(
+            reverse('blog:post_detail', args=[row['id']])
+        )
+        generator.add_item(
+            title=row['title'],
+            link=link,
+            description=row['excerpt'],
+            unique_id=link,
+            author_name=row['author__username'],
+            pubdate=row['pub_date'],
+            categories=[row['category__title']],
+        )
+    return generator.writeString('utf-8').encode()
+
+
+def invalidate(categories=(), authors=(), category_ids=(), author_ids=()):
+    """
+    Сбрасывает снимки общей ленты и лент указанных категорий и авторов.
+    Для id (из сигналов) slug и username читаются одним запросом.
+    """
+    category_ids = set(category_ids) - {None}
+    author_ids = set(author_ids) - {None}
+    categories = set(categories)
+    authors = set(authors)
+    if category_ids:
+        categories.update(Category.objects.filter(
+            pk__in=category_ids
+        ).values_list('slug', flat=True))
+    if author_ids:
+        authors.update(User.objects.filter(
+            pk__in=author_ids
+        ).values_list('username', flat=True))
+    get_cache().delete_many([
+        snapshot_key('index'),
+        *(snapshot_key('category', slug) for slug in categories),
+        *(snapshot_key('profile', username) for username in authors),
+    ])
+
+
+def remember_post_feeds(sender, instance, **kwargs):
+    """
+    Запоминает категорию и автора поста при загрузке, чтобы после
+    их изменения сбросить и старые ленты. Запросов не выполняет.
+    """
+    instance._syndication_ids = (
+        instance.__dict__.get('category_id'),
+        instance.__dict__.get('author_id'),
+    )
+
+
+def post_changed(sender, instance, **kwargs):
+    """
+    Сбрасывает снимки лент, в которые входит (или входил) пост.
+    """
+    old_category, old_author = getattr(
+        instance, '_syndication_ids', (None, None)
+    )
+    invalidate(
+        category_ids={old_category, instance.category_id},
+        author_ids={old_author, instance.author_id},
+    )
+    remember_post_feeds(sender, instance)
+
+
+def category_authors(category):
+    """
+    Возвращает id авторов постов категории.
+    """
+    return set(
+        Post.objects.filter(category_id=category.pk).order_by()
+        .values_list('author_id', flat=True).distinct()
+    )
+
+
+def remember_category_authors(sender, instance, **kwargs):
+    """
+    Запоминает авторов постов категории до удаления (после него
+    у постов уже нет категории).
+    """
+    instance._syndication_authors = category_authors(instance)
+
+
+def category_changed(sender, instance, **kwargs):
+    """
+    Изменение категории меняет ее ленту, подписи постов в общей ленте
+    и ленты авторов ее постов (снятие категории с публикации скрывает
+    их посты).
+    """
+    authors = getattr(instance, '_syndication_authors', None)
+    if authors is None:
+        authors = category_authors(instance)
+    invalidate(categories={instance.slug}, author_ids=authors)
+
+
+def posts_bulk_updated(sender, category_ids=(), author_ids=(), fields=None,
+                       **kwargs):
+    """
+    Массовые операции над постами сбрасывают затронутые снимки:
+    прежних категорий и авторов и новых (при переносе).
+    """
+    fields = fields or {}
+    category_ids = set(category_ids)
+    author_ids = set(author_ids)
+    for ids, name in ((category_ids, 'category'), (author_ids, 'author')):
+        value = fields.get(name, fields.get(f'{name}_id'))
+        if value is not None:
+            ids.add(getattr(value, 'pk', value))
+    invalidate(category_ids=category_ids, author_ids=author_ids)
+
+
+post_init.connect(remember_post_feeds, sender=Post)
+post_save.connect(post_changed, sender=Post)
+post_delete.connect(post_changed, sender=Post)
+post_save.connect(category_changed, sender=Category)
+pre_delete.connect(remember_category_authors, sender=Category)
+post_delete.connect(category_changed, sender=Category)
+posts_bulk_changed.connect(posts_bulk_updated)
+posts_bulk_deleted.connect(posts_bulk_updated)
+
+
+class SyndicationFeedView(View):
+    """
+    Лента RSS/Atom: /feeds/<формат>/, /feeds/<формат>/category/<slug>/,
+    /feeds/<формат>/profile/<username>/.
+    Повторные запросы обходятся одним чтением из кэша; если у клиента
+    актуальная версия (ETag, If-Modified-Since), возвращается 304.
+    """
+
+    def get_feed(self):
+        """
+        Возвращает (вид ленты, значение, QuerySet, заголовок, ссылка).
+        Вызывается только при сборке снимка.
+        """
+        if 'category_slug' in self.kwargs:
+            category = get_object_or_404(
+                Category, slug=self.kwargs['category_slug'], is_published=True
+            )
+            return (
+                'category', category.slug,
+                Post.objects.filter(category=category),
+                f'Блогикум: {category.title}',
+                reverse('blog:category_posts', args=[category.slug]),
+            )
+        if 'username' in self.kwargs:
+            author = get_object_or_404(User, username=self.kwargs['username'])
+            return (
+                'profile', author.username,
+                Post.objects.filter(author=author),
+                f'Блогикум: публикации {author.username}',
+                reverse('blog:profile', args=[author.username]),
+            )
+        return (
+            'index', '', Post.objects.all(), 'Блогикум', reverse('blog:index')
+        )
+
+    def get_snapshot_key(self):
+        """
+        Возвращает ключ снимка по параметрам URL (без запросов к базе).
+        """
+        if 'category_slug' in self.kwargs:
+            return snapshot_key('category', self.kwargs['category_slug'])
+        if 'username' in self.kwargs:
+            return snapshot_key('profile', self.kwargs['username'])
+        return snapshot_key('index')
+
+    def get(self, request, feed_format, **kwargs):
+        if feed_format not in GENERATORS:
+            raise Http404('Неизвестный формат ленты')
+        cache = get_cache()
+        key = self.get_snapshot_key()
+        snapshot = cache.get(key)
+        valid_until = snapshot and snapshot['valid_until']
+        changed = False
+        if snapshot is None or (
+            valid_until and valid_until <= timezone.now().timestamp()
+        ):
+            snapshot = build_snapshot(*self.get_feed())
+            changed = True
+
+        etag = f'"{snapshot["etag"]}-{feed_format}"'
+        if is_not_modified(request, etag, snapshot['last_modified']):
+            response = HttpResponseNotModified()
+        else:
+            body_key = (request.get_host(), feed_format)
+            body = snapshot['bodies'].get(body_key)
+            if body is None:
+                body = render_feed(snapshot, feed_format, request)
+                snapshot['bodies'][body_key] = body
+                changed = True
+            response = HttpResponse(
+                body,
+                content_type=GENERATORS[feed_format].content_type,
+            )
+        if changed:
+            cache.set(
+                key, snapshot, get_setting('TIMEOUT', SYNDICATION_TIMEOUT)
+            )
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(snapshot['last_modified'])
+        return response
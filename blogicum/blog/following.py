@@ -0,0 +1,308 @@
+from django.conf import settings  # Для порога популярности и размера ленты
+
+from django.core.cache import caches  # Количество записей ленты в кэше
+
+from django.db import transaction  # Пачка записей ленты создается атомарно
+
+from django.db.models.signals import (post_delete, post_init,
+                                      post_save)  # Для раскладки постов
+
+from django.utils import timezone  # Отложенные посты не попадают в ленту
+
+from blog.models import AuthorStats, FeedEntry, Follow, Post
+from blog.signals import posts_bulk_changed
+from blog.stats import (change_author_stats, compute_author_stats,
+                        is_being_deleted)
+from blog.tasks import iter_batches, iter_pk_batches, run_in_background
+from blog.utils import published_only
+
+# Авторы, у которых больше подписчиков, не раскладываются во входящие:
+# их посты читаются из таблицы постов при показе ленты
+FEED_FANOUT_LIMIT = 10000
+
+# Сколько последних постов автора попадает в ленту при подписке
+FEED_BACKFILL = 50
+
+# Срок жизни количества записей ленты в кэше (секунды): Paginator
+# не пересчитывает всю ленту на каждой странице
+FEED_COUNT_TIMEOUT = 60
+
+# Поля поста, от которых зависят записи в лентах подписчиков
+TRACKED_FIELDS = ('is_published', 'pub_date', 'author_id')
+
+
+def get_setting(name, default):
+    """
+    Возвращает значение настройки BLOG_FEED_<name> или значение по умолчанию.
+    """
+    return getattr(settings, f'BLOG_FEED_{name}', default)
+
+
+def get_cache():
+    """
+    Возвращает кэш для количества записей ленты (тот же, что у лент).
+    """
+    return caches[getattr(settings, 'BLOG_TIMELINE_CACHE', 'default')]
+
+
+def count_key(user_id):
+    """
+    Возвращает ключ кэша с количеством записей ленты пользователя.
+    """
+    return f'following-count:{user_id}'
+
+
+def forget_count(user_id):
+    """
+    Сбрасывает количество записей ленты пользователя (после подписки
+    или отписки оно меняется сразу на много записей).
+    """
+    get_cache().delete(count_key(user_id))
+
+
+def popular_authors():
+    """
+    Возвращает подзапрос id авторов, посты которых не раскладываются.
+    """
+    return AuthorStats.objects.filter(
+        follower_count__gt=get_setting('FANOUT_LIMIT', FEED_FANOUT_LIMIT)
+    ).values('user_id')
+
+
+def delete_entries(queryset):
+    """
+    Удаляет записи лент пачками (по одному DELETE на пачку).
+    """
+    deleted = 0
+    for entry_ids in iter_pk_batches(queryset):
+        deleted += FeedEntry.objects.filter(pk__in=entry_ids).delete()[0]
+    return deleted
+
+
+def fan_out_post(post_id):
+    """
+    Раскладывает пост во входящие подписчиков автора пачками.
+    Скрытый пост убирается из лент, у перенесенного меняется дата.
+    Повторный вызов безопасен: существующие записи пропускаются.
+    Возвращает количество обработанных подписчиков.
+    """
+    post = Post.objects.filter(pk=post_id, is_published=True).values(
+        'author_id', 'pub_date'
+    ).first()
+    entries = FeedEntry.objects.filter(post_id=post_id)
+    if post is None:
+        delete_entries(entries)
+        return 0
+    # После смены автора пост остается только у подписчиков нового
+    delete_entries(entries.exclude(author_id=post['author_id']))
+    entries.exclude(pub_date=post['pub_date']).update(
+        pub_date=post['pub_date']
+    )
+    if popular_authors().filter(user_id=post['author_id']).exists():
+        return 0
+    followers = 0
+    for batch in iter_batches(
+        Follow.objects.filter(author_id=post['author_id']), 'follower_id'
+    ):
+        with transaction.atomic():
+            FeedEntry.objects.bulk_create(
+                [
+                    FeedEntry(
+                        user_id=follower_id,
+                        post_id=post_id,
+                        author_id=post['author_id'],
+                        pub_date=post['pub_date'],
+                    )
+                    for _, follower_id in batch
+                ],
+                ignore_conflicts=True,
+            )
+        followers += len(batch)
+    return followers
+
+
+def fan_out_posts(post_ids):
+    """
+    Раскладывает (или убирает из лент) несколько постов.
+    """
+    for post_id in post_ids:
+        fan_out_post(post_id)
+
+
+def backfill(follower_id, author_id):
+    """
+    Добавляет в ленту нового подписчика последние посты автора.
+    """
+    forget_count(follower_id)
+    if popular_authors().filter(user_id=author_id).exists():
+        return
+    posts = published_only(
+        Post.objects.filter(author_id=author_id)
+    ).order_by('-pub_date').values_list('pk', 'pub_date')
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(
+                user_id=follower_id, post_id=post_id,
+                author_id=author_id, pub_date=pub_date,
+            )
+            for post_id, pub_date in posts[
+                :get_setting('BACKFILL', FEED_BACKFILL)
+            ]
+        ],
+        ignore_conflicts=True,
+    )
+    forget_count(follower_id)
+
+
+def remove_author(follower_id, author_id):
+    """
+    Убирает посты автора из ленты отписавшегося пользователя.
+    """
+    delete_entries(
+        FeedEntry.objects.filter(user_id=follower_id, author_id=author_id)
+    )
+    forget_count(follower_id)
+
+
+def delete_follows(queryset, on_batch=None):
+    """
+    Удаляет подписки пачками одним DELETE на пачку, без загрузки
+    объектов и сигналов на каждую строку; счетчики подписчиков
+    затронутых авторов пересчитываются после пачки. Записи лент
+    не меняются: используется при удалении пользователя, вместе
+    с которым удаляются и они.
+    on_batch(количество) вызывается после каждой пачки (для прогресса).
+    """
+    deleted = 0
+    for batch in iter_batches(queryset, 'author_id'):
+        follow_ids, author_ids = zip(*batch)
+        with transaction.atomic():
+            follows = Follow.objects.filter(pk__in=follow_ids)
+            count = follows._raw_delete(follows.db)
+            compute_author_stats(author_ids)
+        deleted += count
+        if on_batch is not None:
+            on_batch(count)
+    return deleted
+
+
+def remember_post_state(sender, instance, **kwargs):
+    """
+    Запоминает поля поста, от которых зависят ленты (без запросов).
+    """
+    instance._following_state = tuple(
+        instance.__dict__.get(name) for name in TRACKED_FIELDS
+    )
+
+
+def post_saved(sender, instance, created=False, raw=False, **kwargs):
+    """
+    Новый пост или изменение публикации, даты или автора ставят
+    раскладку по лентам подписчиков в фоновую задачу.
+    """
+    if raw:
+        return
+    old_state = getattr(instance, '_following_state', None)
+    remember_post_state(sender, instance)
+    if created or old_state != instance._following_state:
+        run_in_background(fan_out_post, instance.pk)
+
+
+def posts_bulk_updated(sender, post_ids=(), fields=None, **kwargs):
+    """
+    Массовое снятие с публикации, удаление или перенос постов.
+    """
+    if fields and {
+        'is_published', 'is_deleted', 'pub_date', 'author', 'author_id'
+    } & set(fields):
+        run_in_background(fan_out_posts, list(post_ids))
+
+
+def follow_saved(sender, instance, created=False, raw=False, **kwargs):
+    """
+    Новая подписка увеличивает счетчик автора и добавляет его
+    последние посты в ленту подписчика.
+    """
+    if not created or raw:
+        return
+    change_author_stats(instance.author_id, follower_count=1)
+    run_in_background(backfill, instance.follower_id, instance.author_id)
+
+
+def follow_deleted(sender, instance, **kwargs):
+    """
+    Отписка уменьшает счетчик автора и убирает его посты из ленты.
+    При удалении автора или подписчика записи лент удаляются каскадом,
+    а счетчик удаляемого автора не меняется (см. stats.is_being_deleted).
+    """
+    change_author_stats(instance.author_id, follower_count=-1)
+    if not (
+        is_being_deleted(instance.author_id)
+        or is_being_deleted(instance.follower_id)
+    ):
+        run_in_background(
+            remove_author, instance.follower_id, instance.author_id
+        )
+
+
+post_init.connect(remember_post_state, sender=Post)
+post_save.connect(post_saved, sender=Post)
+posts_bulk_changed.connect(posts_bulk_updated)
+post_save.connect(follow_saved, sender=Follow)
+post_delete.connect(follow_deleted, sender=Follow)
+
+
+class FollowingFeed:
+    """
+    Личная лента для Paginator: записи входящих пользователя
+    (диапазон индекса user, pub_date) и посты популярных авторов,
+    на которых он подписан (они не раскладываются при публикации).
+    Страница - один запрос UNION по индексам и загрузка постов по pk.
+    Количество записей для Paginator хранится в кэше
+    BLOG_FEED_COUNT_TIMEOUT секунд и сбрасывается при подписке
+    и отписке, поэтому вся лента не пересчитывается на каждой странице.
+    """
+
+    model = Post
+    ordered = True
+
+    def __init__(self, user, queryset):
+        self.user_id = user.pk
+        self._count = None
+        # Запрос для загрузки постов (select_related, annotate и т.д.)
+        self.queryset = published_only(queryset)
+        now = timezone.now()
+        inbox = FeedEntry.objects.filter(
+            user=user, pub_date__lte=now
+        ).order_by().values_list('pub_date', 'post_id')
+        pulled = published_only(Post.objects.filter(
+            author_id__in=Follow.objects.filter(
+                follower=user, author_id__in=popular_authors()
+            ).values('author_id')
+        )).order_by().values_list('pub_date', 'pk')
+        # UNION без ALL: пост популярного автора, разложенный раньше,
+        # чем автор стал популярным, не повторяется
+        self.rows = inbox.union(pulled).order_by('-pub_date', '-post_id')
+
+    def count(self):
+        if self._count is None:
+            cache = get_cache()
+            self._count = cache.get(count_key(self.user_id))
+            if self._count is None:
+                self._count = self.rows.count()
+                cache.set(
+                    count_key(self.user_id), self._count,
+                    get_setting('COUNT_TIMEOUT', FEED_COUNT_TIMEOUT),
+                )
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        ids = [post_id for _, post_id in self.rows[index]]
+        posts = self.queryset.in_bulk(ids)
+        # Снятые с публикации после раскладки посты пропускаются
+        return [posts[post_id] for post_id in ids if post_id in posts]
@@ -1,5 +1,11 @@
 from django import forms
 
+# Поле выбора категории и местоположения с вариантами из кэша
+from blog.choices import CachedModelChoiceField
+
+# Поле изображения с проверкой лимитов и перекодированием
+from blog.images import PostImageField
+
 # Импортируем модели, на основе которых будут создаваться формы
 from blog.models import Comment, Post, User
 
@@ -17,6 +23,14 @@ class PostForm(forms.ModelForm):
         
         # Автор будет задаваться автоматически в представлении (view)
         exclude = ('author',)
+
+        # Изображение проверяется и уменьшается перед сохранением,
+        # варианты категории и местоположения читаются из кэша
+        field_classes = {
+            'image': PostImageField,
+            'category': CachedModelChoiceField,
+            'location': CachedModelChoiceField,
+        }
         
         # Кастомизация виджетов (элементов HTML) для полей формы
         widgets = {
@@ -26,6 +40,14 @@ class PostForm(forms.ModelForm):
             )
         }
 
+    def _get_validation_exclusions(self):
+        """
+        Категория и местоположение уже найдены среди вариантов поля,
+        повторная проверка модели (запрос к БД) для них не нужна.
+        """
+        exclude = super()._get_validation_exclusions()
+        return [*exclude, 'category', 'location']
+
 
 # Форма для создания и редактирования комментариев
 class CommentForm(forms.ModelForm):
@@ -0,0 +1,250 @@
+import os  # Для замены расширения имени файла
+
+import time  # Для льготного периода сборщика мусора
+
+from io import BytesIO  # Буфер для перекодированного изображения
+
+from django import forms  # Базовые поля форм
+
+from django.conf import settings  # Для чтения лимитов загрузки
+
+from django.core.exceptions import ValidationError  # Ошибка поля формы
+
+from django.core.files.uploadedfile import SimpleUploadedFile  # Итоговый файл
+
+from django.db.models import (Count, OuterRef, Subquery,
+                              Value)  # Пересчет ссылок одним UPDATE
+
+from django.db.models.functions import Coalesce  # 0 для файлов без ссылок
+
+from django.template.defaultfilters import filesizeformat  # Текст ошибки
+
+from PIL import Image, ImageOps  # Pillow: заголовок, EXIF, сжатие
+
+# Лимиты по умолчанию (переопределяются настройками BLOG_IMAGE_*)
+IMAGE_MAX_BYTES = 10 * 1024 * 1024  # Максимальный размер загружаемого файла
+IMAGE_MAX_PIXELS = 40_000_000  # Максимум пикселей (ширина * высота)
+IMAGE_MAX_SIZE = (1600, 1600)  # Границы сохраняемого изображения
+IMAGE_QUALITY = 85  # Качество JPEG при перекодировании
+
+# Файлы без ссылок удаляются, только если не менялись дольше этого срока
+IMAGE_GC_GRACE_SECONDS = 24 * 60 * 60
+
+# Форматы, которые принимаются на загрузку
+ALLOWED_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+
+
+def get_limit(name, default):
+    """
+    Возвращает значение настройки BLOG_IMAGE_<name> или значение по умолчанию.
+    """
+    return getattr(settings, f'BLOG_IMAGE_{name}', default)
+
+
+def open_image(uploaded):
+    """
+    Открывает загруженный файл в Pillow без копирования в память.
+    Крупные загрузки Django сохраняет во временный файл
+    (FILE_UPLOAD_MAX_MEMORY_SIZE), тогда Pillow читает его с диска.
+    Image.open читает только заголовок, пиксели еще не декодируются.
+    """
+    if hasattr(uploaded, 'temporary_file_path'):
+        return Image.open(uploaded.temporary_file_path())
+    uploaded.seek(0)
+    return Image.open(uploaded)
+
+
+def check_image(image):
+    """
+    Проверяет формат и размеры изображения по заголовку, до декодирования.
+    """
+    if image.format not in ALLOWED_FORMATS:
+        raise ValidationError(
+            'Поддерживаются только изображения JPEG, PNG, GIF и WebP.',
+            code='invalid_image_format',
+        )
+    width, height = image.size
+    if width * height > get_limit('MAX_PIXELS', IMAGE_MAX_PIXELS):
+        raise ValidationError(
+            'Слишком большое разрешение изображения: %(width)s×%(height)s.',
+            code='image_too_many_pixels',
+            params={'width': width, 'height': height},
+        )
+
+
+def reencode_image(image, max_size=None, quality=None):
+    """
+    Уменьшает изображение до max_size и перекодирует его.
+    Для JPEG draft() декодирует файл сразу в уменьшенном масштабе,
+    поэтому полный растр большого снимка в памяти не создается.
+    Поворот из EXIF применяется к пикселям, сами метаданные (EXIF,
+    геотеги) в результат не попадают.
+    Возвращает (данные, расширение, content_type).
+    """
+    max_size = max_size or get_limit('MAX_SIZE', IMAGE_MAX_SIZE)
+    quality = quality or get_limit('QUALITY', IMAGE_QUALITY)
+    image.draft('RGB', max_size)
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail(max_size, Image.Resampling.LANCZOS)
+    output = BytesIO()
+    has_alpha = image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+    if has_alpha:
+        # Прозрачность сохраняется только в PNG
+        image.save(output, 'PNG', optimize=True)
+        return output.getvalue(), '.png', 'image/png'
+    image.convert('RGB').save(
+        output, 'JPEG', quality=quality, optimize=True, progressive=True
+    )
+    return output.getvalue(), '.jpg', 'image/jpeg'
+
+
+def process_upload(uploaded):
+    """
+    Проверяет загруженное изображение и возвращает перекодированный файл.
+    Порядок проверок выбран так, чтобы отсеять файл как можно раньше:
+    размер в байтах, затем формат и разрешение по заголовку,
+    и только потом декодирование.
+    """
+    max_bytes = get_limit('MAX_BYTES', IMAGE_MAX_BYTES)
+    if uploaded.size > max_bytes:
+        raise ValidationError(
+            'Размер файла не должен превышать %(max)s.',
+            code='image_too_large',
+            params={'max': filesizeformat(max_bytes)},
+        )
+    try:
+        with open_image(uploaded) as image:
+            check_image(image)
+            data, extension, content_type = reencode_image(image)
+    except ValidationError:
+        raise
+    except (OSError, ValueError, SyntaxError,
+            Image.DecompressionBombError) as exc:
+        raise ValidationError(
+            forms.ImageField.default_error_messages['invalid_image'],
+            code='invalid_image',
+        ) from exc
+    name = os.path.splitext(os.path.basename(uploaded.name))[0] + extension
+    return SimpleUploadedFile(name, data, content_type=content_type)
+
+
+class PostImageField(forms.ImageField):
+    """
+    Поле изображения поста: проверка лимитов до декодирования
+    и сохранение уменьшенной копии без метаданных.
+    """
+
+    def to_python(self, data):
+        """
+        Заменяет стандартную проверку ImageField, которая копирует
+        загрузку в память и сохраняет файл как есть.
+        """
+        uploaded = forms.FileField.to_python(self, data)
+        if uploaded is None:
+            return None
+        return process_upload(uploaded)
+
+
+def refcount_subquery():
+    """
+    Возвращает подзапрос с количеством постов, ссылающихся на ImageBlob.
+    """
+    from blog.models import Post
+
+    # Учитываются и посты, ожидающие фонового удаления
+    references = Post._base_manager.filter(
+        image=OuterRef('name')
+    ).order_by().values('image').annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(references), Value(0))
+
+
+def update_image_refcounts(names):
+    """
+    Пересчитывает счетчики ссылок для файлов names по таблице постов.
+    Счетчик не увеличивается и не уменьшается, а вычисляется заново,
+    поэтому одновременные сохранения не портят его.
+    """
+    from blog.models import ImageBlob
+
+    names = {name for name in names if name}
+    if not names:
+        return
+    ImageBlob.objects.bulk_create(
+        [ImageBlob(name=name) for name in names], ignore_conflicts=True
+    )
+    ImageBlob.objects.filter(name__in=names).update(
+        refcount=refcount_subquery()
+    )
+
+
+def recount_image_blobs():
+    """
+    Пересчитывает счетчики ссылок всех файлов одним UPDATE.
+    Нужен после массовых операций, которые обходят save() и сигналы.
+    """
+    from blog.models import ImageBlob
+
+    return ImageBlob.objects.update(refcount=refcount_subquery())
+
+
+def collect_image_garbage(grace_seconds=None, dry_run=False):
+    """
+    Удаляет файлы изображений, на которые не ссылается ни один пост.
+    Файл, измененный или повторно загруженный позже льготного периода,
+    не удаляется: его может использовать еще не сохраненный пост.
+    Возвращает список имен удаленных файлов.
+    """
+    from blog.models import ImageBlob, Post
+
+    if grace_seconds is None:
+        grace_seconds = get_limit('GC_GRACE_SECONDS', IMAGE_GC_GRACE_SECONDS)
+    storage = Post._meta.get_field('image').storage
+    threshold = time.time() - grace_seconds
+    recount_image_blobs()
+    deleted = []
+    for blob in ImageBlob.objects.filter(refcount=0).iterator():
+        if storage.exists(blob.name):
+            if os.path.getmtime(storage.path(blob.name)) > threshold:
+                continue
+            if not dry_run:
+                storage.delete(blob.name)
+        if not dry_run:
+            blob.delete()
+        deleted.append(blob.name)
+    return deleted
+
+
+def migrate_images_to_content_hash(queryset, delete_old=False,
+                                   batch_size=None):
+    """
+    Переносит изображения постов в хранилище с именами по хэшу.
+    Файл копируется под новым именем, посты со старым именем
+    обновляются одним UPDATE. Одинаковые файлы становятся одним.
+    Возвращает количество перенесенных файлов.
+    """
+    from blog.models import Post
+    from blog.tasks import iter_batches
+    from core.storage import is_content_hashed
+
+    storage = Post._meta.get_field('image').storage
+    migrated = 0
+    for batch in iter_batches(
+        queryset.exclude(image=''), 'image', batch_size=batch_size
+    ):
+        renamed = {}
+        for _, name in batch:
+            if name in renamed or is_content_hashed(name):
+                continue
+            if not storage.exists(name):
+                continue
+            with storage.open(name) as content:
+                renamed[name] = storage.save(name, content)
+        for old_name, new_name in renamed.items():
+            Post.objects.filter(image=old_name).update(image=new_name)
+            if delete_old:
+                storage.delete(old_name)
+        update_image_refcounts({*renamed, *renamed.values()})
+        migrated += len(renamed)
+    return migrated
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from blog.images import collect_image_garbage
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает ссылки на файлы изображений постов и удаляет '
+        'файлы, которые не использует ни один пост.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-seconds', type=int, default=None,
+            help='Не удалять файлы, измененные позже указанного срока.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только вывести файлы, которые будут удалены.',
+        )
+
+    def handle(self, *args, **options):
+        deleted = collect_image_garbage(
+            grace_seconds=options['grace_seconds'],
+            dry_run=options['dry_run'],
+        )
+        for name in deleted:
+            self.stdout.write(name)
+        self.stdout.write(f'Удалено файлов: {len(deleted)}')
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from blog.images import migrate_images_to_content_hash, recount_image_blobs
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит загруженные ранее изображения постов в хранилище '
+        'с именами по хэшу содержимого и объединяет одинаковые файлы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--delete-old', action='store_true',
+            help='Удалить файлы со старыми именами после переноса.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Количество постов в одной пачке.',
+        )
+
+    def handle(self, *args, **options):
+        migrated = migrate_images_to_content_hash(
+            Post.objects.all(),
+            delete_old=options['delete_old'],
+            batch_size=options['batch_size'],
+        )
+        recount_image_blobs()
+        self.stdout.write(f'Перенесено файлов: {migrated}')
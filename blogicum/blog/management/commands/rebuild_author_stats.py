@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from blog.stats import compute_author_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает статистику всех авторов (количество публикаций, '
+        'комментариев и дату последней публикации).'
+    )
+
+    def handle(self, *args, **options):
+        saved = compute_author_stats()
+        self.stdout.write(f'Сохранено записей: {saved}')
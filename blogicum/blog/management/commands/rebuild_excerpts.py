@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import Post
+from blog.rendering import rebuild_excerpts
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает краткий текст (excerpt) всех постов пачками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Количество постов в одной пачке.',
+        )
+
+    def handle(self, *args, **options):
+        processed = rebuild_excerpts(
+            Post.objects.all(), batch_size=options['batch_size']
+        )
+        self.stdout.write(f'Обработано постов: {processed}')
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.related import is_available, rebuild_related_posts
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает похожие посты всех публикаций (TF-IDF заголовка '
+        'и текста, категория и местоположение). Нужны numpy и scipy.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--block-size', type=int, default=None,
+            help='Количество постов, сравниваемых за одно умножение матриц.',
+        )
+
+    def handle(self, *args, **options):
+        if not is_available():
+            raise CommandError(
+                'Для расчета похожих постов установите numpy и scipy.'
+            )
+        processed = rebuild_related_posts(block_size=options['block_size'])
+        self.stdout.write(f'Обработано постов: {processed}')
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import Comment, Post
+from blog.rendering import RENDERER_VERSION, rebuild_rendered_text
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает сохраненный HTML текста постов и комментариев, '
+        'собранный устаревшей версией отрисовки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересобрать HTML всех объектов, а не только устаревших.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Количество объектов в одной пачке.',
+        )
+
+    def handle(self, *args, **options):
+        for model in (Post, Comment):
+            queryset = model.objects.all()
+            if not options['all']:
+                queryset = queryset.exclude(
+                    rendered__version=RENDERER_VERSION
+                )
+            processed = rebuild_rendered_text(
+                queryset, batch_size=options['batch_size']
+            )
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: обработано {processed}'
+            )
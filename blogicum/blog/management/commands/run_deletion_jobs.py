@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from blog.deletion import resume_deletion_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет незавершенные фоновые удаления постов и пользователей '
+        '(например, прерванные перезапуском процесса).'
+    )
+
+    def handle(self, *args, **options):
+        count = resume_deletion_jobs()
+        self.stdout.write(f'Выполнено задач: {count}')
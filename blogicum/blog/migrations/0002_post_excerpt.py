@@ -0,0 +1,25 @@
+# Generated by Django 3.2.16 on 2026-10-19 08:47
+
+from django.db import migrations, models
+
+
+def fill_excerpts(apps, schema_editor):
+    from blog.rendering import rebuild_excerpts
+
+    rebuild_excerpts(apps.get_model('blog', 'Post').objects.all())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.TextField(blank=True, editable=False, verbose_name='Краткий текст'),
+        ),
+        migrations.RunPython(fill_excerpts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 3.2.16 on 2026-10-19 08:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_rendered_text(apps, schema_editor):
+    from blog.rendering import rebuild_rendered_text
+
+    for model_name in ('Post', 'Comment'):
+        rebuild_rendered_text(apps.get_model('blog', model_name).objects.all())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_post_excerpt'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RenderedCommentText',
+            fields=[
+                ('html', models.TextField(verbose_name='HTML')),
+                ('version', models.PositiveSmallIntegerField(verbose_name='Версия отрисовки')),
+                ('comment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rendered', serialize=False, to='blog.comment')),
+            ],
+            options={
+                'verbose_name': 'HTML комментария',
+                'verbose_name_plural': 'HTML комментариев',
+            },
+        ),
+        migrations.CreateModel(
+            name='RenderedPostText',
+            fields=[
+                ('html', models.TextField(verbose_name='HTML')),
+                ('version', models.PositiveSmallIntegerField(verbose_name='Версия отрисовки')),
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rendered', serialize=False, to='blog.post')),
+            ],
+            options={
+                'verbose_name': 'HTML публикации',
+                'verbose_name_plural': 'HTML публикаций',
+            },
+        ),
+        migrations.RunPython(fill_rendered_text, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.16 on 2026-10-19 09:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_deletion_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='view_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='Просмотры'),
+        ),
+    ]
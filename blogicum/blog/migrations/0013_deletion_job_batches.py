@@ -0,0 +1,23 @@
+# Generated by Django 3.2.16 on 2026-10-19 10:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0012_likes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deletionjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Последняя активность'),
+        ),
+        migrations.AddField(
+            model_name='deletionjob',
+            name='object_ids',
+            field=models.JSONField(blank=True, default=list, verbose_name='ID объектов'),
+        ),
+    ]
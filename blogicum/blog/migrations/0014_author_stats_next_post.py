@@ -0,0 +1,25 @@
+# Generated by Django 3.2.16 on 2026-10-19 10:13
+
+from django.db import migrations, models
+
+
+def fill_author_stats(apps, schema_editor):
+    from blog.stats import compute_author_stats
+
+    compute_author_stats(stats_model=apps.get_model('blog', 'AuthorStats'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0013_deletion_job_batches'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authorstats',
+            name='next_post_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Следующая публикация'),
+        ),
+        migrations.RunPython(fill_author_stats, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,6 @@
-from django.db.models import Count  # Для агрегации и подсчета количества комментариев
+from django.conf import settings  # Для выбора движка шаблонов ленты
+
+from django.db.models import BooleanField, Count, ExpressionWrapper, Q  # Агрегация и проверка автора в SQL
 
 from django.shortcuts import redirect  # Для перенаправления пользователя на другую страницу
 
@@ -7,6 +9,12 @@ from django.urls import reverse  # Для генерации URL-адресов
 # Импортируем модели из текущего приложения
 from blog.models import Comment, Post
 
+# Ограничение частоты запросов на запись
+from blog.ratelimit import check_rate_limit, rate_limited_response
+
+# Отметки «нравится» текущего пользователя
+from blog.reactions import liked_ids
+
 # Константа для количества элементов на странице при пагинации
 PAGE_PAGINATOR = 10
 
@@ -26,6 +34,19 @@ class CustomListMixin: #--- 8 10 2.7
     # Количество постов на одной странице при пагинации
     paginate_by = PAGE_PAGINATOR
 
+    # Движок шаблонов для этой ленты ('jinja2' или None для шаблонов Django).
+    # Если не задан, используется настройка BLOG_FEED_TEMPLATE_ENGINE.
+    feed_template_engine = None
+
+    @property
+    def template_engine(self):
+        """
+        Возвращает имя движка шаблонов, которым отрисовывается лента.
+        """
+        return self.feed_template_engine or getattr(
+            settings, 'BLOG_FEED_TEMPLATE_ENGINE', None
+        )
+
     def get_queryset(self): # --- 10 2.7
         """
         Возвращает оптимизированный QuerySet постов.
@@ -36,6 +57,9 @@ class CustomListMixin: #--- 8 10 2.7
             'category', 
             'location',
             'author'    
+        ).defer(
+            # Карточкам ленты нужен только краткий текст (excerpt)
+            'text'
         ).annotate(
             # Добавляем поле comment_count с количеством комментариев для каждого поста
             comment_count=Count('comments') 
@@ -44,8 +68,85 @@ class CustomListMixin: #--- 8 10 2.7
         # Сортируем посты согласно настройкам в модели Post
         return queryset.order_by(*Post._meta.ordering)
 
+    def get_context_data(self, **kwargs):
+        """
+        Отмечает посты страницы, которые нравятся пользователю:
+        один запрос (или чтение из кэша) на страницу. Количество
+        отметок берется из столбца like_count без соединений.
+        """
+        context = super().get_context_data(**kwargs)
+        page = context.get('page_obj') or ()
+        liked = liked_ids(
+            self.request.user, 'post', [post.pk for post in page]
+        )
+        for post in page:
+            post.is_liked = post.pk in liked
+        return context
+
 
-class PostChangeMixin: # --- 6 15
+class RateLimitMixin:
+    """
+    Миксин для ограничения частоты создания объектов пользователем.
+    Ограничиваются только POST-запросы авторизованных пользователей;
+    проверка выполняется до обработки формы и не обращается к БД.
+    """
+
+    # Имя области лимита (ключ в настройке BLOG_RATE_LIMITS)
+    rate_limit_scope = None
+
+    # Лимит по умолчанию, если он не задан в настройках (например, '10/m')
+    rate_limit = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if (
+            request.method == 'POST'
+            and self.rate_limit_scope
+            and request.user.is_authenticated
+        ):
+            retry_after = check_rate_limit(
+                self.rate_limit_scope, request.user, self.rate_limit
+            )
+            if retry_after:
+                # Лимит исчерпан - возвращаем 429 с заголовком Retry-After
+                return rate_limited_response(request, retry_after)
+        return super().dispatch(request, *args, **kwargs)
+
+
+class OwnedObjectMixin:
+    """
+    Миксин для представлений изменения объекта с автором.
+    Объект загружается один раз за запрос: повторные вызовы get_object()
+    (из dispatch, get, post) возвращают уже загруженный объект.
+    Принадлежность текущему пользователю вычисляется в том же запросе
+    (аннотация is_owner), без обращения к связанному автору.
+    """
+
+    # Поле модели со ссылкой на автора
+    owner_field = 'author'
+
+    def get_queryset(self):
+        """
+        Добавляет к QuerySet признак is_owner: автор - текущий пользователь.
+        """
+        return super().get_queryset().annotate(
+            is_owner=ExpressionWrapper(
+                Q(**{self.owner_field: self.request.user.pk}),
+                output_field=BooleanField(),
+            )
+        )
+
+    def get_object(self, queryset=None):
+        """
+        Возвращает объект, загруженный при первом вызове.
+        """
+        if queryset is not None:
+            return super().get_object(queryset)
+        if not hasattr(self, '_owned_object'):
+            self._owned_object = super().get_object()
+        return self._owned_object
+
+
+class PostChangeMixin(OwnedObjectMixin): # --- 6 15
     """
     Миксин для представлений изменения постов (редактирование, удаление).
     Обеспечивает проверку прав доступа: только автор поста может его изменять.
@@ -60,14 +161,21 @@ class PostChangeMixin: # --- 6 15
     # Имя параметра URL, который содержит идентификатор поста
     pk_url_kwarg = 'post_id'
 
+    def get_queryset(self):
+        """
+        Местоположение выводится на странице удаления - загружаем его
+        тем же запросом.
+        """
+        return super().get_queryset().select_related('location')
+
     def dispatch(self, request, *args, **kwargs): # --- 15
         """
         Переопределяем метод dispatch для проверки прав доступа.
         Вызывается перед вызовом любого HTTP-метода (GET, POST и т.д.).
         """
         
-        # Получаем объект поста и проверяем его автора
-        if self.get_object().author != request.user:
+        # Получаем объект поста (один раз за запрос) и проверяем автора
+        if not self.get_object().is_owner:
             # Если пользователь не автор - перенаправляем на страницу поста
             return redirect('blog:post_detail', self.kwargs['post_id'])
         
@@ -75,7 +183,7 @@ class PostChangeMixin: # --- 6 15
         return super().dispatch(request, *args, **kwargs)
 
 
-class CommentChangeMixin:
+class CommentChangeMixin(OwnedObjectMixin):
     """
     Миксин для представлений изменения комментариев (редактирование, удаление).
     Обеспечивает проверку прав доступа: только автор комментария может его изменять.
@@ -91,9 +199,15 @@ class CommentChangeMixin:
     # Имя параметра URL, который содержит идентификатор комментария
     pk_url_kwarg = 'comment_id'
 
+    def get_queryset(self):
+        """
+        Комментарий ищется только среди комментариев поста из URL.
+        """
+        return super().get_queryset().filter(post_id=self.kwargs['post_id'])
+
     def dispatch(self, request, *args, **kwargs):
 
-        if self.get_object().author != request.user:
+        if not self.get_object().is_owner:
 
             return redirect('blog:post_detail', self.kwargs['post_id'])
         
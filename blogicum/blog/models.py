@@ -2,9 +2,19 @@ from django.contrib.auth import get_user_model
 
 from django.db import models
 
+from django.db.models.signals import post_delete  # Для пересчета ссылок на изображения при удалении
+
+from django.utils.safestring import mark_safe  # Для вывода сохраненного HTML без экранирования
+
 # Добавляет общие поля is_published и created_at
 from core.models import PublishedModel
 
+# Хранилище изображений с именами по хэшу содержимого (без дубликатов)
+from core.storage import post_images_storage
+
+# Предварительная подготовка текста для отображения
+from blog.rendering import RENDERER_VERSION, make_excerpt, render_text
+
 # Получаем активную модель пользователя (стандартную User или кастомную)
 User = get_user_model()
 
@@ -72,7 +82,110 @@ class Category(PublishedModel):
 
 
 
-class Post(PublishedModel): #---
+def fields_without_counters(instance, counters):
+    """
+    Возвращает загруженные поля объекта для save(update_fields=...)
+    без счетчиков, которые обновляются пачками в обход save().
+    """
+    return [
+        field.name for field in instance._meta.concrete_fields
+        if not field.primary_key
+        and field.attname in instance.__dict__
+        and field.name not in counters
+    ]
+
+
+def is_saved_update(instance, kwargs):
+    """
+    Проверяет, что save() обновляет загруженный объект целиком
+    (без update_fields и force_insert).
+    """
+    return (
+        not instance._state.adding
+        and instance.pk is not None
+        and kwargs.get('update_fields') is None
+        and not kwargs.get('force_insert')
+    )
+
+
+class RenderedTextModel(models.Model):
+    """
+    Абстрактная модель для объектов с полем text, HTML которого
+    собирается один раз при сохранении, а не при каждом просмотре.
+    Готовый HTML хранится в отдельной таблице (связь rendered).
+    """
+
+    class Meta:
+        abstract = True
+
+    @property
+    def rendered_text(self):
+        """
+        Возвращает HTML текста для вывода в шаблоне.
+        Если HTML не сохранен или собран устаревшей версией,
+        текст отрисовывается заново.
+        """
+        rendered = getattr(self, 'rendered', None)
+        if rendered is not None and rendered.version == RENDERER_VERSION:
+            return mark_safe(rendered.html)
+        return render_text(self.text)
+
+    def update_rendered_fields(self):
+        """
+        Пересчитывает производные от text поля самой модели.
+        Возвращает имена пересчитанных полей.
+        """
+        return []
+
+    def save_rendered_text(self, created=False):
+        """
+        Сохраняет HTML текста в связанную таблицу.
+        Для нового объекта строка вставляется без предварительного поиска.
+        """
+        relation = self._meta.get_field('rendered')
+        values = {
+            'html': render_text(self.text),
+            'version': RENDERER_VERSION,
+        }
+        if created:
+            self.rendered = relation.related_model.objects.create(
+                **{relation.field.name: self}, **values
+            )
+            return
+        self.rendered, _ = relation.related_model.objects.update_or_create(
+            **{relation.field.name: self}, defaults=values,
+        )
+
+    def save(self, *args, **kwargs):
+        """
+        Пересчитывает производные данные, если изменяется текст.
+        """
+        update_fields = kwargs.get('update_fields')
+        text_changed = update_fields is None or 'text' in update_fields
+        created = self._state.adding and self.pk is None
+        if text_changed:
+            rendered_fields = self.update_rendered_fields()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, *rendered_fields}
+        super().save(*args, **kwargs)
+        if text_changed:
+            self.save_rendered_text(created=created)
+
+
+
+class PostManager(models.Manager):
+    """
+    Менеджер постов по умолчанию: посты, ожидающие фонового удаления
+    (is_deleted), скрыты из всех выборок сайта и админки.
+    Полный набор строк доступен через Post._base_manager.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
+
+
+class Post(PublishedModel, RenderedTextModel): #---
     """
     Основная модель для хранения публикаций (постов) в блоге.
     Содержит основной контент блога.
@@ -86,6 +199,14 @@ class Post(PublishedModel): #---
     
     # Поле для основного текста поста
     text = models.TextField('Текст')
+
+    # Краткий текст для карточек ленты, вычисляется при сохранении,
+    # чтобы лента не загружала полный текст каждого поста
+    excerpt = models.TextField(
+        'Краткий текст',
+        blank=True,
+        editable=False,
+    )
     
     # Поле для даты и времени публикации поста
     pub_date = models.DateTimeField(
@@ -127,8 +248,33 @@ class Post(PublishedModel): #---
         'Изображение',
         upload_to='post_images',  # Папка для загрузки изображений
         blank=True,  # Изображение не обязательно
+        storage=post_images_storage,  # Одинаковые файлы хранятся один раз
+    )
+
+    # Пост скрыт и удаляется в фоне вместе с комментариями (blog.deletion)
+    is_deleted = models.BooleanField(
+        'Удаляется',
+        default=False,
+        editable=False,
+    )
+
+    # Количество просмотров; увеличивается пачками (blog.counters)
+    view_count = models.PositiveIntegerField(
+        'Просмотры',
+        default=0,
+        editable=False,
+        db_index=True,
+    )
+
+    # Количество отметок «нравится»; пересчитывается пачками (blog.reactions)
+    like_count = models.PositiveBigIntegerField(
+        'Отметки «нравится»',
+        default=0,
+        editable=False,
     )
 
+    objects = PostManager()
+
 
     class Meta:
         # Настройки отображения модели в админке
@@ -143,9 +289,48 @@ class Post(PublishedModel): #---
     def __str__(self):
         return self.title[:SYMBOL_CONSTRAINT]
 
+    def update_rendered_fields(self):
+        """
+        Дополнительно пересчитывает краткий текст для карточек ленты.
+        """
+        self.excerpt = make_excerpt(self.text)
+        return ['excerpt']
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Запоминает имя изображения из базы, чтобы при сохранении
+        пересчитать ссылки и на старый, и на новый файл.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_image = instance.__dict__.get('image')
+        return instance
 
+    def save(self, *args, **kwargs):
+        """
+        Обновляет счетчики ссылок на файлы, если изменилось изображение.
+        Счетчики просмотров и отметок при сохранении загруженного поста
+        не перезаписываются: их меняют только blog.counters
+        и blog.reactions.
+        """
+        if is_saved_update(self, kwargs):
+            kwargs['update_fields'] = fields_without_counters(
+                self, ('view_count', 'like_count')
+            )
+        super().save(*args, **kwargs)
+        if 'image' not in self.__dict__:
+            # Поле отложено (defer) и не менялось
+            return
+        old_name = str(getattr(self, '_loaded_image', None) or '')
+        new_name = self.image.name or ''
+        if self._state.adding or old_name != new_name:
+            from blog.images import update_image_refcounts
+            update_image_refcounts({old_name, new_name})
+        self._loaded_image = new_name
 
-class Comment(PublishedModel): #---
+
+
+class Comment(PublishedModel, RenderedTextModel): #---
     """
     Модель для хранения комментариев к постам.
     Пользователи могут комментировать посты.
@@ -166,6 +351,38 @@ class Comment(PublishedModel): #---
         on_delete=models.CASCADE,
     )#---
 
+    # Комментарий, на который это ответ (удаляется вместе с ветвью)
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='replies',
+        verbose_name='Ответ на',
+    )
+
+    # Материализованный путь: id предков и самого комментария
+    # (см. blog.threads); сортировка по нему дает ветви подряд
+    path = models.CharField(
+        'Путь в ветке',
+        max_length=255,
+        blank=True,
+        editable=False,
+    )
+
+    # Уровень вложенности (0 - комментарий к посту)
+    depth = models.PositiveSmallIntegerField(
+        'Уровень', default=0, editable=False
+    )
+
+    # Количество отметок «нравится»; пересчитывается пачками (blog.reactions)
+    like_count = models.PositiveBigIntegerField(
+        'Отметки «нравится»',
+        default=0,
+        editable=False,
+    )
+
 
     class Meta:
         # Сортировка комментариев: по дате
@@ -177,10 +394,431 @@ class Comment(PublishedModel): #---
         # Имя обратной связи для связанных моделей
         default_related_name = 'comments'
 
+        # Индексы для выборки свежих комментариев (рейтинг обсуждаемых
+        # постов) и ветвей обсуждения поста по пути
+        indexes = (
+            models.Index(fields=('created_at',), name='comment_created_idx'),
+            models.Index(fields=('post', 'path'), name='comment_path_idx'),
+        )
+
     def __str__(self):
         """
         Строковое представление объекта для удобного отображения.
         Возвращает информацию о посте, авторе и первые 20 символов текста.
         """
         return (f'Пост {self.pk}, комментарий от пользователя {self.author}, '
-                f'текст: {self.text[:LIMIT_FOR_COMMENT_TITLE]}')
\ No newline at end of file
+                f'текст: {self.text[:LIMIT_FOR_COMMENT_TITLE]}')
+
+    def save(self, *args, **kwargs):
+        """
+        Новый комментарий получает путь в ветке: путь родителя
+        и собственный id (он известен только после вставки).
+        Счетчик отметок при сохранении загруженного комментария
+        не перезаписывается.
+        """
+        created = self._state.adding and self.pk is None
+        if is_saved_update(self, kwargs):
+            kwargs['update_fields'] = fields_without_counters(
+                self, ('like_count',)
+            )
+        super().save(*args, **kwargs)
+        if created and not self.path:
+            from blog.threads import assign_path
+            assign_path(self)
+
+
+class RenderedText(models.Model):
+    """
+    Абстрактная модель сохраненного HTML текста поста или комментария.
+    """
+
+    # Экранированный HTML текста (переводы строк заменены на <br>)
+    html = models.TextField('HTML')
+
+    # Версия функции отрисовки, которой собран HTML
+    version = models.PositiveSmallIntegerField('Версия отрисовки')
+
+    class Meta:
+        abstract = True
+
+
+class RenderedPostText(RenderedText):
+    """
+    HTML текста поста для страницы публикации.
+    """
+
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='rendered',
+    )
+
+    class Meta:
+        verbose_name = 'HTML публикации'
+        verbose_name_plural = 'HTML публикаций'
+
+
+class RenderedCommentText(RenderedText):
+    """
+    HTML текста комментария для страницы публикации.
+    """
+
+    comment = models.OneToOneField(
+        Comment,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='rendered',
+    )
+
+    class Meta:
+        verbose_name = 'HTML комментария'
+        verbose_name_plural = 'HTML комментариев'
+
+
+class ImageBlob(models.Model):
+    """
+    Файл изображения в хранилище с именами по хэшу содержимого.
+    На один файл могут ссылаться несколько постов, refcount хранит
+    их количество. Файлы без ссылок удаляет команда gc_post_images.
+    """
+
+    # Имя файла в хранилище (как в Post.image)
+    name = models.CharField('Имя файла', max_length=255, unique=True)
+
+    # Количество постов, использующих файл
+    refcount = models.PositiveIntegerField('Количество ссылок', default=0)
+
+    class Meta:
+        verbose_name = 'файл изображения'
+        verbose_name_plural = 'Файлы изображений'
+
+    def __str__(self):
+        return f'{self.name} ({self.refcount})'
+
+
+class AuthorStats(models.Model):
+    """
+    Сводные данные автора для страницы профиля. Обновляются
+    при публикации постов и комментариев (см. blog.stats), поэтому
+    страница профиля не пересчитывает их по постам автора.
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='blog_stats',
+        verbose_name='Автор',
+    )
+
+    # Количество опубликованных постов автора
+    post_count = models.PositiveIntegerField('Публикаций', default=0)
+
+    # Количество комментариев к постам автора
+    comment_count = models.PositiveIntegerField(
+        'Комментариев к публикациям', default=0
+    )
+
+    # Дата публикации последнего опубликованного поста
+    last_post_at = models.DateTimeField(
+        'Последняя публикация', null=True, blank=True
+    )
+
+    # Количество подписчиков автора
+    follower_count = models.PositiveIntegerField('Подписчиков', default=0)
+
+    # Дата ближайшего отложенного поста: когда она наступает,
+    # статистика пересчитывается (см. blog.stats.refresh_due_stats)
+    next_post_at = models.DateTimeField(
+        'Следующая публикация', null=True, blank=True, db_index=True
+    )
+
+    class Meta:
+        verbose_name = 'статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self):
+        return f'{self.user}: {self.post_count}'
+
+
+class DeletionJob(models.Model):
+    """
+    Фоновое удаление постов или пользователей вместе с зависимыми
+    строками. Объекты скрываются сразу, а комментарии и посты
+    удаляются пачками (см. blog.deletion); deleted показывает,
+    сколько строк уже удалено из total. Одна задача удаляет все
+    объекты, выбранные вместе (object_ids).
+    """
+
+    POST = 'post'
+    USER = 'user'
+    TARGETS = (
+        (POST, 'Публикация'),
+        (USER, 'Пользователь'),
+    )
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'Ожидает'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Завершено'),
+        (FAILED, 'Ошибка'),
+    )
+
+    target = models.CharField('Объект', max_length=16, choices=TARGETS)
+    object_id = models.PositiveBigIntegerField('ID объекта')
+    object_ids = models.JSONField('ID объектов', default=list, blank=True)
+    title = models.CharField('Название', max_length=256, blank=True)
+    status = models.CharField(
+        'Состояние', max_length=16, choices=STATUSES, default=PENDING
+    )
+
+    # Время последнего продвижения задачи: задача в состоянии running
+    # без продвижения дольше аренды считается прерванной
+    heartbeat_at = models.DateTimeField(
+        'Последняя активность', null=True, blank=True
+    )
+
+    # Оценка количества строк (комментарии, посты, сам объект)
+    total = models.PositiveIntegerField('Всего строк', default=0)
+    deleted = models.PositiveIntegerField('Удалено строк', default=0)
+
+    error = models.TextField('Ошибка', blank=True)
+    created_at = models.DateTimeField('Создано', auto_now_add=True)
+    finished_at = models.DateTimeField('Завершено', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'фоновое удаление'
+        verbose_name_plural = 'Фоновые удаления'
+        ordering = ('-created_at',)
+
+    def __str__(self):
+        return f'{self.get_target_display()} {self.object_id}: {self.status}'
+
+    @property
+    def progress(self):
+        """
+        Возвращает долю удаленных строк в процентах.
+        """
+        if self.status == self.DONE:
+            return 100
+        if not self.total:
+            return 0
+        return min(99, self.deleted * 100 // self.total)
+
+
+class RelatedPost(models.Model):
+    """
+    Похожий пост: ближайшие соседи поста по TF-IDF заголовка и текста
+    с учетом категории и местоположения. Вычисляются заранее
+    (см. blog.related), страница поста читает их одним запросом.
+    """
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='related_links',
+        verbose_name='Публикация',
+    )
+    related = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='related_to',
+        verbose_name='Похожая публикация',
+    )
+
+    # Косинусное сходство векторов постов
+    score = models.FloatField('Сходство')
+
+    # Место в списке похожих (0 - самый похожий)
+    rank = models.PositiveSmallIntegerField('Место')
+
+    class Meta:
+        verbose_name = 'похожая публикация'
+        verbose_name_plural = 'Похожие публикации'
+        ordering = ('post', 'rank')
+        constraints = (
+            models.UniqueConstraint(
+                fields=('post', 'related'), name='unique_related_post'
+            ),
+        )
+        indexes = (
+            models.Index(fields=('post', 'rank'), name='related_post_rank_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.post_id} -> {self.related_id} ({self.score:.3f})'
+
+
+class Follow(models.Model):
+    """
+    Подписка пользователя на автора. Новые посты автора раскладываются
+    во входящие подписчиков (см. blog.following).
+    """
+
+    follower = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='following',
+        verbose_name='Подписчик',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='followers',
+        verbose_name='Автор',
+    )
+    created_at = models.DateTimeField('Создано', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'подписка'
+        verbose_name_plural = 'Подписки'
+        ordering = ('-created_at',)
+        constraints = (
+            models.UniqueConstraint(
+                fields=('follower', 'author'), name='unique_follow'
+            ),
+            models.CheckConstraint(
+                check=~models.Q(follower=models.F('author')),
+                name='follow_not_self',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.follower} -> {self.author}'
+
+
+class FeedEntry(models.Model):
+    """
+    Пост во входящих подписчика. Строки создаются при публикации
+    пачками в фоне, поэтому личная лента читается одним диапазоном
+    индекса (user, pub_date) независимо от числа подписок.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Подписчик',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Публикация',
+    )
+
+    # Автор поста (для удаления его постов при отписке)
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='author_feed_entries',
+        verbose_name='Автор',
+    )
+
+    # Копия даты публикации поста для сортировки ленты
+    pub_date = models.DateTimeField('Дата и время публикации')
+
+    class Meta:
+        verbose_name = 'запись ленты'
+        verbose_name_plural = 'Записи лент'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'post'), name='unique_feed_entry'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date', '-post'),
+                name='feed_entry_range_idx',
+            ),
+            models.Index(
+                fields=('user', 'author'), name='feed_entry_author_idx'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user_id}: {self.post_id}'
+
+
+class PostLike(models.Model):
+    """
+    Отметка «нравится» к посту. Уникальность пары (пользователь, пост)
+    проверяет база; счетчик Post.like_count пересчитывается по этой
+    таблице пачками (см. blog.reactions).
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='post_likes',
+        verbose_name='Пользователь',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='likes',
+        verbose_name='Публикация',
+    )
+    created_at = models.DateTimeField('Создано', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'отметка публикации'
+        verbose_name_plural = 'Отметки публикаций'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'post'), name='unique_post_like'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user_id} -> {self.post_id}'
+
+
+class CommentLike(models.Model):
+    """
+    Отметка «нравится» к комментарию (аналогично PostLike).
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='comment_likes',
+        verbose_name='Пользователь',
+    )
+    comment = models.ForeignKey(
+        Comment,
+        on_delete=models.CASCADE,
+        related_name='likes',
+        verbose_name='Комментарий',
+    )
+    created_at = models.DateTimeField('Создано', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'отметка комментария'
+        verbose_name_plural = 'Отметки комментариев'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'comment'), name='unique_comment_like'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user_id} -> {self.comment_id}'
+
+
+def update_post_image_refcount(sender, instance, **kwargs):
+    """
+    Уменьшает счетчик ссылок на изображение удаленного поста.
+    """
+    name = instance.__dict__.get('image')
+    if name:
+        from blog.images import update_image_refcounts
+        update_image_refcounts({str(name)})
+
+
+post_delete.connect(update_post_image_refcount, sender=Post)
@@ -0,0 +1,179 @@
+from django.conf import settings  # Для чтения порога синхронного выполнения
+
+from django.db import models, transaction  # Атомарная обработка пачки
+
+from blog.images import update_image_refcounts
+from blog.models import Comment, Post
+from blog.signals import (comments_bulk_changed, comments_bulk_deleted,
+                          posts_bulk_changed, posts_bulk_deleted)
+from blog.tasks import iter_batches, run_in_background
+
+# Сколько строк можно обработать прямо в запросе администратора.
+# Более крупные выборки уходят в фоновую задачу.
+BULK_SYNC_LIMIT = 5000
+
+
+def is_large_selection(queryset):
+    """
+    Проверяет, нужно ли выполнять массовую операцию в фоне.
+    """
+    limit = getattr(settings, 'BLOG_BULK_SYNC_LIMIT', BULK_SYNC_LIMIT)
+    return queryset.count() > limit
+
+
+def raw_delete_cascade(model, lookup, values, _seen=None):
+    """
+    Удаляет строки model, у которых lookup входит в values, вместе
+    с зависимыми строками (on_delete=CASCADE) на любую глубину.
+    Каждая таблица очищается одним DELETE с подзапросом, объекты
+    в память не загружаются. Связи SET_NULL обнуляются одним UPDATE.
+    Возвращает количество удаленных строк самой модели.
+    """
+    seen = (_seen or set()) | {model}
+    for relation in model._meta.related_objects:
+        related_model = relation.related_model
+        if (
+            related_model is model
+            and lookup == 'pk'
+            and relation.on_delete is models.CASCADE
+        ):
+            # Связь на себя (ответы на комментарии): строки, выбранные
+            # по id, удаляются вместе с потомками, уровень за уровнем.
+            # При выборке по родительскому объекту (например, посту)
+            # потомки удаляются тем же DELETE, что и сами строки.
+            children = list(related_model._base_manager.filter(
+                **{f'{relation.field.name}__in': values}
+            ).exclude(pk__in=values).values_list('pk', flat=True))
+            if children:
+                raw_delete_cascade(model, 'pk', children, _seen)
+            continue
+        if related_model in seen or relation.many_to_many:
+            # Уже обрабатываемые модели (в т.ч. связь на себя) пропускаются
+            continue
+        related_lookup = f'{relation.field.name}__{lookup}'
+        if relation.on_delete is models.CASCADE:
+            raw_delete_cascade(related_model, related_lookup, values, seen)
+        elif relation.on_delete is models.SET_NULL:
+            related_model._base_manager.filter(
+                **{f'{related_lookup}__in': values}
+            ).update(**{relation.field.name: None})
+    queryset = model._base_manager.filter(**{f'{lookup}__in': values})
+    return queryset._raw_delete(queryset.db)
+
+
+def update_posts(queryset, **fields):
+    """
+    Обновляет посты пачками: один UPDATE ... WHERE id IN (...) на пачку.
+    Save() и сигналы post_save не вызываются, вместо них после каждой пачки
+    рассылается posts_bulk_changed.
+    Возвращает количество обновленных строк.
+    """
+    updated = 0
+    for batch in iter_batches(queryset, 'author_id', 'category_id'):
+        post_ids, author_ids, category_ids = zip(*batch)
+        with transaction.atomic():
+            updated += Post.objects.filter(pk__in=post_ids).update(**fields)
+            posts_bulk_changed.send(
+                sender=Post,
+                post_ids=list(post_ids),
+                author_ids=set(author_ids) - {None},
+                category_ids=set(category_ids) - {None},
+                fields=fields,
+            )
+    return updated
+
+
+def delete_posts(queryset, on_batch=None):
+    """
+    Удаляет посты вместе с зависимыми строками (комментариями и т.д.) пачками.
+    На каждую пачку выполняется по одному DELETE на таблицу без загрузки
+    объектов в память (стандартный Collector загружает каждый удаляемый
+    объект). Счетчики ссылок на изображения пересчитываются после пачки.
+    on_batch(количество) вызывается после каждой пачки (для прогресса).
+    Возвращает количество удаленных постов.
+    """
+    deleted = 0
+    for batch in iter_batches(queryset, 'author_id', 'category_id', 'image'):
+        post_ids, author_ids, category_ids, images = zip(*batch)
+        with transaction.atomic():
+            count = raw_delete_cascade(Post, 'pk', post_ids)
+            update_image_refcounts(images)
+            posts_bulk_deleted.send(
+                sender=Post,
+                post_ids=list(post_ids),
+                author_ids=set(author_ids) - {None},
+                category_ids=set(category_ids) - {None},
+            )
+        deleted += count
+        if on_batch is not None:
+            on_batch(count)
+    return deleted
+
+
+def delete_posts_by_authors(author_ids):
+    """
+    Удаляет все посты указанных авторов (и комментарии к ним).
+    """
+    return delete_posts(Post.objects.filter(author_id__in=list(author_ids)))
+
+
+def update_comments(queryset, **fields):
+    """
+    Обновляет комментарии пачками одним UPDATE на пачку.
+    """
+    updated = 0
+    for batch in iter_batches(queryset, 'post_id'):
+        comment_ids, post_ids = zip(*batch)
+        with transaction.atomic():
+            updated += Comment.objects.filter(
+                pk__in=comment_ids
+            ).update(**fields)
+            comments_bulk_changed.send(
+                sender=Comment,
+                comment_ids=list(comment_ids),
+                post_ids=set(post_ids),
+                fields=fields,
+            )
+    return updated
+
+
+def delete_comments(queryset, on_batch=None):
+    """
+    Удаляет комментарии пачками одним DELETE на пачку.
+    on_batch(количество) вызывается после каждой пачки (для прогресса).
+    """
+    deleted = 0
+    for batch in iter_batches(queryset, 'post_id'):
+        comment_ids, post_ids = zip(*batch)
+        with transaction.atomic():
+            count = raw_delete_cascade(Comment, 'pk', comment_ids)
+            comments_bulk_deleted.send(
+                sender=Comment,
+                comment_ids=list(comment_ids),
+                post_ids=set(post_ids),
+            )
+        deleted += count
+        if on_batch is not None:
+            on_batch(count)
+    return deleted
+
+
+def delete_comments_by_authors(author_ids):
+    """
+    Удаляет все комментарии указанных авторов.
+    """
+    return delete_comments(
+        Comment.objects.filter(author_id__in=list(author_ids))
+    )
+
+
+def run_bulk(func, queryset, *args, **kwargs):
+    """
+    Выполняет массовую операцию сразу или в фоне, в зависимости от размера
+    выборки. Возвращает количество обработанных строк или None, если
+    операция поставлена в фон (при BLOG_TASKS_EAGER фоновая задача
+    выполняется сразу, и возвращается ее результат).
+    """
+    if is_large_selection(queryset):
+        return run_in_background(func, queryset, *args, **kwargs)
+    return func(queryset, *args, **kwargs)
@@ -0,0 +1,276 @@
+import math  # Для округления времени ожидания вверх
+
+import threading  # Для блокировки хранилища в памяти процесса
+
+import time  # Для получения текущего времени
+
+import uuid  # Версии корзин в кэше
+
+from django.conf import settings  # Для чтения лимитов из настроек проекта
+
+from django.core.cache import caches  # Для хранилища на основе кэша Django
+
+from django.core.signals import setting_changed  # Сброс хранилища
+
+from django.dispatch import receiver
+
+from django.shortcuts import render  # Для отрисовки страницы ошибки 429
+
+from django.utils.module_loading import import_string  # Хранилище по пути
+
+# Длительность периодов, допустимых в записи лимита вида '10/m'
+PERIODS = {
+    's': 1,
+    'm': 60,
+    'h': 60 * 60,
+    'd': 24 * 60 * 60,
+}
+
+# Хранилище по умолчанию
+DEFAULT_STORE = 'blog.ratelimit.MemoryStore'
+
+
+def parse_rate(rate):
+    """
+    Разбирает запись лимита '10/m' в пару (емкость, токенов в секунду).
+    Возвращает None, если лимит не задан.
+    """
+    if not rate:
+        return None
+    count, period = rate.split('/')
+    count = int(count)
+    return count, count / PERIODS[period[0].lower()]
+
+
+class TokenBucket:
+    """
+    Корзина токенов: хранит только два числа, поэтому проверка
+    стоит O(1) и не требует обращения к базе данных.
+    """
+
+    def __init__(self, capacity, refill_rate, tokens=None, updated=None):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.tokens = capacity if tokens is None else tokens
+        self.updated = time.monotonic() if updated is None else updated
+
+    def consume(self, now):
+        """
+        Пополняет корзину за прошедшее время и пытается взять токен.
+        Возвращает 0, если токен взят, иначе число секунд до
+        появления следующего токена.
+        """
+        elapsed = max(now - self.updated, 0)
+        self.tokens = min(
+            self.capacity, self.tokens + elapsed * self.refill_rate
+        )
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.refill_rate
+
+    def is_full(self, now):
+        """
+        Проверяет, пополнилась ли корзина до конца к моменту now.
+        """
+        elapsed = max(now - self.updated, 0)
+        return self.tokens + elapsed * self.refill_rate >= self.capacity
+
+
+class MemoryStore:
+    """
+    Хранилище корзин в памяти процесса.
+    Самый быстрый вариант, но лимит считается отдельно в каждом процессе.
+    """
+
+    # При превышении этого числа ключей удаляются полностью пополненные корзины
+    max_keys = 10000
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, refill_rate):
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._prune(now)
+                bucket = TokenBucket(capacity, refill_rate, updated=now)
+                self._buckets[key] = bucket
+            return bucket.consume(now)
+
+    def _prune(self, now):
+        """
+        Удаляет корзины, которые уже пополнились: они ничем не отличаются
+        от новых.
+        """
+        for key in [k for k, b in self._buckets.items() if b.is_full(now)]:
+            del self._buckets[key]
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheStore:
+    """
+    Хранилище в кэше Django (общем для всех процессов).
+    Алиас кэша задается настройкой BLOG_RATE_LIMIT_CACHE.
+    Для быстрого пути нужен кэш в памяти (memcached, redis),
+    а не DatabaseCache.
+
+    Корзина хранится как (токены, время обновления, версия). В API кэша
+    Django нет compare-and-set, поэтому он собран из атомарного add:
+    запись новой версии разрешена только процессу, который первым
+    добавил ключ-заявку на текущую версию. Проигравший перечитывает
+    корзину и пробует снова, так что один токен не списывается дважды.
+    """
+
+    key_prefix = 'ratelimit'
+
+    # Сколько раз перечитывать корзину, которую одновременно меняют
+    # другие процессы
+    max_attempts = 20
+
+    # Время жизни заявки (секунды): если процесс упал между заявкой
+    # и записью, корзина освободится после этого срока
+    claim_timeout = 5
+
+    def __init__(self):
+        self.cache = caches[
+            getattr(settings, 'BLOG_RATE_LIMIT_CACHE', 'default')
+        ]
+
+    @property
+    def generation_key(self):
+        return f'{self.key_prefix}:generation'
+
+    def get_generation(self):
+        """
+        Возвращает поколение ключей: clear() переходит к новому
+        поколению, не затрагивая остальные данные кэша.
+        """
+        return self.cache.get_or_set(self.generation_key, 0, None)
+
+    def consume(self, key, capacity, refill_rate):
+        cache_key = f'{self.key_prefix}:{self.get_generation()}:{key}'
+        # Полностью пополненная корзина не отличается от новой
+        timeout = math.ceil(capacity / refill_rate) + 1
+        for _ in range(self.max_attempts):
+            # Время должно быть общим для процессов, поэтому time()
+            now = time.time()
+            state = self.cache.get(cache_key)
+            if state is None:
+                bucket = TokenBucket(capacity, refill_rate, updated=now)
+                wait = bucket.consume(now)
+                if self.cache.add(cache_key, self.dump(bucket), timeout):
+                    return wait
+                continue
+            tokens, updated, version = state
+            bucket = TokenBucket(capacity, refill_rate, tokens, updated)
+            wait = bucket.consume(now)
+            if wait:
+                # Отказ ничего не списывает, записывать нечего
+                return wait
+            claim_key = f'{cache_key}:{version}'
+            if self.cache.add(claim_key, 1, self.claim_timeout):
+                self.cache.set(cache_key, self.dump(bucket), timeout)
+                self.cache.delete(claim_key)
+                return 0
+        # Корзину непрерывно меняют другие запросы того же пользователя
+        return 1 / refill_rate
+
+    @staticmethod
+    def dump(bucket):
+        """
+        Возвращает состояние корзины для записи в кэш с новой версией.
+        """
+        return bucket.tokens, bucket.updated, uuid.uuid4().hex
+
+    def clear(self):
+        """
+        Сбрасывает все корзины: старые ключи больше не читаются
+        и истекают сами.
+        """
+        try:
+            self.cache.incr(self.generation_key)
+        except ValueError:
+            self.cache.set(self.generation_key, 1, None)
+
+
+_store = None
+
+
+def get_store():
+    """
+    Возвращает хранилище корзин, выбранное настройкой BLOG_RATE_LIMIT_STORE.
+    Хранилище создается один раз на процесс.
+    """
+    global _store
+    if _store is None:
+        store_path = getattr(settings, 'BLOG_RATE_LIMIT_STORE', DEFAULT_STORE)
+        _store = import_string(store_path)()
+    return _store
+
+
+def reset_store():
+    """
+    Сбрасывает хранилище (используется при смене настроек и в тестах).
+    """
+    global _store
+    _store = None
+
+
+@receiver(setting_changed)
+def reset_store_on_setting_change(setting, **kwargs):
+    if setting == 'BLOG_RATE_LIMIT_STORE':
+        reset_store()
+
+
+def get_rate(scope, user, default=None):
+    """
+    Возвращает лимит для области scope и пользователя user.
+    Порядок поиска: персональный лимит из BLOG_RATE_LIMIT_USERS
+    (по имени пользователя), лимит области из BLOG_RATE_LIMITS,
+    лимит по умолчанию из представления.
+    Сотрудники по умолчанию не ограничиваются.
+    """
+    if user.is_staff and getattr(
+        settings, 'BLOG_RATE_LIMIT_EXEMPT_STAFF', True
+    ):
+        return None
+    user_rates = getattr(settings, 'BLOG_RATE_LIMIT_USERS', {}).get(
+        user.get_username(), {}
+    )
+    if scope in user_rates:
+        return user_rates[scope]
+    return getattr(settings, 'BLOG_RATE_LIMITS', {}).get(scope, default)
+
+
+def check_rate_limit(scope, user, default_rate=None):
+    """
+    Списывает токен у пользователя в области scope.
+    Возвращает 0, если запрос разрешен, иначе число секунд ожидания.
+    """
+    parsed = parse_rate(get_rate(scope, user, default_rate))
+    if parsed is None:
+        return 0
+    capacity, refill_rate = parsed
+    return get_store().consume(f'{scope}:{user.pk}', capacity, refill_rate)
+
+
+def rate_limited_response(request, retry_after):
+    """
+    Возвращает ответ 429 с заголовком Retry-After.
+    """
+    response = render(
+        request,
+        'pages/429.html',
+        {'retry_after': math.ceil(retry_after)},
+        status=429,
+    )
+    response['Retry-After'] = str(math.ceil(retry_after))
+    return response
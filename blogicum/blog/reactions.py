@@ -0,0 +1,180 @@
+import atexit  # Сброс накопленных отметок при завершении процесса
+
+import logging  # Для записи ошибок пересчета
+
+from django.conf import settings  # Для кэша и срока жизни отметок
+
+from django.core.cache import caches  # Отметки читаются из общего кэша
+
+from django.db import IntegrityError, transaction  # Повтор отклоняет БД
+
+from django.db.models import Count, OuterRef, Subquery  # Пересчет в SQL
+
+from django.db.models.functions import Coalesce  # Без отметок - 0
+
+from blog.counters import CounterBuffer
+from blog.models import Comment, CommentLike, Post, PostLike
+from blog.tasks import run_in_background
+
+logger = logging.getLogger(__name__)
+
+# Пересчет счетчиков, когда в буфере накопилось столько отметок...
+LIKE_FLUSH_THRESHOLD = 100
+
+# ...или с предыдущего пересчета прошло столько секунд
+LIKE_FLUSH_INTERVAL = 10
+
+# Сколько объектов пересчитывается одним UPDATE
+LIKE_FLUSH_BATCH = 500
+
+# Срок жизни отметок пользователя в кэше (секунды)
+LIKE_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Объекты, которые можно отметить: модель, таблица отметок и ее поле
+TARGETS = {
+    'post': (Post, PostLike, 'post'),
+    'comment': (Comment, CommentLike, 'comment'),
+}
+
+
+def get_setting(name, default):
+    """
+    Возвращает значение настройки BLOG_LIKE_<name> или значение по умолчанию.
+    """
+    return getattr(settings, f'BLOG_LIKE_{name}', default)
+
+
+def get_cache():
+    """
+    Возвращает кэш для отметок пользователей (тот же, что у лент).
+    """
+    return caches[getattr(settings, 'BLOG_TIMELINE_CACHE', 'default')]
+
+
+def liked_key(target, user_id, object_id):
+    """
+    Возвращает ключ кэша: отметил ли пользователь объект.
+    """
+    return f'liked:{target}:{user_id}:{object_id}'
+
+
+def liked_ids(user, target, object_ids):
+    """
+    Возвращает множество id объектов из object_ids, отмеченных
+    пользователем. Известные ответы читаются из кэша одним get_many,
+    остальные - одним запросом по уникальному индексу (user, объект).
+    """
+    if not user.is_authenticated or not object_ids:
+        return set()
+    keys = {liked_key(target, user.pk, pk): pk for pk in object_ids}
+    cached = get_cache().get_many(keys)
+    liked = {keys[key] for key, value in cached.items() if value}
+    missing = [pk for key, pk in keys.items() if key not in cached]
+    if missing:
+        _, like_model, field = TARGETS[target]
+        found = set(like_model.objects.filter(
+            user=user, **{f'{field}_id__in': missing}
+        ).values_list(f'{field}_id', flat=True))
+        get_cache().set_many(
+            {liked_key(target, user.pk, pk): pk in found for pk in missing},
+            get_setting('CACHE_TIMEOUT', LIKE_CACHE_TIMEOUT),
+        )
+        liked |= found
+    return liked
+
+
+def recount_likes(target, object_ids):
+    """
+    Пересчитывает like_count по таблице отметок: один UPDATE
+    с подзапросом на пачку объектов. Пересчет, а не прибавление,
+    поэтому повторный или потерянный сброс не искажает счетчик.
+    """
+    model, like_model, field = TARGETS[target]
+    counts = like_model.objects.filter(
+        **{field: OuterRef('pk')}
+    ).order_by().values(field).annotate(count=Count('pk')).values('count')
+    object_ids = sorted(object_ids)
+    for start in range(0, len(object_ids), LIKE_FLUSH_BATCH):
+        model._base_manager.filter(
+            pk__in=object_ids[start:start + LIKE_FLUSH_BATCH]
+        ).update(like_count=Coalesce(Subquery(counts), 0))
+
+
+def write_like_counts(changes):
+    """
+    Пересчитывает счетчики объектов, отметки которых изменились
+    (ключи changes - пары (вид объекта, id)).
+    """
+    for target in TARGETS:
+        object_ids = [pk for kind, pk in changes if kind == target]
+        if object_ids:
+            recount_likes(target, object_ids)
+
+
+def flush(changes):
+    """
+    Пересчитывает счетчики; при ошибке возвращает изменения в буфер.
+    """
+    try:
+        write_like_counts(changes)
+    except Exception:
+        logger.exception('Не удалось пересчитать отметки')
+        _buffer.restore(changes)
+
+
+_buffer = CounterBuffer(
+    'LIKE', LIKE_FLUSH_THRESHOLD, LIKE_FLUSH_INTERVAL, flush=flush
+)
+
+
+def set_like(user, target, object_id, liked=True):
+    """
+    Ставит или снимает отметку пользователя. На отметку выполняется
+    один INSERT или DELETE по уникальному индексу; строка объекта
+    не блокируется: счетчик пересчитывается пачкой позже.
+    Возвращает True, если отметка изменилась.
+    """
+    _, like_model, field = TARGETS[target]
+    if liked:
+        try:
+            with transaction.atomic():
+                like_model.objects.create(
+                    user=user, **{f'{field}_id': object_id}
+                )
+            changed = True
+        except IntegrityError:
+            # Отметка уже есть (уникальный индекс)
+            changed = False
+    else:
+        changed = like_model.objects.filter(
+            user=user, **{f'{field}_id': object_id}
+        ).delete()[0] > 0
+    get_cache().set(
+        liked_key(target, user.pk, object_id), liked,
+        get_setting('CACHE_TIMEOUT', LIKE_CACHE_TIMEOUT),
+    )
+    if changed:
+        changes = _buffer.add((target, object_id))
+        if changes:
+            run_in_background(flush, changes)
+    return changed
+
+
+def flush_likes():
+    """
+    Сразу пересчитывает все накопленные счетчики (при завершении
+    процесса и в тестах).
+    """
+    changes = _buffer.take()
+    if changes:
+        flush(changes)
+
+
+def reset_buffer():
+    """
+    Отбрасывает накопленные изменения без пересчета (используется в тестах).
+    """
+    _buffer.clear()
+
+
+atexit.register(flush_likes)
@@ -0,0 +1,488 @@
+import os  # Для атомарной замены файла индекса
+
+import pickle  # Индекс (словарь, IDF, матрица векторов) хранится на диске
+
+import re  # Для разбиения текста на слова
+
+import tempfile  # Временный файл при записи индекса
+
+import threading  # Индекс обновляется одной задачей за раз
+
+from collections import Counter  # Количество слов в посте
+
+from contextlib import contextmanager  # Блокировка индекса
+
+from pathlib import Path  # Путь к файлу индекса
+
+from django.conf import settings  # Для каталога индекса и размера списков
+
+from django.db import transaction  # Список похожих заменяется целиком
+
+from django.db.models.signals import post_init, post_save  # Для пересчета
+
+from blog.models import Post, RelatedPost
+from blog.signals import posts_bulk_changed
+from blog.tasks import get_batch_size, run_in_background
+from blog.utils import published_only
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    np = sparse = None
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Сколько похожих постов хранится и показывается для поста
+RELATED_COUNT = 5
+
+# Вес совпадения категории и местоположения (вес текста - 1)
+RELATED_CATEGORY_WEIGHT = 0.3
+RELATED_LOCATION_WEIGHT = 0.1
+
+# Посты с меньшим сходством не считаются похожими
+RELATED_MIN_SCORE = 0.05
+
+# Сколько постов сравнивается со всеми остальными одним умножением матриц
+RELATED_BLOCK_SIZE = 256
+
+# Слова из букв и цифр длиной от двух символов
+TOKEN_RE = re.compile(r'\w{2,}')
+
+# Поля постов, из которых строятся векторы
+VECTOR_FIELDS = ('pk', 'title', 'text', 'category_id', 'location_id')
+
+# Поля, изменение которых требует пересчета похожих постов: вектор
+# и публикация (снятый с публикации пост убирается из индекса)
+TRACKED_FIELDS = (
+    'title', 'text', 'category_id', 'location_id', 'is_published',
+    'pub_date',
+)
+
+# Те же поля в массовых операциях (могут передаваться и без _id)
+BULK_TRACKED_FIELDS = set(TRACKED_FIELDS) | {'category', 'location'}
+
+_lock = threading.Lock()
+
+
+def get_setting(name, default):
+    """
+    Возвращает значение настройки BLOG_RELATED_<name> или значение
+    по умолчанию.
+    """
+    return getattr(settings, f'BLOG_RELATED_{name}', default)
+
+
+def is_available():
+    """
+    Проверяет, установлены ли numpy и scipy (нужны для расчета).
+    """
+    return np is not None
+
+
+def index_path():
+    """
+    Возвращает путь к файлу индекса похожих постов.
+    """
+    root = get_setting('ROOT', settings.BASE_DIR / 'related')
+    return Path(root) / 'index.pickle'
+
+
+def load_index():
+    """
+    Возвращает индекс с диска или None, если полной сборки еще не было.
+    """
+    try:
+        with open(index_path(), 'rb') as source:
+            return pickle.load(source)
+    except FileNotFoundError:
+        return None
+
+
+def save_index(index):
+    """
+    Записывает индекс во временный файл и заменяет им старый.
+    """
+    path = index_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            pickle.dump(index, tmp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+@contextmanager
+def index_lock():
+    """
+    Не дает двум задачам одновременно читать и перезаписывать индекс.
+    Потоки одного процесса ждут threading.Lock, процессы (несколько
+    воркеров) - блокировку файла index.lock рядом с индексом. Где fcntl
+    нет (Windows), индекс должен обновлять только один процесс.
+    """
+    with _lock:
+        if fcntl is None:
+            yield
+            return
+        path = index_path().with_name('index.lock')
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def tokenize(title, text):
+    """
+    Возвращает количество каждого слова в заголовке и тексте поста.
+    """
+    return Counter(TOKEN_RE.findall(f'{title} {text}'.lower()))
+
+
+def post_rows(queryset=None):
+    """
+    Возвращает итератор строк опубликованных постов для векторов.
+    Видимость (дата публикации, категория) проверяется при показе.
+    """
+    if queryset is None:
+        queryset = Post.objects.all()
+    return queryset.filter(is_published=True).order_by('pk').values_list(
+        *VECTOR_FIELDS
+    ).iterator(get_batch_size())
+
+
+def count_terms(rows, vocabulary, grow=False):
+    """
+    Возвращает id постов, разреженную матрицу количеств слов
+    и списки категорий и местоположений. grow=True добавляет новые
+    слова в словарь (полная сборка), иначе они пропускаются.
+    """
+    ids, categories, locations = [], [], []
+    indptr, indices, data = [0], [], []
+    for pk, title, text, category_id, location_id in rows:
+        for term, count in tokenize(title, text).items():
+            column = vocabulary.get(term)
+            if column is None:
+                if not grow:
+                    continue
+                column = vocabulary[term] = len(vocabulary)
+            indices.append(column)
+            data.append(count)
+        indptr.append(len(indices))
+        ids.append(pk)
+        categories.append(category_id)
+        locations.append(location_id)
+    counts = sparse.csr_matrix(
+        (
+            np.array(data, dtype=np.float64),
+            np.array(indices, dtype=np.int64),
+            np.array(indptr, dtype=np.int64),
+        ),
+        shape=(len(ids), len(vocabulary)),
+    )
+    return ids, counts, categories, locations
+
+
+def normalize(matrix):
+    """
+    Делит строки матрицы на их длину (скалярное произведение
+    нормированных строк - косинусное сходство).
+    """
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.csr_matrix(
+        sparse.diags(1 / norms, 0, shape=(len(norms), len(norms))) @ matrix
+    )
+
+
+def resize(matrix, columns):
+    """
+    Возвращает матрицу с добавленными справа пустыми столбцами
+    (новые категории и местоположения появляются между сборками).
+    """
+    if matrix.shape[1] == columns:
+        return matrix
+    return sparse.csr_matrix(
+        (matrix.data, matrix.indices, matrix.indptr),
+        shape=(matrix.shape[0], columns),
+    )
+
+
+def weigh(index, counts, categories, locations):
+    """
+    Возвращает нормированные векторы постов: TF-IDF слов
+    (логарифм частоты, умноженный на IDF) и столбцы категории
+    и местоположения с их весами.
+    """
+    idf = index['idf']
+    tfidf = counts.copy()
+    tfidf.data = 1 + np.log(tfidf.data)
+    tfidf = normalize(
+        tfidf @ sparse.diags(idf, 0, shape=(len(idf), len(idf)))
+    )
+
+    extra = index['extra']
+    weights = (
+        ('category', get_setting('CATEGORY_WEIGHT', RELATED_CATEGORY_WEIGHT)),
+        ('location', get_setting('LOCATION_WEIGHT', RELATED_LOCATION_WEIGHT)),
+    )
+    rows, columns, values = [], [], []
+    for row, keys in enumerate(zip(categories, locations)):
+        for (kind, weight), value in zip(weights, keys):
+            if value is None or not weight:
+                continue
+            rows.append(row)
+            columns.append(extra.setdefault((kind, value), len(extra)))
+            values.append(weight)
+    features = sparse.csr_matrix(
+        (values, (rows, columns)), shape=(counts.shape[0], len(extra))
+    )
+    return normalize(sparse.hstack([tfidf, features], format='csr'))
+
+
+def nearest(queries, matrix, ids, exclude):
+    """
+    Возвращает для каждой строки queries список (id, сходство)
+    ближайших постов matrix по убыванию сходства. exclude - id поста
+    каждой строки (пост не похож сам на себя). Сходство считается
+    одним умножением разреженных матриц на блок.
+    """
+    count = get_setting('COUNT', RELATED_COUNT)
+    min_score = get_setting('MIN_SCORE', RELATED_MIN_SCORE)
+    ids = np.asarray(ids)
+    similarities = sparse.csr_matrix(queries @ matrix.T)
+    result = []
+    for row, post_id in enumerate(exclude):
+        start, stop = similarities.indptr[row], similarities.indptr[row + 1]
+        columns = similarities.indices[start:stop]
+        scores = similarities.data[start:stop]
+        keep = (ids[columns] != post_id) & (scores >= min_score)
+        columns, scores = columns[keep], scores[keep]
+        if len(scores) > count:
+            top = np.argpartition(-scores, count)[:count]
+            columns, scores = columns[top], scores[top]
+        # По убыванию сходства, при равенстве - по id
+        order = np.lexsort((ids[columns], -scores))
+        result.append([
+            (int(ids[columns[i]]), float(scores[i])) for i in order
+        ])
+    return result
+
+
+def store(neighbours):
+    """
+    Заменяет списки похожих постов: neighbours - словарь
+    {id поста: [(id похожего, сходство), ...]}.
+    """
+    with transaction.atomic():
+        RelatedPost.objects.filter(post_id__in=list(neighbours)).delete()
+        RelatedPost.objects.bulk_create(
+            [
+                RelatedPost(
+                    post_id=post_id, related_id=related_id,
+                    score=score, rank=rank,
+                )
+                for post_id, items in neighbours.items()
+                for rank, (related_id, score) in enumerate(items)
+            ],
+            batch_size=get_batch_size(),
+        )
+
+
+def rebuild_related_posts(block_size=None):
+    """
+    Полная сборка: словарь и IDF по всем опубликованным постам, векторы
+    и списки похожих для каждого поста (блоками строк). Индекс
+    сохраняется на диск для последующих обновлений отдельных постов.
+    Возвращает количество обработанных постов.
+    """
+    vocabulary = {}
+    ids, counts, categories, locations = count_terms(
+        post_rows(), vocabulary, grow=True
+    )
+    frequencies = np.bincount(counts.indices, minlength=len(vocabulary))
+    index = {
+        'vocabulary': vocabulary,
+        'idf': np.log((1 + len(ids)) / (1 + frequencies)) + 1,
+        'extra': {},
+        'ids': ids,
+    }
+    with index_lock():
+        index['matrix'] = weigh(index, counts, categories, locations)
+        block_size = block_size or get_setting(
+            'BLOCK_SIZE', RELATED_BLOCK_SIZE
+        )
+        for start in range(0, len(ids), block_size):
+            block = ids[start:start + block_size]
+            store(dict(zip(block, nearest(
+                index['matrix'][start:start + block_size],
+                index['matrix'], ids, block,
+            ))))
+        # Списки снятых с публикации постов больше не обновляются
+        RelatedPost.objects.filter(post__is_published=False).delete()
+        save_index(index)
+    return len(ids)
+
+
+def drop_rows(index, ids):
+    """
+    Убирает из индекса векторы постов ids.
+    """
+    changed = set(ids)
+    keep = np.array(
+        [pk not in changed for pk in index['ids']], dtype=bool
+    )
+    index['matrix'] = index['matrix'][keep]
+    index['ids'] = [pk for pk, kept in zip(index['ids'], keep) if kept]
+
+
+def replace_rows(index, ids, vectors):
+    """
+    Заменяет в индексе векторы постов ids (новые посты добавляются).
+    """
+    drop_rows(index, ids)
+    matrix = resize(index['matrix'], vectors.shape[1])
+    index['matrix'] = sparse.vstack([matrix, vectors], format='csr')
+    index['ids'] = index['ids'] + list(ids)
+
+
+def remove_posts(index, removed):
+    """
+    Убирает из индекса снятые с публикации посты removed: удаляет
+    их списки и пересчитывает списки постов, в которые они входили.
+    """
+    drop_rows(index, removed)
+    RelatedPost.objects.filter(post_id__in=removed).delete()
+    positions = {pk: row for row, pk in enumerate(index['ids'])}
+    affected = sorted(
+        pk for pk in RelatedPost.objects.filter(
+            related_id__in=removed
+        ).values_list('post_id', flat=True).distinct()
+        if pk in positions
+    )
+    if affected:
+        store(dict(zip(affected, nearest(
+            index['matrix'][[positions[pk] for pk in affected]],
+            index['matrix'], index['ids'], affected,
+        ))))
+
+
+def add_to_neighbours(neighbours):
+    """
+    Добавляет измененные посты в списки их соседей: сходство
+    симметрично, поэтому новый пост может потеснить последний
+    пост в списке соседа.
+    """
+    candidates = {}
+    for post_id, items in neighbours.items():
+        for related_id, score in items:
+            if related_id not in neighbours:
+                candidates.setdefault(related_id, []).append((post_id, score))
+    if not candidates:
+        return
+    current = {}
+    for post_id, related_id, score in RelatedPost.objects.filter(
+        post_id__in=list(candidates)
+    ).values_list('post_id', 'related_id', 'score'):
+        current.setdefault(post_id, []).append((related_id, score))
+    count = get_setting('COUNT', RELATED_COUNT)
+    lists = {}
+    for post_id, items in candidates.items():
+        changed = {related_id for related_id, _ in items}
+        merged = items + [
+            item for item in current.get(post_id, [])
+            if item[0] not in changed
+        ]
+        merged.sort(key=lambda item: (-item[1], item[0]))
+        lists[post_id] = merged[:count]
+    store(lists)
+
+
+def update_related_posts(post_ids):
+    """
+    Пересчитывает похожие для новых и измененных постов по сохраненному
+    индексу. Словарь и IDF не меняются до следующей полной сборки
+    (новые слова не учитываются), поэтому обновление сравнивает
+    с остальными постами только векторы ids. Снятые с публикации
+    посты убираются из индекса и из списков других постов.
+    Возвращает количество обработанных постов.
+    """
+    if not is_available():
+        return 0
+    with index_lock():
+        index = load_index()
+        if index is None:
+            return 0
+        ids, counts, categories, locations = count_terms(
+            post_rows(Post.objects.filter(pk__in=post_ids)),
+            index['vocabulary'],
+        )
+        removed = set(post_ids) - set(ids)
+        if removed:
+            remove_posts(index, removed)
+        if ids:
+            vectors = weigh(index, counts, categories, locations)
+            replace_rows(index, ids, vectors)
+            neighbours = dict(zip(ids, nearest(
+                vectors, index['matrix'], index['ids'], ids
+            )))
+            store(neighbours)
+            add_to_neighbours(neighbours)
+        save_index(index)
+    return len(ids) + len(removed)
+
+
+def get_related_posts(post):
+    """
+    Возвращает видимые похожие посты: один запрос по индексу
+    (post, rank) без расчета сходства.
+    """
+    return published_only(
+        Post.objects.filter(related_to__post_id=post.pk)
+    ).only('id', 'title').order_by('related_to__rank')[
+        :get_setting('COUNT', RELATED_COUNT)
+    ]
+
+
+def remember_related_fields(sender, instance, **kwargs):
+    """
+    Запоминает поля, от которых зависит вектор поста (без запросов).
+    """
+    instance._related_state = tuple(
+        instance.__dict__.get(name) for name in TRACKED_FIELDS
+    )
+
+
+def post_saved(sender, instance, created=False, raw=False, **kwargs):
+    """
+    Новый пост или изменение его текста, категории, местоположения
+    или публикации ставят пересчет похожих постов в фоновую задачу.
+    """
+    if raw:
+        return
+    old_state = getattr(instance, '_related_state', None)
+    remember_related_fields(sender, instance)
+    if created or old_state != instance._related_state:
+        run_in_background(update_related_posts, [instance.pk])
+
+
+def posts_bulk_updated(sender, post_ids=(), fields=None, **kwargs):
+    """
+    Массовая публикация, снятие с публикации или перенос постов
+    ставят их пересчет в фоновую задачу.
+    """
+    if fields and BULK_TRACKED_FIELDS & set(fields):
+        run_in_background(update_related_posts, list(post_ids))
+
+
+post_init.connect(remember_related_fields, sender=Post)
+post_save.connect(post_saved, sender=Post)
+posts_bulk_changed.connect(posts_bulk_updated)
@@ -0,0 +1,75 @@
+from django.template.defaultfilters import linebreaksbr  # Строки в <br>
+
+from django.utils.text import Truncator  # Для обрезки текста по словам
+
+# Количество слов в кратком тексте поста для карточек ленты
+EXCERPT_WORDS = 10
+
+# Версия функции render_text. Увеличивается при любом изменении разметки,
+# после чего сохраненный HTML пересобирается командой rebuild_rendered_text.
+RENDERER_VERSION = 1
+
+
+def make_excerpt(text):
+    """
+    Возвращает краткий текст поста для карточки в ленте.
+    Результат совпадает с фильтром {{ text|truncatewords:10 }}.
+    """
+    return Truncator(text).words(EXCERPT_WORDS, truncate=' …')
+
+
+def render_text(text):
+    """
+    Возвращает экранированный HTML текста поста или комментария.
+    Результат совпадает с фильтром {{ text|linebreaksbr }}.
+    """
+    return linebreaksbr(text, autoescape=True)
+
+
+def rebuild_excerpts(queryset, batch_size=None):
+    """
+    Пересчитывает краткий текст для постов из queryset пачками.
+    Принимает и исторические модели, поэтому используется в миграции.
+    Возвращает количество обработанных постов.
+    """
+    # Импорт внутри функции: модуль импортируется из blog.models
+    from blog.tasks import iter_batches
+
+    model = queryset.model
+    processed = 0
+    for batch in iter_batches(queryset, 'text', batch_size=batch_size):
+        model.objects.bulk_update(
+            [model(pk=pk, excerpt=make_excerpt(text)) for pk, text in batch],
+            ['excerpt'],
+        )
+        processed += len(batch)
+    return processed
+
+
+def rebuild_rendered_text(queryset, batch_size=None):
+    """
+    Пересобирает сохраненный HTML текста для объектов из queryset пачками.
+    Подходит для постов и комментариев, в том числе исторических моделей:
+    таблица с HTML определяется по обратной связи rendered.
+    Возвращает количество обработанных объектов.
+    """
+    from blog.tasks import iter_batches
+
+    relation = queryset.model._meta.get_field('rendered')
+    rendered_model = relation.related_model
+    fk_name = relation.field.attname
+    processed = 0
+    for batch in iter_batches(queryset, 'text', batch_size=batch_size):
+        pks = [pk for pk, _ in batch]
+        # Старые строки удаляются и вставляются заново: 2 запроса на пачку
+        rendered_model.objects.filter(**{f'{fk_name}__in': pks}).delete()
+        rendered_model.objects.bulk_create([
+            rendered_model(
+                **{fk_name: pk},
+                html=render_text(text),
+                version=RENDERER_VERSION,
+            )
+            for pk, text in batch
+        ])
+        processed += len(batch)
+    return processed
@@ -0,0 +1,25 @@
+from django.dispatch import Signal  # Для объявления собственных сигналов
+
+# Массовые операции (QuerySet.update, удаление пачками) обходят save()
+# и стандартные сигналы post_save/post_delete. Поэтому они рассылают
+# собственные сигналы, на которые подписываются кэши и счётчики.
+
+# Пачка постов изменена одним UPDATE.
+# Аргументы: post_ids, author_ids, category_ids (значения до изменения), fields
+posts_bulk_changed = Signal()
+
+# Пачка постов удалена одним DELETE.
+# Аргументы: post_ids, author_ids, category_ids
+posts_bulk_deleted = Signal()
+
+# Пачка комментариев изменена одним UPDATE.
+# Аргументы: comment_ids, post_ids, fields
+comments_bulk_changed = Signal()
+
+# Пачка комментариев удалена одним DELETE.
+# Аргументы: comment_ids, post_ids
+comments_bulk_deleted = Signal()
+
+# Пачка просмотров записана в БД (blog.counters).
+# Аргументы: counts - словарь {id поста: число просмотров}
+post_views_recorded = Signal()
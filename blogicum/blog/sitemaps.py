@@ -0,0 +1,388 @@
+import os  # Для атомарной замены файлов карты сайта
+
+import tempfile  # Временный файл при записи части карты
+
+from datetime import datetime, timezone as dt_timezone  # Время записи файла
+
+from pathlib import Path  # Пути к файлам на диске
+
+from xml.sax.saxutils import escape  # Экранирование URL в XML
+
+from django.conf import settings  # Для каталога и размера частей
+
+from django.db.models import Max, Min  # Диапазон id для индекса карты
+
+from django.db.models.signals import (post_delete, post_init,
+                                      post_save)  # Для сброса частей
+
+from django.http import Http404  # Неизвестный раздел или часть
+
+from django.urls import reverse  # Для ссылок в карте сайта
+
+from django.utils import timezone  # Для проверки отложенных публикаций
+
+from django.views import View  # Базовый контроллер
+
+from blog.models import AuthorStats, Category, Post, User
+from blog.signals import posts_bulk_changed, posts_bulk_deleted
+from blog.stats import refresh_due_stats
+from blog.utils import published_only
+from core.http import file_response
+
+# Сколько id (а значит, не больше стольких URL) попадает в одну часть
+SITEMAP_CHUNK_SIZE = 50000
+
+# Размер пачки строк, читаемых из курсора БД при записи части
+SITEMAP_ITERATOR_CHUNK = 2000
+
+# Адрес сайта для абсолютных URL в файлах карты (файлы общие
+# для всех запросов, поэтому адрес не берется из запроса)
+SITEMAP_BASE_URL = 'http://localhost:8000'
+
+# Разделы карты сайта и модели, по id которых они делятся на части
+SECTIONS = {
+    'posts': Post,
+    'categories': Category,
+    'profiles': User,
+}
+
+# Поле поста, по которому делится раздел: части этих разделов
+# пересобираются, когда наступает дата отложенной публикации
+DUE_FIELDS = {
+    'posts': 'pk',
+    'profiles': 'author_id',
+}
+
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+XMLNS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+
+def get_chunk_size():
+    """
+    Возвращает количество id в одной части карты сайта.
+    """
+    return getattr(settings, 'BLOG_SITEMAP_CHUNK_SIZE', SITEMAP_CHUNK_SIZE)
+
+
+def absolute_url(location):
+    """
+    Возвращает абсолютный URL страницы по адресу сайта из настроек.
+    """
+    base_url = getattr(settings, 'BLOG_SITEMAP_BASE_URL', SITEMAP_BASE_URL)
+    return base_url.rstrip('/') + location
+
+
+def get_root():
+    """
+    Возвращает каталог файлов карты сайта. Для каждого размера части
+    используется свой подкаталог, чтобы смена настройки не отдавала
+    файлы со старой разбивкой.
+    """
+    root = getattr(
+        settings, 'BLOG_SITEMAP_ROOT', settings.BASE_DIR / 'sitemaps'
+    )
+    return Path(root) / str(get_chunk_size())
+
+
+def chunk_path(section, chunk):
+    """
+    Возвращает путь к файлу части раздела.
+    """
+    return get_root() / f'{section}-{chunk}.xml'
+
+
+def index_path():
+    """
+    Возвращает путь к файлу индекса карты сайта.
+    """
+    return get_root() / 'index.xml'
+
+
+def write_atomic(path, lines):
+    """
+    Записывает строки во временный файл и заменяет им path.
+    Читатели видят либо старый, либо полностью записанный файл.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as tmp:
+            tmp.writelines(lines)
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+def url_entry(location, lastmod=None):
+    """
+    Возвращает элемент <url> карты сайта.
+    """
+    if lastmod:
+        lastmod = f'<lastmod>{lastmod.date().isoformat()}</lastmod>'
+    return f'<url><loc>{escape(location)}</loc>{lastmod or ""}</url>\n'
+
+
+def section_rows(section, start, stop):
+    """
+    Возвращает итератор (URL, дата изменения) для id из [start, stop).
+    Читаются только нужные столбцы, объекты моделей не создаются.
+    """
+    if section == 'posts':
+        rows = published_only().filter(
+            pk__gte=start, pk__lt=stop
+        ).order_by('pk').values_list('pk', 'pub_date')
+        return (
+            (reverse('blog:post_detail', args=[pk]), pub_date)
+            for pk, pub_date in rows.iterator(SITEMAP_ITERATOR_CHUNK)
+        )
+    if section == 'categories':
+        rows = Category.objects.filter(
+            pk__gte=start, pk__lt=stop, is_published=True
+        ).order_by('pk').values_list('slug', flat=True)
+        return (
+            (reverse('blog:category_posts', args=[slug]), None)
+            for slug in rows.iterator(SITEMAP_ITERATOR_CHUNK)
+        )
+    # Авторы, у которых наступила дата отложенного поста
+    refresh_due_stats(user_id__gte=start, user_id__lt=stop)
+    rows = AuthorStats.objects.filter(
+        user_id__gte=start, user_id__lt=stop, post_count__gt=0
+    ).order_by('user_id').values_list('user__username', 'last_post_at')
+    return (
+        (reverse('blog:profile', args=[username]), last_post_at)
+        for username, last_post_at in rows.iterator(SITEMAP_ITERATOR_CHUNK)
+    )
+
+
+def chunk_range(section):
+    """
+    Возвращает диапазон номеров частей раздела (range) по id таблицы:
+    один запрос с двумя индексными агрегатами.
+    """
+    size = get_chunk_size()
+    bounds = SECTIONS[section].objects.aggregate(
+        low=Min('pk'), high=Max('pk')
+    )
+    if bounds['low'] is None:
+        return range(0)
+    return range(bounds['low'] // size, bounds['high'] // size + 1)
+
+
+def write_chunk(section, chunk):
+    """
+    Записывает часть раздела на диск потоком строк из БД.
+    """
+    size = get_chunk_size()
+    started = timezone.now().timestamp()
+    rows = section_rows(section, chunk * size, (chunk + 1) * size)
+    path = chunk_path(section, chunk)
+    write_atomic(path, (
+        XML_HEADER,
+        f'<urlset xmlns="{XMLNS}">\n',
+        *(
+            url_entry(absolute_url(location), lastmod)
+            for location, lastmod in rows
+        ),
+        '</urlset>\n',
+    ))
+    # Время изменения файла - момент чтения данных: по нему
+    # has_due_posts находит посты, ставшие видимыми позже
+    os.utime(path, (started, started))
+    return path
+
+
+def write_index():
+    """
+    Записывает индекс карты сайта. Части определяются по диапазону id
+    каждой таблицы (два индексных агрегата), пустые части допустимы.
+    """
+    entries = []
+    for section in SECTIONS:
+        for chunk in chunk_range(section):
+            location = absolute_url(reverse(
+                'blog:sitemap_section', args=[section, chunk]
+            ))
+            entries.append(
+                f'<sitemap><loc>{escape(location)}</loc></sitemap>\n'
+            )
+    path = index_path()
+    write_atomic(path, (
+        XML_HEADER,
+        f'<sitemapindex xmlns="{XMLNS}">\n',
+        *entries,
+        '</sitemapindex>\n',
+    ))
+    return path
+
+
+def has_due_posts(chunk, path, field='pk'):
+    """
+    Проверяет, стали ли видимыми отложенные посты части после записи
+    файла (об этом не сообщает ни один сигнал). field - поле поста,
+    по которому делится раздел (pk для постов, author_id для профилей).
+    """
+    size = get_chunk_size()
+    written_at = datetime.fromtimestamp(
+        path.stat().st_mtime, tz=dt_timezone.utc
+    )
+    return published_only().filter(**{
+        f'{field}__gte': chunk * size,
+        f'{field}__lt': (chunk + 1) * size,
+        'pub_date__gt': written_at,
+    }).exists()
+
+
+def delete_files(paths):
+    """
+    Удаляет файлы карты сайта; отсутствующие файлы пропускаются.
+    """
+    for path in paths:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def invalidate(post_ids=(), author_ids=(), categories=False, new=False):
+    """
+    Удаляет части, в которые входят указанные посты и авторы.
+    Изменение категории сбрасывает все части постов (от нее зависит
+    видимость постов). new=True сбрасывает и индекс: могли появиться
+    или исчезнуть id в крайних частях.
+    """
+    size = get_chunk_size()
+    paths = [
+        chunk_path('posts', pk // size) for pk in set(post_ids) - {None}
+    ]
+    paths += [
+        chunk_path('profiles', pk // size) for pk in set(author_ids) - {None}
+    ]
+    if categories:
+        paths += get_root().glob('posts-*.xml')
+        paths += get_root().glob('categories-*.xml')
+    if new or categories:
+        paths.append(index_path())
+    delete_files(paths)
+
+
+def remember_post_author(sender, instance, **kwargs):
+    """
+    Запоминает автора поста при загрузке (для сброса его профиля
+    после смены автора).
+    """
+    instance._sitemap_author_id = instance.__dict__.get('author_id')
+
+
+def post_saved(sender, instance, created=False, **kwargs):
+    """
+    Сбрасывает часть с постом и части профилей его авторов.
+    """
+    invalidate(
+        post_ids=[instance.pk],
+        author_ids=[
+            getattr(instance, '_sitemap_author_id', None), instance.author_id
+        ],
+        new=created,
+    )
+    remember_post_author(sender, instance)
+
+
+def post_deleted(sender, instance, **kwargs):
+    """
+    Удаленный пост сбрасывает свою часть, профиль автора и индекс.
+    """
+    invalidate(
+        post_ids=[instance.pk], author_ids=[instance.author_id], new=True
+    )
+
+
+def category_changed(sender, instance, **kwargs):
+    """
+    Изменение категории сбрасывает части категорий и постов.
+    """
+    invalidate(categories=True)
+
+
+def remember_username(sender, instance, **kwargs):
+    """
+    Запоминает имя пользователя при загрузке (для сброса части
+    профилей только при его смене).
+    """
+    instance._sitemap_username = instance.__dict__.get('username')
+
+
+def user_saved(sender, instance, created=False, update_fields=None,
+               **kwargs):
+    """
+    Новый пользователь может расширить диапазон id профилей,
+    смена имени меняет URL его профиля. Остальные сохранения
+    (например, last_login при входе) части не сбрасывают.
+    """
+    old_username = getattr(instance, '_sitemap_username', None)
+    remember_username(sender, instance)
+    if created:
+        invalidate(author_ids=[instance.pk], new=True)
+        return
+    if update_fields is not None and 'username' not in update_fields:
+        return
+    if old_username != instance.username:
+        invalidate(author_ids=[instance.pk])
+
+
+def posts_bulk_updated(sender, post_ids=(), author_ids=(), fields=None,
+                       **kwargs):
+    """
+    Массовые операции над постами сбрасывают затронутые части.
+    """
+    author_ids = set(author_ids)
+    author = (fields or {}).get('author', (fields or {}).get('author_id'))
+    if author is not None:
+        author_ids.add(getattr(author, 'pk', author))
+    invalidate(post_ids=post_ids, author_ids=author_ids, new=fields is None)
+
+
+post_init.connect(remember_post_author, sender=Post)
+post_save.connect(post_saved, sender=Post)
+post_delete.connect(post_deleted, sender=Post)
+post_save.connect(category_changed, sender=Category)
+post_delete.connect(category_changed, sender=Category)
+post_init.connect(remember_username, sender=User)
+post_save.connect(user_saved, sender=User)
+posts_bulk_changed.connect(posts_bulk_updated)
+posts_bulk_deleted.connect(posts_bulk_updated)
+
+
+class SitemapIndexView(View):
+    """
+    Индекс карты сайта: /sitemap.xml.
+    """
+
+    def get(self, request):
+        path = index_path()
+        if not path.exists():
+            path = write_index()
+        return file_response(request, path, content_type='application/xml')
+
+
+class SitemapSectionView(View):
+    """
+    Часть раздела карты сайта: /sitemap-<раздел>-<номер>.xml.
+    Файл пересобирается только после сброса (изменились посты части)
+    или когда в части наступила дата отложенной публикации.
+    Файлы создаются только для частей из диапазона id таблицы.
+    """
+
+    def get(self, request, section, chunk):
+        if section not in SECTIONS:
+            raise Http404('Неизвестный раздел карты сайта')
+        path = chunk_path(section, chunk)
+        exists = path.exists()
+        if not exists and chunk not in chunk_range(section):
+            raise Http404('Части карты сайта не существует')
+        if not exists or (
+            section in DUE_FIELDS
+            and has_due_posts(chunk, path, DUE_FIELDS[section])
+        ):
+            path = write_chunk(section, chunk)
+        return file_response(request, path, content_type='application/xml')
@@ -0,0 +1,369 @@
+from django.db import transaction  # Для атомарного пересчета статистики
+
+from django.db.models import (Count, DateTimeField, F, Max, Min, Subquery,
+                              Value)  # Для агрегатов и счетчиков
+
+from django.db.models.functions import Coalesce, Greatest  # Не ниже нуля
+
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)  # Для обновления статистики
+
+from django.utils import timezone  # Отложенные посты еще не опубликованы
+
+from blog.models import AuthorStats, Category, Comment, Post, User
+from blog.signals import (comments_bulk_changed, comments_bulk_deleted,
+                          posts_bulk_changed, posts_bulk_deleted)
+from blog.utils import published_only
+
+
+# id пользователей, которые сейчас удаляются: их статистика удаляется
+# каскадом и не должна создаваться заново сигналами зависимых строк
+_deleting_users = set()
+
+# Поля поста, от которых зависит, опубликован ли он и чей он
+STATE_FIELDS = ('author_id', 'is_published', 'pub_date', 'category_id')
+
+
+def is_being_deleted(user_id):
+    """
+    Проверяет, что пользователь удаляется (идет каскадное удаление).
+    """
+    return user_id in _deleting_users
+
+
+def refresh_due_stats(**filters):
+    """
+    Пересчитывает статистику авторов (отобранных filters), у которых
+    наступила дата отложенной публикации (next_post_at): об этом
+    не сообщает ни один сигнал. Один индексный запрос, если таких
+    авторов нет. Возвращает id пересчитанных авторов.
+    """
+    author_ids = list(AuthorStats.objects.filter(
+        next_post_at__lte=timezone.now(), **filters
+    ).values_list('user_id', flat=True))
+    if author_ids:
+        compute_author_stats(author_ids)
+    return author_ids
+
+
+def get_author_stats(user):
+    """
+    Возвращает статистику автора для профиля.
+    Если у пользователя еще нет записи, возвращается пустая (нулевая).
+    Если наступила дата отложенного поста автора, статистика
+    пересчитывается.
+    """
+    try:
+        stats = user.blog_stats
+    except AuthorStats.DoesNotExist:
+        return AuthorStats(user=user)
+    if stats.next_post_at is not None and (
+        stats.next_post_at <= timezone.now()
+    ):
+        compute_author_stats([user.pk])
+        stats = AuthorStats.objects.get(user=user)
+    return stats
+
+
+def stats_sources(apps, author_ids=None):
+    """
+    Возвращает запросы, из которых собирается статистика: поле автора
+    и агрегаты для каждого. Посты считаются по правилам published_only,
+    датой последней публикации считается pub_date. Для отложенных
+    постов запоминается ближайшая дата публикации (next_post_at).
+    """
+    posts = apps.get_model('blog', 'Post').objects.all()
+    sources = [
+        (published_only(posts), 'author_id', {
+            'post_count': Count('pk'), 'last_post_at': Max('pub_date'),
+        }),
+        (posts.filter(
+            is_published=True, category__is_published=True,
+            pub_date__gt=timezone.now(),
+        ), 'author_id', {'next_post_at': Min('pub_date')}),
+        (apps.get_model('blog', 'Comment').objects.all(),
+         'post__author_id', {'comment_count': Count('pk')}),
+    ]
+    try:
+        sources.append((apps.get_model('blog', 'Follow').objects.all(),
+                        'author_id', {'follower_count': Count('pk')}))
+    except LookupError:
+        # В миграции до появления подписок
+        pass
+    if author_ids is None:
+        return sources
+    return [
+        (queryset.filter(**{f'{author_field}__in': author_ids}),
+         author_field, aggregates)
+        for queryset, author_field, aggregates in sources
+    ]
+
+
+def collect_stats(stats, stats_model, queryset, author_field, aggregates):
+    """
+    Добавляет в stats агрегаты queryset, сгруппированные по автору.
+    """
+    for row in queryset.order_by().values(author_field).annotate(
+        **aggregates
+    ):
+        author_id = row.pop(author_field)
+        if author_id is None:
+            continue
+        stats.setdefault(author_id, stats_model(user_id=author_id))
+        for name, value in row.items():
+            setattr(stats[author_id], name, value)
+
+
+def compute_author_stats(author_ids=None, stats_model=None):
+    """
+    Пересчитывает статистику авторов author_ids (или всех авторов)
+    агрегирующими запросами по постам, комментариям и подпискам.
+    Принимает и историческую модель, поэтому используется в миграции.
+    Отложенные посты попадают в статистику, когда наступает их дата
+    (см. refresh_due_stats).
+    Возвращает количество сохраненных записей.
+    """
+    stats_model = stats_model or AuthorStats
+    stale = stats_model.objects.all()
+    if author_ids is not None:
+        # Статистика удаляемых пользователей не создается заново
+        author_ids = set(author_ids) - {None} - _deleting_users
+        if not author_ids:
+            return 0
+        stale = stale.filter(user_id__in=author_ids)
+
+    stats = {}
+    for source in stats_sources(stats_model._meta.apps, author_ids):
+        collect_stats(stats, stats_model, *source)
+    if author_ids is not None:
+        # Авторы без постов и комментариев получают нулевую запись
+        for author_id in author_ids - stats.keys():
+            stats[author_id] = stats_model(user_id=author_id)
+
+    with transaction.atomic():
+        stale.delete()
+        stats_model.objects.bulk_create(stats.values(), batch_size=1000)
+    return len(stats)
+
+
+def change_author_stats(author_id, post_count=0, comment_count=0,
+                        last_post_at=None, follower_count=0):
+    """
+    Изменяет статистику автора одним UPDATE без пересчета по постам.
+    author_id может быть подзапросом (см. post_author).
+    Если записи еще нет, она вычисляется целиком.
+    """
+    if author_id is None or is_being_deleted(author_id):
+        return
+    updates = {}
+    if post_count:
+        updates['post_count'] = Greatest(
+            F('post_count') + post_count, Value(0)
+        )
+    if comment_count:
+        updates['comment_count'] = Greatest(
+            F('comment_count') + comment_count, Value(0)
+        )
+    if follower_count:
+        updates['follower_count'] = Greatest(
+            F('follower_count') + follower_count, Value(0)
+        )
+    if last_post_at is not None:
+        last_post_at = Value(last_post_at, output_field=DateTimeField())
+        updates['last_post_at'] = Greatest(
+            Coalesce('last_post_at', last_post_at), last_post_at
+        )
+    if not updates:
+        return
+    if not AuthorStats.objects.filter(user_id=author_id).update(**updates):
+        compute_author_stats(
+            User.objects.filter(pk=author_id).values_list('pk', flat=True)
+        )
+
+
+def post_author(comment):
+    """
+    Возвращает id автора поста комментария. Если пост не загружен,
+    возвращается подзапрос: он выполняется внутри UPDATE статистики.
+    """
+    if Comment.post.is_cached(comment):
+        return comment.post.author_id
+    return Subquery(
+        Post.objects.filter(pk=comment.post_id).order_by().values(
+            'author_id'
+        )[:1]
+    )
+
+
+def is_published(post):
+    """
+    Проверяет пост по правилам published_only без запроса к постам
+    (категория обычно уже загружена формой).
+    """
+    return (
+        post.is_published
+        and post.pub_date <= timezone.now()
+        and post.category_id is not None
+        and post.category.is_published
+    )
+
+
+def remember_post_state(sender, instance, raw=False, **kwargs):
+    """
+    Перед сохранением поста запоминает автора и поля публикации.
+    """
+    if raw or instance._state.adding:
+        instance._stats_state = None
+        return
+    instance._stats_state = Post.objects.filter(pk=instance.pk).values(
+        *STATE_FIELDS
+    ).first()
+
+
+def post_saved(sender, instance, created=False, raw=False, **kwargs):
+    """
+    Новый опубликованный пост увеличивает счетчик автора, смена
+    автора, категории, даты или признака публикации приводят
+    к пересчету.
+    """
+    if raw:
+        return
+    old_state = getattr(instance, '_stats_state', None)
+    if created or old_state is None:
+        if is_published(instance):
+            change_author_stats(
+                instance.author_id,
+                post_count=1,
+                last_post_at=instance.pub_date,
+            )
+        elif instance.is_published:
+            # Отложенный пост: запоминается дата его публикации
+            compute_author_stats([instance.author_id])
+        return
+    if any(
+        old_state[name] != getattr(instance, name) for name in STATE_FIELDS
+    ):
+        compute_author_stats({old_state['author_id'], instance.author_id})
+
+
+def post_deleted(sender, instance, **kwargs):
+    """
+    После удаления поста статистика автора пересчитывается
+    (дата последней публикации могла измениться).
+    """
+    compute_author_stats([instance.author_id])
+
+
+def comment_saved(sender, instance, created=False, raw=False, **kwargs):
+    """
+    Новый комментарий увеличивает счетчик автора поста.
+    """
+    if created and not raw:
+        change_author_stats(post_author(instance), comment_count=1)
+
+
+def comment_deleted(sender, instance, **kwargs):
+    """
+    Удаленный комментарий уменьшает счетчик автора поста.
+    """
+    author_id = Post.objects.filter(pk=instance.post_id).values_list(
+        'author_id', flat=True
+    ).first()
+    change_author_stats(author_id, comment_count=-1)
+
+
+def posts_bulk_updated(sender, author_ids=(), fields=None, **kwargs):
+    """
+    Массовые операции над постами: статистика авторов пересчитывается.
+    """
+    fields = fields or {}
+    if fields and not {
+        'is_published', 'pub_date', 'author', 'author_id', 'category',
+        'category_id',
+    } & set(fields):
+        return
+    author_ids = set(author_ids)
+    author = fields.get('author', fields.get('author_id'))
+    if author is not None:
+        author_ids.add(getattr(author, 'pk', author))
+    compute_author_stats(author_ids)
+
+
+def comments_bulk_updated(sender, post_ids=(), fields=None, **kwargs):
+    """
+    Массовые операции над комментариями: пересчет авторов их постов.
+    """
+    fields = fields or {}
+    if fields and not {'post', 'post_id'} & set(fields):
+        return
+    post_ids = set(post_ids)
+    post = fields.get('post', fields.get('post_id'))
+    if post is not None:
+        post_ids.add(getattr(post, 'pk', post))
+    compute_author_stats(
+        Post.objects.filter(pk__in=post_ids).values_list(
+            'author_id', flat=True
+        )
+    )
+
+
+def category_authors(category):
+    """
+    Возвращает id авторов постов категории.
+    """
+    return set(
+        Post.objects.filter(category_id=category.pk).order_by()
+        .values_list('author_id', flat=True).distinct()
+    )
+
+
+def remember_category_authors(sender, instance, **kwargs):
+    """
+    Запоминает авторов постов категории до удаления (после него
+    у постов уже нет категории).
+    """
+    instance._stats_authors = category_authors(instance)
+
+
+def category_changed(sender, instance, created=False, raw=False, **kwargs):
+    """
+    Снятие категории с публикации (или ее удаление) скрывает ее посты:
+    статистика их авторов пересчитывается.
+    """
+    if created or raw:
+        return
+    authors = getattr(instance, '_stats_authors', None)
+    if authors is None:
+        authors = category_authors(instance)
+    compute_author_stats(authors)
+
+
+def user_deleting(sender, instance, **kwargs):
+    """
+    Запоминает удаляемого пользователя до каскадного удаления
+    его постов, комментариев и подписок.
+    """
+    _deleting_users.add(instance.pk)
+
+
+def user_deleted(sender, instance, **kwargs):
+    """
+    Удаление пользователя завершено.
+    """
+    _deleting_users.discard(instance.pk)
+
+
+pre_save.connect(remember_post_state, sender=Post)
+post_save.connect(post_saved, sender=Post)
+post_delete.connect(post_deleted, sender=Post)
+post_save.connect(comment_saved, sender=Comment)
+post_delete.connect(comment_deleted, sender=Comment)
+posts_bulk_changed.connect(posts_bulk_updated)
+posts_bulk_deleted.connect(posts_bulk_updated)
+comments_bulk_changed.connect(comments_bulk_updated)
+comments_bulk_deleted.connect(comments_bulk_updated)
+post_save.connect(category_changed, sender=Category)
+pre_delete.connect(remember_category_authors, sender=Category)
+post_delete.connect(category_changed, sender=Category)
+pre_delete.connect(user_deleting, sender=User)
+post_delete.connect(user_deleted, sender=User)
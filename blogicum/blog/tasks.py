@@ -0,0 +1,88 @@
+import logging  # Для записи ошибок фоновых задач
+
+import threading  # Для запуска фоновых задач в отдельном потоке
+
+from django.conf import settings  # Размер пачки и режим запуска
+
+from django.db import (close_old_connections,
+                       transaction)  # Соединения и транзакции
+
+logger = logging.getLogger(__name__)
+
+# Размер пачки по умолчанию для пакетной обработки строк
+BATCH_SIZE = 1000
+
+
+def get_batch_size():
+    """
+    Возвращает размер пачки для пакетных операций из настроек проекта.
+    """
+    return getattr(settings, 'BLOG_BATCH_SIZE', BATCH_SIZE)
+
+
+def iter_batches(queryset, *fields, batch_size=None):
+    """
+    Разбивает QuerySet на пачки кортежей (pk, *fields).
+    Использует постраничный обход по первичному ключу (keyset pagination),
+    поэтому каждая пачка читается одним индексным запросом и в память
+    не загружаются модели целиком.
+    Обход устойчив к изменению строк между пачками: курсор двигается
+    по pk, а не по смещению.
+    """
+    batch_size = batch_size or get_batch_size()
+
+    # Выбираем только нужные столбцы в порядке возрастания pk
+    rows_queryset = queryset.order_by('pk').values_list('pk', *fields)
+    last_pk = None
+    while True:
+        batch_queryset = rows_queryset
+        if last_pk is not None:
+            batch_queryset = batch_queryset.filter(pk__gt=last_pk)
+        batch = list(batch_queryset[:batch_size])
+        if not batch:
+            return
+        yield batch
+        # Неполная пачка означает, что строки закончились
+        if len(batch) < batch_size:
+            return
+        last_pk = batch[-1][0]
+
+
+def iter_pk_batches(queryset, batch_size=None):
+    """
+    Разбивает QuerySet на пачки первичных ключей.
+    """
+    for batch in iter_batches(queryset, batch_size=batch_size):
+        yield [row[0] for row in batch]
+
+
+def _run_task(func, args, kwargs):
+    """
+    Выполняет задачу в фоновом потоке и освобождает соединения с БД.
+    """
+    close_old_connections()
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception('Фоновая задача %s завершилась с ошибкой', func)
+    finally:
+        close_old_connections()
+
+
+def run_in_background(func, *args, **kwargs):
+    """
+    Запускает функцию в фоне после фиксации текущей транзакции.
+    Если включена настройка BLOG_TASKS_EAGER, функция выполняется сразу
+    в текущем потоке (удобно для разработки и тестов).
+    """
+    if getattr(settings, 'BLOG_TASKS_EAGER', False):
+        return func(*args, **kwargs)
+
+    def start():
+        threading.Thread(
+            target=_run_task, args=(func, args, kwargs), daemon=True
+        ).start()
+
+    # Поток стартует только после коммита, чтобы задача видела изменения
+    transaction.on_commit(start)
+    return None
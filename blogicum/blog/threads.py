@@ -0,0 +1,194 @@
+from django.conf import settings  # Для максимальной глубины ветвей
+
+from django.db import transaction  # Перенос ветви выполняется атомарно
+
+from django.db.models import F, Value  # Для пересчета пути и уровня в SQL
+
+from django.db.models.functions import Concat, Substr  # Замена начала пути
+
+from blog.models import Comment
+from blog.moderation import delete_comments
+from blog.tasks import iter_batches
+
+# Ширина сегмента пути: id комментария, дополненный нулями, поэтому
+# сравнение путей как строк совпадает с порядком id
+SEGMENT_WIDTH = 12
+
+# Символ сразу после цифр: все пути ветви лежат в [путь, путь + PATH_END)
+PATH_END = ':'
+
+# Максимальный уровень вложенности; ответ на комментарий этого уровня
+# становится ответом на его родителя (путь не длиннее 255 символов)
+COMMENT_MAX_DEPTH = 10
+
+
+def get_max_depth():
+    """
+    Возвращает максимальный уровень вложенности ответов.
+    """
+    return getattr(settings, 'BLOG_COMMENT_MAX_DEPTH', COMMENT_MAX_DEPTH)
+
+
+def segment(pk):
+    """
+    Возвращает сегмент пути для id комментария.
+    """
+    return f'{pk:0{SEGMENT_WIDTH}d}'
+
+
+def ancestor_ids(path):
+    """
+    Возвращает id предков и самого комментария из пути (без запросов).
+    """
+    return [
+        int(path[start:start + SEGMENT_WIDTH])
+        for start in range(0, len(path), SEGMENT_WIDTH)
+    ]
+
+
+def subtree_filter(comment):
+    """
+    Возвращает условия выборки ветви: диапазон индекса (post, path)
+    вместо LIKE, который индекс SQLite не использует.
+    """
+    return {
+        'post_id': comment.post_id,
+        'path__gte': comment.path,
+        'path__lt': comment.path + PATH_END,
+    }
+
+
+def thread(post_id, queryset=None):
+    """
+    Возвращает все комментарии поста в порядке веток: каждый ответ
+    сразу после своего родителя. Один запрос по индексу (post, path).
+    """
+    if queryset is None:
+        queryset = Comment.objects.all()
+    return queryset.filter(post_id=post_id).order_by('path')
+
+
+def subtree(comment, queryset=None):
+    """
+    Возвращает комментарий и все ответы на него в порядке веток.
+    Срез QuerySet - страница ветви одним запросом.
+    """
+    if queryset is None:
+        queryset = Comment.objects.all()
+    return queryset.filter(**subtree_filter(comment)).order_by('path')
+
+
+def reply_parent(parent):
+    """
+    Возвращает комментарий, к которому прикрепляется ответ на parent.
+    Ответ на комментарий максимального уровня прикрепляется
+    к его предку (объект собирается из пути без запроса).
+    """
+    max_depth = get_max_depth()
+    if parent.depth < max_depth:
+        return parent
+    ancestor_path = parent.path[:max_depth * SEGMENT_WIDTH]
+    return Comment(
+        pk=ancestor_ids(ancestor_path)[-1],
+        post_id=parent.post_id,
+        path=ancestor_path,
+        depth=max_depth - 1,
+    )
+
+
+def assign_path(comment):
+    """
+    Записывает путь и уровень нового комментария одним UPDATE.
+    Родитель читается из базы, только если он не загружен.
+    """
+    parent = None
+    if comment.parent_id is not None:
+        if Comment.parent.is_cached(comment):
+            parent = comment.parent
+        else:
+            parent = Comment.objects.only('path', 'depth').get(
+                pk=comment.parent_id
+            )
+    comment.path = (parent.path if parent else '') + segment(comment.pk)
+    comment.depth = parent.depth + 1 if parent else 0
+    Comment.objects.filter(pk=comment.pk).update(
+        path=comment.path, depth=comment.depth
+    )
+
+
+def fill_root_paths(comment_model=Comment):
+    """
+    Записывает пути комментариям без пути (созданным до появления
+    ветвей) как комментариям верхнего уровня. Принимает историческую
+    модель, поэтому используется в миграции.
+    """
+    for batch in iter_batches(comment_model.objects.filter(path='')):
+        comment_model.objects.bulk_update(
+            [
+                comment_model(pk=pk, path=segment(pk), depth=0)
+                for pk, in batch
+            ],
+            ['path', 'depth'],
+        )
+
+
+def delete_subtree(comment):
+    """
+    Удаляет комментарий со всеми ответами: ветвь выбирается
+    по диапазону пути и удаляется пачками (moderation.delete_comments).
+    Возвращает количество удаленных комментариев.
+    """
+    return delete_comments(subtree(comment))
+
+
+def check_move(comment, new_parent, branch_depths):
+    """
+    Проверяет, что ветвь comment можно перенести под new_parent,
+    и возвращает сдвиг уровня ветви.
+    """
+    if new_parent is not None:
+        if new_parent.post_id != comment.post_id:
+            raise ValueError('Ветвь можно перенести только в пределах поста')
+        if new_parent.path.startswith(comment.path):
+            raise ValueError('Ветвь нельзя перенести внутрь нее самой')
+    delta = (new_parent.depth + 1 if new_parent else 0) - comment.depth
+    if max(branch_depths, default=0) + delta > get_max_depth():
+        raise ValueError('Ветвь слишком глубокая для нового места')
+    return delta
+
+
+def move_subtree(comment, new_parent=None):
+    """
+    Переносит ветвь comment под new_parent (None - на верхний уровень).
+    Пути и уровни всей ветви меняются одним UPDATE: начало пути
+    заменяется новым, уровень сдвигается на разницу уровней.
+    Пути и уровни перечитываются и проверяются в той же транзакции
+    под блокировкой строк, поэтому одновременный перенос или ответ
+    не сделает ветвь глубже допустимого.
+    """
+    with transaction.atomic():
+        locked = Comment.objects.select_for_update().only(
+            'post_id', 'path', 'depth'
+        ).in_bulk([comment.pk] + ([new_parent.pk] if new_parent else []))
+        comment.path = locked[comment.pk].path
+        comment.depth = locked[comment.pk].depth
+        if new_parent is not None:
+            new_parent.path = locked[new_parent.pk].path
+            new_parent.depth = locked[new_parent.pk].depth
+        branch = Comment.objects.filter(**subtree_filter(comment))
+        delta = check_move(comment, new_parent, list(
+            branch.select_for_update().values_list('depth', flat=True)
+        ))
+        new_path = (
+            (new_parent.path if new_parent else '') + segment(comment.pk)
+        )
+        Comment.objects.filter(pk=comment.pk).update(parent=new_parent)
+        branch.update(
+            path=Concat(
+                Value(new_path), Substr('path', len(comment.path) + 1)
+            ),
+            depth=F('depth') + delta,
+        )
+    comment.parent = new_parent
+    comment.path = new_path
+    comment.depth += delta
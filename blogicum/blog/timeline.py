@@ -0,0 +1,308 @@
+from django.conf import settings  # Для чтения размера и срока жизни ленты
+
+from django.core.cache import caches  # Общий кэш для лент всех процессов
+
+from django.db.models import Min  # Для поиска ближайшей отложенной публикации
+
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)  # Обновление лент
+
+from django.utils import timezone  # Для проверки даты публикации
+
+from blog.models import Category, Post
+from blog.signals import posts_bulk_changed, posts_bulk_deleted
+from blog.utils import published_only
+
+# Сколько страниц каждой ленты хранится в кэше
+TIMELINE_PAGES = 5
+
+# Сколько постов на странице (совпадает с пагинацией ленты)
+TIMELINE_PAGE_SIZE = 10
+
+# Срок жизни ленты в кэше (секунды). Ограничивает время, в течение
+# которого лента может расходиться с базой при гонках между процессами.
+TIMELINE_TIMEOUT = 300
+
+# Порядок ленты: по дате публикации, при равных датах - по id
+TIMELINE_ORDERING = ('-pub_date', '-pk')
+
+# Ключ общей ленты; ленты категорий - 'category:<id>'
+INDEX_FEED = 'index'
+
+
+def get_setting(name, default):
+    """
+    Возвращает значение настройки BLOG_TIMELINE_<name> или значение
+    по умолчанию.
+    """
+    return getattr(settings, f'BLOG_TIMELINE_{name}', default)
+
+
+def get_cache():
+    """
+    Возвращает кэш для лент (настройка BLOG_TIMELINE_CACHE).
+    """
+    return caches[get_setting('CACHE', 'default')]
+
+
+def get_timeline_size():
+    """
+    Возвращает количество постов, которое хранится для каждой ленты.
+    """
+    return (
+        get_setting('PAGES', TIMELINE_PAGES)
+        * get_setting('PAGE_SIZE', TIMELINE_PAGE_SIZE)
+    )
+
+
+def category_feed(category_id):
+    """
+    Возвращает ключ ленты категории.
+    """
+    return f'category:{category_id}'
+
+
+def make_entry(pub_date, post_id):
+    """
+    Возвращает элемент ленты: кортеж для сортировки (время, id).
+    """
+    return (pub_date.timestamp(), post_id)
+
+
+def feed_queryset(feed, queryset=None):
+    """
+    Возвращает QuerySet постов ленты feed (без проверки публикации).
+    """
+    if queryset is None:
+        queryset = Post.objects.all()
+    if feed != INDEX_FEED:
+        queryset = queryset.filter(category_id=int(feed.split(':')[1]))
+    return queryset
+
+
+def build_timeline(feed):
+    """
+    Собирает ленту из базы: первые посты, общее количество
+    и время ближайшей отложенной публикации, после которой лента
+    должна быть пересобрана.
+    """
+    now = timezone.now()
+    queryset = feed_queryset(feed)
+    published = published_only(queryset).order_by(*TIMELINE_ORDERING)
+    entries = [
+        make_entry(pub_date, post_id)
+        for post_id, pub_date in published.values_list(
+            'pk', 'pub_date'
+        )[:get_timeline_size()]
+    ]
+    next_pub_date = queryset.filter(
+        is_published=True,
+        category__is_published=True,
+        pub_date__gt=now,
+    ).aggregate(next_pub_date=Min('pub_date'))['next_pub_date']
+    return {
+        'entries': entries,
+        'count': published.count(),
+        'valid_until': next_pub_date.timestamp() if next_pub_date else None,
+    }
+
+
+def get_timeline(feed):
+    """
+    Возвращает ленту из кэша, при необходимости собирая ее заново.
+    """
+    cache = get_cache()
+    timeline = cache.get(feed)
+    valid_until = timeline and timeline['valid_until']
+    if timeline is None or (
+        valid_until and valid_until <= timezone.now().timestamp()
+    ):
+        timeline = build_timeline(feed)
+        cache.set(feed, timeline, get_setting('TIMEOUT', TIMELINE_TIMEOUT))
+    return timeline
+
+
+def invalidate(*feeds):
+    """
+    Удаляет ленты из кэша (они соберутся заново при следующем запросе).
+    """
+    get_cache().delete_many(feeds)
+
+
+def update_timeline(feed, post_id, was_visible, entry, pending_at=None):
+    """
+    Обновляет ленту в кэше после изменения одного поста без запросов к БД.
+    entry - новый элемент ленты или None, если пост в ленте не виден.
+    pending_at - время отложенной публикации поста (если она в будущем).
+    """
+    cache = get_cache()
+    timeline = cache.get(feed)
+    if timeline is None:
+        return
+    entries = [item for item in timeline['entries'] if item[1] != post_id]
+    # Список полный, если в нем все посты ленты
+    complete = len(timeline['entries']) == timeline['count']
+    timeline['count'] += (entry is not None) - bool(was_visible)
+    if entry is not None and (complete or (entries and entry > entries[-1])):
+        entries.append(entry)
+        entries.sort(reverse=True)
+    timeline['entries'] = entries[:get_timeline_size()]
+    if pending_at is not None and (
+        timeline['valid_until'] is None
+        or pending_at < timeline['valid_until']
+    ):
+        timeline['valid_until'] = pending_at
+    cache.set(feed, timeline, get_setting('TIMEOUT', TIMELINE_TIMEOUT))
+
+
+def get_visibility(post_id):
+    """
+    Возвращает из базы данные поста, от которых зависит его видимость.
+    """
+    return Post.objects.filter(pk=post_id).values(
+        'is_published', 'pub_date', 'category_id', 'category__is_published'
+    ).first()
+
+
+def is_visible(state, now):
+    """
+    Проверяет, виден ли пост в лентах (те же условия, что published_only).
+    """
+    return bool(
+        state
+        and state['is_published']
+        and state['category__is_published']
+        and state['pub_date'] <= now
+    )
+
+
+def remember_visibility(sender, instance, raw=False, **kwargs):
+    """
+    Перед сохранением или удалением поста запоминает его видимость
+    до изменения.
+    """
+    if not raw and instance.pk is not None:
+        instance._timeline_state = get_visibility(instance.pk)
+
+
+def apply_post_change(post_id, old_state, new_state):
+    """
+    Переносит изменение видимости одного поста в общую ленту
+    и ленты категорий (старой и новой).
+    """
+    now = timezone.now()
+    was_visible = is_visible(old_state, now)
+    visible = is_visible(new_state, now)
+    entry = make_entry(new_state['pub_date'], post_id) if visible else None
+    pending_at = None
+    if (
+        new_state
+        and new_state['is_published']
+        and new_state['category__is_published']
+        and not visible
+    ):
+        pending_at = new_state['pub_date'].timestamp()
+    old_category = old_state and old_state['category_id']
+    new_category = new_state and new_state['category_id']
+    update_timeline(INDEX_FEED, post_id, was_visible, entry, pending_at)
+    if new_category:
+        update_timeline(
+            category_feed(new_category),
+            post_id,
+            was_visible and old_category == new_category,
+            entry,
+            pending_at,
+        )
+    if old_category and old_category != new_category:
+        update_timeline(
+            category_feed(old_category), post_id, was_visible, None
+        )
+
+
+def post_saved(sender, instance, raw=False, **kwargs):
+    """
+    Обновляет ленты после сохранения поста.
+    """
+    if raw:
+        return
+    old_state = getattr(instance, '_timeline_state', None)
+    apply_post_change(instance.pk, old_state, get_visibility(instance.pk))
+    instance._timeline_state = None
+
+
+def post_deleted(sender, instance, **kwargs):
+    """
+    Убирает удаленный пост из лент.
+    """
+    old_state = getattr(instance, '_timeline_state', None)
+    apply_post_change(instance.pk, old_state, None)
+
+
+def category_changed(sender, instance, **kwargs):
+    """
+    Снятие категории с публикации меняет видимость всех ее постов.
+    """
+    invalidate(INDEX_FEED, category_feed(instance.pk))
+
+
+def posts_bulk_updated(sender, category_ids=(), fields=None, **kwargs):
+    """
+    Массовые операции меняют много постов сразу: ленты собираются заново.
+    """
+    feeds = {INDEX_FEED, *(category_feed(pk) for pk in category_ids)}
+    fields = fields or {}
+    # Перенос в категорию: update_posts(category=...) или (category_id=...)
+    category = fields.get('category', fields.get('category_id'))
+    if category is not None:
+        feeds.add(category_feed(getattr(category, 'pk', category)))
+    invalidate(*feeds)
+
+
+pre_save.connect(remember_visibility, sender=Post)
+pre_delete.connect(remember_visibility, sender=Post)
+post_save.connect(post_saved, sender=Post)
+post_delete.connect(post_deleted, sender=Post)
+post_save.connect(category_changed, sender=Category)
+post_delete.connect(category_changed, sender=Category)
+posts_bulk_changed.connect(posts_bulk_updated)
+posts_bulk_deleted.connect(posts_bulk_updated)
+
+
+class TimelineFeed:
+    """
+    Лента постов для Paginator: первые страницы берутся из кэша
+    (список id) и загружаются одним запросом по первичному ключу,
+    дальние страницы читаются из базы обычным запросом.
+    """
+
+    model = Post
+    ordered = True
+
+    def __init__(self, feed, queryset):
+        self.feed = feed
+        # Запрос для загрузки постов (select_related, annotate и т.д.)
+        self.queryset = queryset
+        self.timeline = get_timeline(feed)
+
+    def count(self):
+        return self.timeline['count']
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop, _ = index.indices(self.count())
+        entries = self.timeline['entries']
+        if stop > len(entries):
+            # Страница за пределами кэша
+            return list(
+                published_only(
+                    feed_queryset(self.feed, self.queryset)
+                ).order_by(*TIMELINE_ORDERING)[start:stop]
+            )
+        ids = [post_id for _, post_id in entries[start:stop]]
+        posts = self.queryset.in_bulk(ids)
+        # Посты, удаленные после сборки ленты, пропускаются
+        return [posts[post_id] for post_id in ids if post_id in posts]
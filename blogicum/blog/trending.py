@@ -0,0 +1,312 @@
+import math  # Экспоненциальное затухание оценок в логарифмической шкале
+
+from datetime import timedelta  # Окно комментариев при сборке рейтинга
+
+from django.conf import settings  # Для периода полураспада и размера рейтинга
+
+from django.core.cache import caches  # Рейтинг хранится в общем кэше
+
+from django.db.models import (Case, Count, IntegerField, Value,
+                              When)  # Порядок постов по рейтингу
+
+from django.db.models.functions import TruncHour  # Комментарии по часам
+
+from django.db.models.signals import post_delete, post_save  # Комментарии
+
+from django.utils import timezone  # Для времени событий
+
+from blog.models import Comment, Post
+from blog.signals import (comments_bulk_changed, comments_bulk_deleted,
+                          post_views_recorded, posts_bulk_deleted)
+from blog.tasks import run_in_background
+from blog.utils import published_only
+
+# Период полураспада оценки (секунды): вклад комментария или просмотра
+# уменьшается вдвое за это время
+TRENDING_HALF_LIFE = 6 * 60 * 60
+
+# При сборке из БД читаются комментарии за столько периодов полураспада
+# (более старые дают меньше 1/256 своего веса)
+TRENDING_WINDOW = 8
+
+# Сколько постов хранится в рейтинге
+TRENDING_SIZE = 500
+
+# Сколько постов показывается в ленте /trending/
+TRENDING_ITEMS = 50
+
+# Вес комментария и просмотра в оценке
+TRENDING_COMMENT_WEIGHT = 1.0
+TRENDING_VIEW_WEIGHT = 0.1
+
+# Посты с оценкой ниже этой (после затухания) удаляются из рейтинга
+TRENDING_MIN_SCORE = 0.05
+
+# Срок жизни рейтинга в кэше (секунды); после него рейтинг
+# собирается из БД заново
+TRENDING_TIMEOUT = 24 * 60 * 60
+
+# Ключ рейтинга в кэше
+TRENDING_KEY = 'trending'
+
+
+def get_setting(name, default):
+    """
+    Возвращает значение настройки BLOG_TRENDING_<name> или значение
+    по умолчанию.
+    """
+    return getattr(settings, f'BLOG_TRENDING_{name}', default)
+
+
+def get_cache():
+    """
+    Возвращает кэш для рейтинга (тот же, что у лент).
+    """
+    return caches[getattr(settings, 'BLOG_TIMELINE_CACHE', 'default')]
+
+
+def decay_rate():
+    """
+    Возвращает скорость затухания (в секунду) для периода полураспада.
+    """
+    return math.log(2) / get_setting('HALF_LIFE', TRENDING_HALF_LIFE)
+
+
+def event_score(weight, timestamp):
+    """
+    Возвращает вклад события в логарифмической шкале:
+    log(weight * e^(rate * t)). Оценка поста - сумма вкладов его событий,
+    ее значение в момент now равно e^(score - rate * now). Сдвиг
+    на rate * now одинаков для всех постов, поэтому порядок рейтинга
+    со временем не меняется и хранимые оценки не нужно пересчитывать.
+    """
+    return math.log(weight) + decay_rate() * timestamp
+
+
+def log_add(score, other):
+    """
+    Возвращает log(e^score + e^other) без переполнения.
+    """
+    if score is None:
+        return other
+    high, low = max(score, other), min(score, other)
+    return high + math.log1p(math.exp(low - high))
+
+
+def log_subtract(score, other):
+    """
+    Возвращает log(e^score - e^other) или None, если разность
+    не положительна (вклад больше оставшейся оценки).
+    """
+    if score is None or other >= score:
+        return None
+    return score + math.log1p(-math.exp(other - score))
+
+
+def trim(scores, now):
+    """
+    Убирает затухшие посты и оставляет не больше TRENDING_SIZE лучших.
+    """
+    threshold = event_score(
+        get_setting('MIN_SCORE', TRENDING_MIN_SCORE), now
+    )
+    scores = {
+        post_id: score for post_id, score in scores.items()
+        if score >= threshold
+    }
+    size = get_setting('SIZE', TRENDING_SIZE)
+    if len(scores) > size:
+        scores = dict(
+            sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            [:size]
+        )
+    return scores
+
+
+def comment_time(hour_start):
+    """
+    Возвращает время, которым считается комментарий часа hour_start:
+    середину часа. Одинаковое время при сборке и при добавлении
+    или удалении отдельного комментария нужно, чтобы удаление точно
+    снимало тот вклад, который был учтен.
+    """
+    return hour_start.timestamp() + 30 * 60
+
+
+def build_scores():
+    """
+    Собирает рейтинг из БД: комментарии за окно, сгруппированные
+    по постам и часам (одна строка на пост и час, а не на комментарий).
+    Просмотры не имеют времени в БД и начинают учитываться заново.
+    """
+    now = timezone.now().timestamp()
+    since = timezone.now() - timedelta(
+        seconds=get_setting('HALF_LIFE', TRENDING_HALF_LIFE)
+        * TRENDING_WINDOW
+    )
+    weight = get_setting('COMMENT_WEIGHT', TRENDING_COMMENT_WEIGHT)
+    rows = Comment.objects.filter(
+        is_published=True, created_at__gte=since
+    ).annotate(hour=TruncHour('created_at')).order_by().values(
+        'post_id', 'hour'
+    ).annotate(count=Count('pk')).values_list('post_id', 'hour', 'count')
+    scores = {}
+    for post_id, hour, count in rows.iterator():
+        scores[post_id] = log_add(
+            scores.get(post_id),
+            event_score(weight * count, comment_time(hour)),
+        )
+    return trim(scores, now)
+
+
+def get_scores():
+    """
+    Возвращает рейтинг из кэша, при необходимости собирая его заново.
+    """
+    cache = get_cache()
+    scores = cache.get(TRENDING_KEY)
+    if scores is None:
+        scores = build_scores()
+        cache.set(
+            TRENDING_KEY, scores, get_setting('TIMEOUT', TRENDING_TIMEOUT)
+        )
+    return scores
+
+
+def update_scores(changes, removed=()):
+    """
+    Применяет к рейтингу в кэше вклады changes - тройки (id поста,
+    вклад, знак) - и убирает посты removed. Запросов к БД не выполняет:
+    если рейтинга в кэше нет, он будет собран из БД при чтении
+    (и учтет эти комментарии). Одновременные изменения из разных
+    процессов могут потерять событие - для рейтинга это допустимо.
+    """
+    cache = get_cache()
+    scores = cache.get(TRENDING_KEY)
+    if scores is None:
+        return
+    for post_id, score, sign in changes:
+        if sign > 0:
+            scores[post_id] = log_add(scores.get(post_id), score)
+            continue
+        scores[post_id] = log_subtract(scores.get(post_id), score)
+        if scores[post_id] is None:
+            del scores[post_id]
+    for post_id in removed:
+        scores.pop(post_id, None)
+    cache.set(
+        TRENDING_KEY,
+        trim(scores, timezone.now().timestamp()),
+        get_setting('TIMEOUT', TRENDING_TIMEOUT),
+    )
+
+
+def invalidate():
+    """
+    Удаляет рейтинг из кэша (он соберется заново при следующем запросе).
+    """
+    get_cache().delete(TRENDING_KEY)
+
+
+def get_trending_ids(limit=None):
+    """
+    Возвращает id постов рейтинга по убыванию оценки.
+    """
+    scores = get_scores()
+    ids = sorted(scores, key=scores.get, reverse=True)
+    return ids[:limit or get_setting('ITEMS', TRENDING_ITEMS)]
+
+
+def trending_posts(queryset=None):
+    """
+    Возвращает QuerySet видимых постов рейтинга в порядке рейтинга:
+    один запрос по первичному ключу вместо агрегации комментариев.
+    """
+    ids = get_trending_ids()
+    queryset = published_only(queryset)
+    if not ids:
+        return queryset.none()
+    return queryset.filter(pk__in=ids).order_by(Case(
+        *(When(pk=post_id, then=Value(position))
+          for position, post_id in enumerate(ids)),
+        output_field=IntegerField(),
+    ))
+
+
+def comment_score(comment):
+    """
+    Возвращает вклад комментария в оценку его поста.
+    """
+    return event_score(
+        get_setting('COMMENT_WEIGHT', TRENDING_COMMENT_WEIGHT),
+        # Час берется в текущей зоне, как у TruncHour при сборке
+        comment_time(timezone.localtime(comment.created_at).replace(
+            minute=0, second=0, microsecond=0
+        )),
+    )
+
+
+def comment_saved(sender, instance, created=False, raw=False, **kwargs):
+    """
+    Новый опубликованный комментарий повышает оценку поста. Рейтинг
+    (до TRENDING_SIZE постов) перезаписывается в фоне, а не в запросе.
+    """
+    if created and not raw and instance.is_published:
+        run_in_background(
+            update_scores, [(instance.post_id, comment_score(instance), 1)]
+        )
+
+
+def comment_deleted(sender, instance, **kwargs):
+    """
+    Удаленный комментарий снимает свой вклад с оценки поста.
+    """
+    if instance.is_published:
+        run_in_background(
+            update_scores, [(instance.post_id, comment_score(instance), -1)]
+        )
+
+
+def comments_bulk_updated(sender, fields=None, **kwargs):
+    """
+    Массовое скрытие или удаление комментариев: рейтинг собирается
+    заново (вклады отдельных комментариев не известны).
+    """
+    if fields is None or 'is_published' in fields:
+        invalidate()
+
+
+def post_deleted(sender, instance, **kwargs):
+    """
+    Убирает удаленный пост из рейтинга.
+    """
+    run_in_background(update_scores, [], removed=[instance.pk])
+
+
+def posts_bulk_removed(sender, post_ids=(), **kwargs):
+    """
+    Убирает из рейтинга посты, удаленные пачкой.
+    """
+    run_in_background(update_scores, [], removed=list(post_ids))
+
+
+def views_recorded(sender, counts=None, **kwargs):
+    """
+    Записанные просмотры повышают оценки постов (сигнал отправляется
+    из фонового сброса счетчиков, поэтому рейтинг обновляется сразу).
+    """
+    now = timezone.now().timestamp()
+    weight = get_setting('VIEW_WEIGHT', TRENDING_VIEW_WEIGHT)
+    update_scores([
+        (post_id, event_score(weight * count, now), 1)
+        for post_id, count in (counts or {}).items() if count > 0
+    ])
+
+
+post_save.connect(comment_saved, sender=Comment)
+post_delete.connect(comment_deleted, sender=Comment)
+comments_bulk_changed.connect(comments_bulk_updated)
+comments_bulk_deleted.connect(comments_bulk_updated)
+post_delete.connect(post_deleted, sender=Post)
+posts_bulk_deleted.connect(posts_bulk_removed)
+post_views_recorded.connect(views_recorded)
@@ -1,6 +1,6 @@
 from django.urls import include, path
 
-from blog import views
+from blog import api, feeds, sitemaps, views
 
 # Определяем пространство имен для URL этого приложения
 app_name = 'blog'
@@ -56,6 +56,28 @@ posts_urls = [
         views.CommentDeleteView.as_view(), 
         name='delete_comment',  
     ),
+
+    # Отметки «нравится» к посту и комментарию (только авторизованным)
+    path(
+        '<int:post_id>/like/',
+        views.LikeView.as_view(),
+        name='like_post'
+    ),
+    path(
+        '<int:post_id>/unlike/',
+        views.LikeView.as_view(liked=False),
+        name='unlike_post'
+    ),
+    path(
+        '<int:post_id>/like_comment/<int:comment_id>/',
+        views.LikeView.as_view(target='comment'),
+        name='like_comment'
+    ),
+    path(
+        '<int:post_id>/unlike_comment/<int:comment_id>/',
+        views.LikeView.as_view(target='comment', liked=False),
+        name='unlike_comment'
+    ),
 ]#---4
 
 
@@ -68,6 +90,18 @@ profile_urls = [
         name='edit_profile' 
     ),
     
+    # Подписка на автора и отписка от него
+    path(
+        '<str:username>/follow/',
+        views.FollowView.as_view(),
+        name='follow'
+    ),
+    path(
+        '<str:username>/unfollow/',
+        views.FollowView.as_view(follow=False),
+        name='unfollow'
+    ),
+
     # Просмотр профиля любого пользователя по его username
     path(
         '<str:username>/', 
@@ -77,6 +111,55 @@ profile_urls = [
 ]
 
 
+# Группа URL-адресов JSON API (только чтение) для мобильных клиентов
+api_urls = [
+    # Лента опубликованных постов
+    path('posts/', api.ApiPostListView.as_view(), name='api_posts'),
+
+    # Пост с полным текстом
+    path(
+        'posts/<int:pk>/',
+        api.ApiPostDetailView.as_view(),
+        name='api_post_detail'
+    ),
+
+    # Комментарии к посту
+    path(
+        'posts/<int:pk>/comments/',
+        api.ApiCommentListView.as_view(),
+        name='api_post_comments'
+    ),
+
+    # Лента постов категории
+    path(
+        'categories/<slug:category_slug>/posts/',
+        api.ApiCategoryPostListView.as_view(),
+        name='api_category_posts'
+    ),
+]
+
+
+# Группа URL-адресов лент RSS/Atom (формат: rss или atom)
+feed_urls = [
+    # Общая лента
+    path('', feeds.SyndicationFeedView.as_view(), name='feed'),
+
+    # Лента категории
+    path(
+        'category/<slug:category_slug>/',
+        feeds.SyndicationFeedView.as_view(),
+        name='category_feed'
+    ),
+
+    # Лента публикаций автора
+    path(
+        'profile/<str:username>/',
+        feeds.SyndicationFeedView.as_view(),
+        name='profile_feed'
+    ),
+]
+
+
 # Основной список URL-адресов приложения blog ---4
 urlpatterns = [
     # Главная страница блога (список всех опубликованных постов)
@@ -86,11 +169,50 @@ urlpatterns = [
         name='index'
     ),
     
+    # Лента самых читаемых постов
+    path(
+        'popular/',
+        views.PopularPostsView.as_view(),
+        name='popular'
+    ),
+
+    # Личная лента по подпискам
+    path(
+        'following/',
+        views.FollowingFeedView.as_view(),
+        name='following'
+    ),
+
+    # Лента обсуждаемых постов (недавние комментарии и просмотры)
+    path(
+        'trending/',
+        views.TrendingPostsView.as_view(),
+        name='trending'
+    ),
+
     # Подключение всех маршрутов для работы с постами 
     path('posts/', include(posts_urls)), #---4
     
     # Подключение всех маршрутов для работы с профилями 
     path('profile/', include(profile_urls)),
+
+    # Подключение маршрутов JSON API
+    path('api/', include(api_urls)),
+
+    # Подключение лент RSS/Atom
+    path('feeds/<str:feed_format>/', include(feed_urls)),
+
+    # Индекс карты сайта и ее части по разделам
+    path(
+        'sitemap.xml',
+        sitemaps.SitemapIndexView.as_view(),
+        name='sitemap'
+    ),
+    path(
+        'sitemap-<str:section>-<int:chunk>.xml',
+        sitemaps.SitemapSectionView.as_view(),
+        name='sitemap_section'
+    ),
     
     # Отображение постов конкретной категории по её slug (человекочитаемый идентификатор)
     path(
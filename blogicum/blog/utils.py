@@ -4,7 +4,7 @@ from .models import Post           # Модель Post из текущего п
 
 from django.core.paginator import Paginator  # Для разбиения результатов на страницы
 
-from django.db.models import Count           # Для агрегации и подсчета комментариев
+from django.db.models import Count, Q        # Для агрегации и подсчета комментариев
 
 
 def published_only(queryset=None): # --- 13 2.4 Параметр с значением по умолчанию
@@ -31,6 +31,26 @@ def published_only(queryset=None): # --- 13 2.4 Параметр с значен
 
 
 
+def visible_to(user, queryset=None):
+    """
+    Фильтрует QuerySet, оставляя посты, доступные пользователю:
+    опубликованные (см. published_only) и его собственные.
+    Условия объединяются в одном WHERE, поэтому проверка одного поста
+    выполняется одним запросом EXISTS.
+    """
+    if queryset is None:
+        queryset = Post.objects.all()
+    published = Q(
+        is_published=True,
+        pub_date__lte=timezone.now(),
+        category__is_published=True,
+    )
+    if user.is_authenticated:
+        published |= Q(author=user)
+    return queryset.filter(published)
+
+
+
 def get_paginated_page(queryset, request, per_page=10): # --- 11
     """
     Создает пагинацию для QuerySet.
@@ -51,9 +71,10 @@ def get_paginated_page(queryset, request, per_page=10): # --- 11
 def get_posts_with_comments(show_all=False, queryset=None): # --- 9 2.3
     """
     Возвращает QuerySet постов с оптимизацией запросов и подсчетом комментариев.
-    Выполняет две ключевые оптимизации:
+    Выполняет ключевые оптимизации:
     1. select_related - предзагружает связанные объекты (категория, местоположение, автор)
-    2. annotate - подсчитывает количество комментариев для каждого поста
+    2. defer - не загружает полный текст поста, в карточках выводится excerpt
+    3. annotate - подсчитывает количество комментариев для каждого поста
     """
     
     # Если queryset не передан, используем все посты
@@ -67,6 +88,8 @@ def get_posts_with_comments(show_all=False, queryset=None): # --- 9 2.3
     # Оптимизация запросов к базе данных
     queryset = queryset.select_related(
         'category', 'location', 'author'
+    ).defer(
+        'text'  # Карточкам ленты нужен только краткий текст (excerpt)
     ).annotate(
         comment_count=Count('comments')  # Подсчитывает количество комментариев
     )
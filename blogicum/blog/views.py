@@ -1,22 +1,50 @@
 from django.contrib.auth.mixins import LoginRequiredMixin  # Для ограничения доступа авторизованным пользователям
 
+from django.db import transaction  # Комментарий и счетчики сохраняются атомарно
+
+from django.http import Http404, HttpResponseRedirect  # Ответ 404 и перенаправление после удаления
+
 from django.shortcuts import get_object_or_404  # Для безопасного получения объектов или возврата 404
 
 from django.urls import reverse  # Для генерации URL по имени маршрута
 
-from .utils import published_only  # Утилита для фильтрации опубликованных постов
+from .utils import published_only, visible_to  # Утилиты для фильтрации доступных постов
 
 from django.utils import timezone  # Для работы с датами и временем
 
+from django.utils.http import url_has_allowed_host_and_scheme  # Возврат только на страницы сайта
+
 from django.views.generic import (CreateView, DeleteView, DetailView, ListView,
-                                  UpdateView)  
+                                  UpdateView, View)  
+
+from core.http import IMMUTABLE_CACHE_CONTROL, sendfile_response  # Отдача файла приложением или веб-сервером
+
+from core.storage import is_content_hashed  # Файлы с хэшем в имени не меняются
+
+from blog.counters import record_view  # Буферизованный счетчик просмотров
+
+from blog.deletion import schedule_post_deletion  # Фоновое удаление поста с комментариями
+
+from blog.following import FollowingFeed  # Личная лента по подпискам
 
 from blog.forms import CommentForm, PostForm, UserForm 
 
-from blog.mixins import CommentChangeMixin, CustomListMixin, PostChangeMixin 
+from blog.mixins import (CommentChangeMixin, CustomListMixin, PostChangeMixin,
+                         RateLimitMixin)
+
+from blog.models import Category, Comment, Follow, Post, User  
+
+from blog.reactions import liked_ids, set_like  # Отметки «нравится»
+
+from blog.related import get_related_posts  # Заранее вычисленные похожие посты
 
-from blog.models import Category, Comment, Post, User  
+from blog.stats import get_author_stats  # Статистика автора для профиля
 
+from blog.threads import delete_subtree, reply_parent, thread  # Ветви комментариев
+
+from blog.timeline import INDEX_FEED, TimelineFeed, category_feed  # Кэшированные ленты
+
+from blog.trending import trending_posts  # Рейтинг обсуждаемых постов
 
 
 class IndexHome(CustomListMixin, ListView):
@@ -27,15 +55,42 @@ class IndexHome(CustomListMixin, ListView):
 
     def get_queryset(self):
         """
-        Возвращает QuerySet постов для главной страницы.
-        Использует объединенную функцию для получения только опубликованных постов.
+        Возвращает ленту постов для главной страницы.
+        Первые страницы берутся из кэша лент (blog.timeline), посты
+        загружаются объединенной функцией с подсчетом комментариев.
         """
         # Импортируем функцию внутри метода для избежания циклических импортов
         from .utils import get_posts_with_comments
-        # Получаем только опубликованные посты для всех пользователей
-        return get_posts_with_comments(show_all=False)
+        # Первые страницы ленты - список id из кэша, посты загружаются по pk
+        return TimelineFeed(INDEX_FEED, get_posts_with_comments(show_all=True))
+
+
+class PopularPostsView(CustomListMixin, ListView):
+    """Контроллер ленты самых читаемых постов."""
+
+    template_name = 'blog/popular.html'
+
+    def get_queryset(self):
+        """
+        Возвращает опубликованные посты по убыванию числа просмотров.
+        """
+        return published_only(super().get_queryset()).order_by(
+            '-view_count', '-pub_date', '-pk'
+        )
 
 
+class TrendingPostsView(CustomListMixin, ListView):
+    """Контроллер ленты обсуждаемых постов."""
+
+    template_name = 'blog/trending.html'
+
+    def get_queryset(self):
+        """
+        Возвращает посты по убыванию оценки: недавние комментарии
+        и просмотры с затуханием. Рейтинг читается из кэша
+        (blog.trending), посты загружаются одним запросом по pk.
+        """
+        return trending_posts(super().get_queryset())
 
 
 class ProfileView(CustomListMixin, ListView): #--- 7 12
@@ -49,6 +104,16 @@ class ProfileView(CustomListMixin, ListView): #--- 7 12
         """
         context = super().get_context_data(**kwargs)
         context['profile'] = self.author
+        # Готовая статистика автора (без подсчета по его постам)
+        context['stats'] = get_author_stats(self.author)
+        # Подписан ли текущий пользователь на автора (один EXISTS)
+        context['is_following'] = (
+            self.request.user.is_authenticated
+            and self.request.user != self.author
+            and Follow.objects.filter(
+                follower=self.request.user, author=self.author
+            ).exists()
+        )
         return context
 
     def get_queryset(self): # --- 7 12
@@ -57,7 +122,11 @@ class ProfileView(CustomListMixin, ListView): #--- 7 12
         Автор видит все свои посты, другие пользователи - только опубликованные.
         """
         # Получаем пользователя по username
-        self.author = get_object_or_404(User, username=self.kwargs['username'])
+        # (вместе со статистикой автора в одном запросе)
+        self.author = get_object_or_404(
+            User.objects.select_related('blog_stats'),
+            username=self.kwargs['username'],
+        )
         
         # Получаем базовый QuerySet с аннотацией комментариев
         base_qs = super().get_queryset()
@@ -74,6 +143,42 @@ class ProfileView(CustomListMixin, ListView): #--- 7 12
         return author_qs
 
 
+class FollowingFeedView(LoginRequiredMixin, CustomListMixin, ListView):
+    """Контроллер личной ленты: посты авторов, на которых подписан пользователь."""
+
+    template_name = 'blog/following.html'
+
+    def get_queryset(self):
+        """
+        Возвращает ленту из входящих пользователя (blog.following):
+        страница читается одним диапазоном индекса, посты загружаются по pk.
+        """
+        return FollowingFeed(self.request.user, super().get_queryset())
+
+
+class FollowView(LoginRequiredMixin, View):
+    """Контроллер подписки на автора и отписки от него."""
+
+    # True - подписаться, False - отписаться
+    follow = True
+
+    def post(self, request, username):
+        """
+        Создает или удаляет подписку и возвращает на страницу автора.
+        """
+        author = get_object_or_404(User, username=username)
+        if self.follow and author != request.user:
+            Follow.objects.get_or_create(follower=request.user, author=author)
+        elif not self.follow:
+            # Удаление по одной строке: сигнал обновляет счетчик и ленту
+            for follow in Follow.objects.filter(
+                follower=request.user, author=author
+            ):
+                follow.delete()
+        return HttpResponseRedirect(
+            reverse('blog:profile', kwargs={'username': username})
+        )
+
 
 class ProfileUpdateView(LoginRequiredMixin, UpdateView):
     """Контроллер для редактирования профиля текущего пользователя."""
@@ -98,7 +203,6 @@ class ProfileUpdateView(LoginRequiredMixin, UpdateView):
         )
 
 
-
 class CategoryListView(CustomListMixin, ListView): # --- 7
     """Контроллер для отображения постов в конкретной категории."""
     
@@ -106,7 +210,7 @@ class CategoryListView(CustomListMixin, ListView): # --- 7
 
     def get_queryset(self): # ---7
         """
-        Возвращает QuerySet постов определенной категории.
+        Возвращает ленту постов определенной категории.
         Проверяет, что категория существует и опубликована.
         """
         # Получаем категорию по slug, проверяя что она опубликована
@@ -115,12 +219,9 @@ class CategoryListView(CustomListMixin, ListView): # --- 7
         # Получаем базовый QuerySet с аннотацией комментариев из миксина
         base_qs = super().get_queryset()
         
-        # Фильтруем по категории
-        filtered_qs = base_qs.filter(category__slug=self.kwargs['category_slug'])
-        
-        # Применяем фильтрацию опубликованных постов
-        from .utils import published_only
-        return published_only(filtered_qs)
+        # Лента категории из кэша (фильтрация по категории и публикации
+        # выполняется при ее сборке)
+        return TimelineFeed(category_feed(self.category.pk), base_qs)
 
     def get_context_data(self, **kwargs):
         """
@@ -131,8 +232,12 @@ class CategoryListView(CustomListMixin, ListView): # --- 7
         return context
 
 
-class PostCreateView(LoginRequiredMixin, CreateView): #--- 6 14
+class PostCreateView(LoginRequiredMixin, RateLimitMixin, CreateView): #--- 6 14
     """Контроллер для создания нового поста."""
+
+    # Область и лимит по умолчанию для частоты создания постов
+    rate_limit_scope = 'post_create'
+    rate_limit = '10/m'
     
     model = Post  # Модель поста --- 14
     form_class = PostForm  # Форма для создания поста 
@@ -156,7 +261,6 @@ class PostCreateView(LoginRequiredMixin, CreateView): #--- 6 14
         )#---
 
 
-
 class PostUpdateView(LoginRequiredMixin, PostChangeMixin, UpdateView):
     """Контроллер для редактирования существующего поста."""
     
@@ -169,9 +273,17 @@ class PostUpdateView(LoginRequiredMixin, PostChangeMixin, UpdateView):
         return reverse('blog:post_detail', args=[self.kwargs['post_id']])
 
 
-
 class PostDeleteView(LoginRequiredMixin, PostChangeMixin, DeleteView):
     """Контроллер для удаления поста."""
+
+    def delete(self, request, *args, **kwargs):
+        """
+        Пост сразу скрывается, а его комментарии удаляются в фоне
+        пачками (стандартное удаление загрузило бы их все в память).
+        """
+        self.object = self.get_object()
+        schedule_post_deletion(self.object)
+        return HttpResponseRedirect(self.get_success_url())
     
     def get_context_data(self, **kwargs):
         """
@@ -191,7 +303,6 @@ class PostDeleteView(LoginRequiredMixin, PostChangeMixin, DeleteView):
         )
 
 
-
 class PostDetailView(DetailView): # --- 16 2.5 2.6
     """
     Контроллер для детального просмотра поста.
@@ -207,17 +318,33 @@ class PostDetailView(DetailView): # --- 16 2.5 2.6
         Возвращает объект поста с проверкой прав доступа.
         """
         # Первый вызов - проверка существования поста
-        post = get_object_or_404(Post, pk=self.kwargs['pk'])
+        # (исходный текст не нужен: выводится сохраненный HTML из rendered)
+        post = get_object_or_404(
+            Post.objects.select_related('rendered').defer('text'),
+            pk=self.kwargs['pk']
+        )
     
         # Второй вызов - проверка доступности для текущего пользователя
         if post.author != self.request.user:
             # Если пользователь не автор, проверяем опубликован ли пост
             post = get_object_or_404(
-                published_only(Post.objects.all()),
+                published_only(
+                    Post.objects.select_related('rendered').defer('text')
+                ),
                 pk=self.kwargs['pk']
             )
         return post
 
+    def get(self, request, *args, **kwargs):
+        """
+        Отдает страницу поста и учитывает просмотр (кроме просмотров
+        автором). Просмотр записывается в буфер, а не в БД.
+        """
+        response = super().get(request, *args, **kwargs)
+        if self.object.author_id != request.user.pk:
+            record_view(self.object.pk)
+        return response
+
     def get_context_data(self, **kwargs): # --- 2.6
         """
         Добавляет форму для комментария и список комментариев в контекст.
@@ -226,15 +353,34 @@ class PostDetailView(DetailView): # --- 16 2.5 2.6
         # Форма для добавления нового комментария
         context['form'] = CommentForm()
         # Список комментариев к посту с оптимизацией запросов
-        context['comments'] = (
-            self.object.comments.select_related('author') # Использование поля связи
+        # (ветви подряд: один запрос по индексу (post, path))
+        context['comments'] = thread(
+            self.object.pk,
+            Comment.objects.select_related('author', 'rendered')
+            .defer('text')  # Выводится сохраненный HTML из rendered
+        )
+        # Отметки пользователя: пост и комментарии одним запросом каждые
+        # (ответы кэшируются, см. blog.reactions)
+        comments = context['comments']
+        self.object.is_liked = bool(
+            liked_ids(self.request.user, 'post', [self.object.pk])
+        )
+        liked = liked_ids(
+            self.request.user, 'comment', [comment.pk for comment in comments]
         )
+        for comment in comments:
+            comment.is_liked = comment.pk in liked
+        # Похожие посты (вычислены заранее, см. blog.related)
+        context['related_posts'] = get_related_posts(self.object)
         return context
 
 
-
-class CommentCreateView(LoginRequiredMixin, CreateView): # ---14
+class CommentCreateView(LoginRequiredMixin, RateLimitMixin, CreateView): # ---14
     """Контроллер для создания нового комментария."""
+
+    # Область и лимит по умолчанию для частоты создания комментариев
+    rate_limit_scope = 'comment_create'
+    rate_limit = '30/m'
     
     model = Comment  # Модель комментария
     form_class = CommentForm  # Форма для комментария
@@ -243,14 +389,32 @@ class CommentCreateView(LoginRequiredMixin, CreateView): # ---14
     def form_valid(self, form):
         """
         Обрабатывает валидную форму, устанавливая автора и пост для комментария.
-        """
+        Пост не загружается: его наличие и доступность (как на странице
+        поста) проверяются одним запросом EXISTS. Проверка выполняется
+        до транзакции, чтобы транзакция начиналась сразу с записи
+        и SQLite не приходилось повышать блокировку чтения до записи.
+        """
+        post_id = self.kwargs.get('post_id')
+        if not visible_to(self.request.user).filter(pk=post_id).exists():
+            raise Http404('Пост не найден')
         # Устанавливаем текущего пользователя как автора комментария
         form.instance.author = self.request.user
-        # Находим пост по ID из URL и привязываем к комментарию
-        form.instance.post = get_object_or_404(
-            Post, pk=self.kwargs.get('post_id')
-        )
-        return super().form_valid(form)
+        # Привязываем комментарий к посту по ID из URL
+        form.instance.post_id = post_id
+        # Ответ на комментарий того же поста (путь родителя нужен
+        # для пути ответа, поэтому он читается здесь)
+        parent_id = self.request.POST.get('parent')
+        if parent_id:
+            parent = Comment.objects.filter(
+                pk=parent_id if parent_id.isdigit() else None,
+                post_id=post_id,
+            ).only('post_id', 'path', 'depth').first()
+            if parent is None:
+                raise Http404('Комментарий не найден')
+            form.instance.parent = reply_parent(parent)
+        # Комментарий, его HTML и счетчики автора сохраняются вместе
+        with transaction.atomic():
+            return super().form_valid(form)
 
     def get_success_url(self) -> str:
         """
@@ -260,15 +424,111 @@ class CommentCreateView(LoginRequiredMixin, CreateView): # ---14
                        kwargs={'pk': self.kwargs.get('post_id')})
 
 
-
 class CommentUpdateView(LoginRequiredMixin, CommentChangeMixin, UpdateView):
     """Контроллер для редактирования существующего комментария."""
     
     form_class = CommentForm  # Форма для редактирования комментария
 
 
-
 class CommentDeleteView(LoginRequiredMixin, CommentChangeMixin, DeleteView):
     """Контроллер для удаления комментария."""
     
-    # Наследует все необходимые методы из CommentChangeMixin
\ No newline at end of file
+    # Наследует все необходимые методы из CommentChangeMixin
+
+    def delete(self, request, *args, **kwargs):
+        """
+        Удаляет комментарий вместе с ответами на него: ветвь выбирается
+        по диапазону пути и удаляется пачками, без загрузки объектов.
+        """
+        self.object = self.get_object()
+        delete_subtree(self.object)
+        return HttpResponseRedirect(self.get_success_url())
+
+
+class LikeView(LoginRequiredMixin, RateLimitMixin, View):
+    """Контроллер отметок «нравится» к постам и комментариям."""
+
+    # Что отмечается: 'post' или 'comment' (см. blog.reactions.TARGETS)
+    target = 'post'
+
+    # True - поставить отметку, False - снять
+    liked = True
+
+    rate_limit_scope = 'like'
+    rate_limit = '60/m'
+
+    def post(self, request, post_id, comment_id=None):
+        """
+        Ставит или снимает отметку и возвращает на страницу, с которой
+        она поставлена (или на страницу поста). Доступность поста
+        проверяется одним запросом EXISTS.
+        """
+        visible = visible_to(request.user)
+        if self.target == 'comment':
+            exists = Comment.objects.filter(
+                pk=comment_id, post_id=post_id, post__in=visible
+            ).exists()
+        else:
+            exists = visible.filter(pk=post_id).exists()
+        if not exists:
+            raise Http404('Публикация не найдена')
+        set_like(
+            request.user, self.target,
+            comment_id if self.target == 'comment' else post_id,
+            self.liked,
+        )
+        next_url = request.POST.get('next')
+        if not url_has_allowed_host_and_scheme(
+            next_url, allowed_hosts={request.get_host()},
+            require_https=request.is_secure(),
+        ):
+            next_url = reverse('blog:post_detail', args=[post_id])
+        return HttpResponseRedirect(next_url)
+
+
+class PostImageView(View):
+    """
+    Контроллер для отдачи изображений постов (MEDIA_ROOT/post_images/).
+    Права доступа те же, что у PostDetailView: изображение неопубликованного
+    поста видит только его автор.
+    """
+
+    # Изображение опубликованного поста может кэшироваться и прокси
+    public_cache_control = 'public, max-age=86400'
+    # Изображение, доступное только автору, кэширует лишь его браузер
+    private_cache_control = 'private, max-age=0, must-revalidate'
+
+    def get(self, request, name):
+        """
+        Проверяет права на изображение и отдает файл (с поддержкой Range).
+        """
+        name = f'post_images/{name}'
+        posts = Post.objects.filter(image=name)
+        # Автор видит изображения своих постов, остальные - только опубликованных
+        visible = published_only(posts)
+        if request.user.is_authenticated:
+            visible = visible | posts.filter(author=request.user)
+        post = visible.only('author_id', 'image').first()
+        if post is None:
+            raise Http404
+        # Файл ищется в хранилище самого поля (ContentHashStorage)
+        if not post.image.storage.exists(name):
+            raise Http404
+        return sendfile_response(
+            request,
+            post.image.path,
+            name,
+            cache_control=self.get_cache_control(post, name),
+        )
+
+    def get_cache_control(self, post, name):
+        """
+        Возвращает Cache-Control для изображения.
+        Содержимое файла с хэшем в имени никогда не меняется,
+        поэтому опубликованное изображение кэшируется навсегда.
+        """
+        if post.author_id == self.request.user.pk:
+            return self.private_cache_control
+        if is_content_hashed(name):
+            return IMMUTABLE_CACHE_CONTROL
+        return self.public_cache_control
@@ -5,3 +5,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogicum.settings')
 
 application = get_asgi_application()
+
+# Компилируем шаблоны до первого запроса (см. settings_production.py)
+from core.warmup import warmup_if_enabled  # noqa: E402
+
+warmup_if_enabled()
@@ -0,0 +1,78 @@
+"""Окружение Jinja2 для шаблонов ленты (каталог jinja2/).
+
+Подключается, только если установлен пакет jinja2 (см. settings.TEMPLATES).
+"""
+from functools import lru_cache
+from urllib.parse import quote
+
+from django.template import defaultfilters
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils import formats
+from django.utils.http import RFC3986_SUBDELIMS
+from django.utils.timezone import template_localtime
+from jinja2 import Environment
+
+# Значение-заглушка, которое подставляется в URL при его предрасчете
+URL_PLACEHOLDER = '00000000'
+
+# Символы, которые reverse() не экранирует в URL
+URL_SAFE = RFC3986_SUBDELIMS + '/~:@'
+
+
+@lru_cache(maxsize=None)
+def url_parts(view_name):
+    """Вернуть начало и конец URL маршрута с одним аргументом.
+
+    reverse() выполняется один раз на процесс, дальше URL собирается
+    подстановкой аргумента между ними.
+    """
+    prefix, _, suffix = reverse(
+        view_name, args=[URL_PLACEHOLDER]
+    ).partition(URL_PLACEHOLDER)
+    return prefix, suffix
+
+
+def url_helper(view_name):
+    """Вернуть функцию, строящую URL маршрута по одному аргументу.
+
+    Аргумент экранируется так же, как его экранирует reverse()
+    (например, имена пользователей не латиницей).
+    """
+    def build(arg):
+        prefix, suffix = url_parts(view_name)
+        return prefix + quote(str(arg), safe=URL_SAFE) + suffix
+    return build
+
+
+def url(view_name, *args, **kwargs):
+    """Аналог тега {% url %} для остальных маршрутов."""
+    return reverse(view_name, args=args or None, kwargs=kwargs or None)
+
+
+def date(value, arg=None):
+    """Аналог фильтра date с переводом во временную зону шаблонов."""
+    return defaultfilters.date(template_localtime(value), arg)
+
+
+def localize(value):
+    """Вывести значение так же, как {{ value }} в шаблонах Django."""
+    return formats.localize(template_localtime(value))
+
+
+def environment(**options):
+    env = Environment(**options)
+    env.globals.update({
+        'static': static,
+        'url': url,
+        'post_url': url_helper('blog:post_detail'),
+        'edit_post_url': url_helper('blog:edit_post'),
+        'delete_post_url': url_helper('blog:delete_post'),
+        'profile_url': url_helper('blog:profile'),
+        'category_url': url_helper('blog:category_posts'),
+    })
+    env.filters.update({
+        'date': date,
+        'localize': localize,
+    })
+    return env
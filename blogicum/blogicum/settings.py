@@ -62,6 +62,30 @@ TEMPLATES = [
     },
 ]
 
+# Необязательный движок Jinja2 для шаблонов ленты (каталог jinja2/).
+# Подключается, только если установлен пакет jinja2.
+try:
+    import jinja2  # noqa: F401
+except ImportError:
+    pass
+else:
+    TEMPLATES.append({
+        'BACKEND': 'django.template.backends.jinja2.Jinja2',
+        'NAME': 'jinja2',
+        'DIRS': [BASE_DIR / 'jinja2'],
+        'APP_DIRS': False,
+        'OPTIONS': {
+            'environment': 'blogicum.jinja2.environment',
+            'context_processors': [
+                'django.contrib.auth.context_processors.auth',
+            ],
+        },
+    })
+
+# Движок шаблонов для лент (главная, категория, профиль):
+# None - шаблоны Django, 'jinja2' - шаблоны Jinja2
+BLOG_FEED_TEMPLATE_ENGINE = None
+
 WSGI_APPLICATION = 'blogicum.wsgi.application'
 
 
@@ -72,6 +96,9 @@ DATABASES = {
     }
 }
 
+# PRAGMA для новых соединений SQLite (см. core.db.configure_sqlite)
+SQLITE_PRAGMAS = {}
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -107,6 +134,9 @@ STATICFILES_DIRS = [
     BASE_DIR / 'static_blogicum',
 ]
 
+# Каталог, в который collectstatic собирает статику для production
+STATIC_ROOT = BASE_DIR / 'static_collected'
+
 CSRF_FAILURE_VIEW = 'pages.views.csrf_failure'
 
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
@@ -118,3 +148,105 @@ LOGIN_REDIRECT_URL = 'blog:index'
 LOGIN_URL = 'login'
 
 MEDIA_ROOT = BASE_DIR / 'media'
+
+MEDIA_URL = '/media/'
+
+# Загрузки больше 1 МБ Django пишет во временный файл, а не в память
+FILE_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024
+
+# Лимиты для изображений постов (см. blog.images)
+BLOG_IMAGE_MAX_BYTES = 10 * 1024 * 1024
+BLOG_IMAGE_MAX_PIXELS = 40_000_000
+BLOG_IMAGE_MAX_SIZE = (1600, 1600)
+BLOG_IMAGE_QUALITY = 85
+
+# Выгрузка отдачи медиафайлов веб-серверу: None (отдает приложение),
+# 'X-Sendfile' (Apache, lighttpd) или 'X-Accel-Redirect' (nginx)
+MEDIA_SENDFILE_HEADER = None
+
+# Внутренний location nginx, из которого отдаются файлы MEDIA_ROOT
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+
+# Фоновые задачи блога: при True выполняются сразу в текущем потоке
+BLOG_TASKS_EAGER = DEBUG
+
+# Размер пачки для массовых операций над постами и комментариями
+BLOG_BATCH_SIZE = 1000
+
+# Выборки больше этого размера обрабатываются в фоне
+BLOG_BULK_SYNC_LIMIT = 5000
+
+# Ограничение частоты создания постов и комментариев (на пользователя)
+BLOG_RATE_LIMITS = {
+    'post_create': '10/m',
+    'comment_create': '30/m',
+    'like': '60/m',
+}
+
+# Персональные лимиты: {'username': {'post_create': '100/h'}}
+BLOG_RATE_LIMIT_USERS = {}
+
+# Хранилище корзин: blog.ratelimit.MemoryStore или blog.ratelimit.CacheStore
+BLOG_RATE_LIMIT_STORE = 'blog.ratelimit.MemoryStore'
+
+# Кэш лент (blog.timeline): сколько страниц общей ленты и лент категорий
+# хранится в виде списка id и сколько секунд живет запись.
+# При нескольких процессах кэш должен быть общим (Redis, Memcached).
+BLOG_TIMELINE_CACHE = 'default'
+BLOG_TIMELINE_PAGES = 5
+BLOG_TIMELINE_PAGE_SIZE = 10
+BLOG_TIMELINE_TIMEOUT = 300
+
+# JSON API (blog.api): размер страницы по умолчанию и максимальный,
+# страницы больше BLOG_API_STREAM_THRESHOLD отдаются потоком
+BLOG_API_PAGE_SIZE = 20
+BLOG_API_MAX_PAGE_SIZE = 500
+BLOG_API_STREAM_THRESHOLD = 100
+
+# Ленты RSS/Atom (blog.feeds): количество постов и срок жизни снимка
+BLOG_SYNDICATION_ITEMS = 20
+BLOG_SYNDICATION_TIMEOUT = 24 * 60 * 60
+
+# Карта сайта (blog.sitemaps): каталог файлов, количество id в одной части
+# и адрес сайта для абсолютных URL в файлах
+BLOG_SITEMAP_ROOT = BASE_DIR / 'sitemaps'
+BLOG_SITEMAP_CHUNK_SIZE = 50000
+BLOG_SITEMAP_BASE_URL = 'http://localhost:8000'
+
+# Ветви комментариев (blog.threads): максимальный уровень вложенности;
+# ответ на комментарий этого уровня прикрепляется к его родителю
+BLOG_COMMENT_MAX_DEPTH = 10
+
+# Счетчик просмотров (blog.counters): запись в БД после стольких
+# просмотров или через столько секунд после предыдущей записи
+BLOG_VIEW_FLUSH_THRESHOLD = 100
+BLOG_VIEW_FLUSH_INTERVAL = 30
+
+# Отметки «нравится» (blog.reactions): пересчет счетчиков после стольких
+# отметок или через столько секунд; срок жизни отметок пользователя в кэше
+BLOG_LIKE_FLUSH_THRESHOLD = 100
+BLOG_LIKE_FLUSH_INTERVAL = 10
+BLOG_LIKE_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Рейтинг обсуждаемых постов (blog.trending): период полураспада оценки
+# (секунды), размер рейтинга, длина ленты и веса комментария и просмотра
+BLOG_TRENDING_HALF_LIFE = 6 * 60 * 60
+BLOG_TRENDING_SIZE = 500
+BLOG_TRENDING_ITEMS = 50
+BLOG_TRENDING_COMMENT_WEIGHT = 1.0
+BLOG_TRENDING_VIEW_WEIGHT = 0.1
+
+# Похожие посты (blog.related): каталог индекса, размер списка
+# и веса совпадения категории и местоположения (вес текста - 1)
+BLOG_RELATED_ROOT = BASE_DIR / 'related'
+BLOG_RELATED_COUNT = 5
+BLOG_RELATED_CATEGORY_WEIGHT = 0.3
+BLOG_RELATED_LOCATION_WEIGHT = 0.1
+
+# Личные ленты (blog.following): посты авторов с большим числом
+# подписчиков не раскладываются во входящие, а читаются при показе;
+# при подписке в ленту попадают последние посты автора; количество
+# записей ленты для пагинации хранится в кэше BLOG_FEED_COUNT_TIMEOUT секунд
+BLOG_FEED_FANOUT_LIMIT = 10000
+BLOG_FEED_BACKFILL = 50
+BLOG_FEED_COUNT_TIMEOUT = 60
@@ -0,0 +1,70 @@
+"""Настройки для production-окружения.
+
+Запуск: DJANGO_SETTINGS_MODULE=blogicum.settings_production.
+Переменная окружения DJANGO_DEBUG=1 включает режим отладки
+(шаблоны при этом снова читаются с диска на каждый запрос).
+"""
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import MIDDLEWARE, TEMPLATES
+
+DEBUG = os.getenv('DJANGO_DEBUG', '').lower() in ('1', 'true', 'yes')
+
+SECRET_KEY = os.getenv('DJANGO_SECRET_KEY', SECRET_KEY)  # noqa: F405
+
+ALLOWED_HOSTS = os.getenv(
+    'DJANGO_ALLOWED_HOSTS', ','.join(ALLOWED_HOSTS)  # noqa: F405
+).split(',')
+
+# В production фоновые задачи выполняются в отдельном потоке
+BLOG_TASKS_EAGER = DEBUG
+
+# Загрузчики шаблонов: без отладки скомпилированные шаблоны кэшируются
+# в памяти процесса и не перечитываются с диска.
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if not DEBUG:
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
+
+# APP_DIRS несовместим с явным списком загрузчиков
+TEMPLATES = [
+    {
+        **TEMPLATES[0],
+        'APP_DIRS': False,
+        'OPTIONS': {
+            **TEMPLATES[0]['OPTIONS'],
+            'debug': DEBUG,
+            'loaders': TEMPLATE_LOADERS,
+        },
+    },
+    *TEMPLATES[1:],
+]
+
+# Компилировать все шаблоны при старте процесса (см. core.warmup)
+TEMPLATE_WARMUP = not DEBUG
+
+# Статика: хэш содержимого в именах файлов, сжатые копии .gz/.br
+# и раздача из STATIC_ROOT самим приложением с Cache-Control: immutable
+STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+
+MIDDLEWARE = [
+    MIDDLEWARE[0],
+    'core.middleware.StaticFilesMiddleware',
+    *MIDDLEWARE[1:],
+]
+
+# Изображения постов отдаются через веб-сервер после проверки прав
+MEDIA_SENDFILE_HEADER = os.getenv('DJANGO_MEDIA_SENDFILE_HEADER') or None
+
+# SQLite в режиме WAL: чтение не блокирует запись комментариев и постов,
+# одновременные записи ждут друг друга до busy_timeout миллисекунд
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+}
@@ -5,6 +5,8 @@ from django.contrib.auth.forms import UserCreationForm
 from django.urls import include, path, reverse_lazy
 from django.views.generic.edit import CreateView
 
+from blog.views import PostImageView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('pages/', include('pages.urls', namespace='pages')),
@@ -18,6 +20,12 @@ urlpatterns = [
         name='registration',
     ),
     path('auth/', include('django.contrib.auth.urls')),
+    # Изображения постов отдаются с проверкой прав и в production
+    path(
+        settings.MEDIA_URL.lstrip('/') + 'post_images/<path:name>',
+        PostImageView.as_view(),
+        name='post_image',
+    ),
     path('', include('blog.urls', namespace='blog')),
 ]
 
@@ -0,0 +1,17 @@
+from django.conf import settings
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Применить PRAGMA из настройки SQLITE_PRAGMAS к новому соединению.
+
+    Например, {'journal_mode': 'wal', 'busy_timeout': 5000}: в режиме
+    WAL читатели не блокируют запись и не ждут ее, а запись ждет
+    освобождения базы до busy_timeout миллисекунд вместо ошибки
+    "database is locked". Для других СУБД ничего не делает.
+    """
+    pragmas = getattr(settings, "SQLITE_PRAGMAS", None)
+    if connection.vendor != "sqlite" or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
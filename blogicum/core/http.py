@@ -0,0 +1,192 @@
+import mimetypes
+import os
+import re
+from email.utils import formatdate
+
+from django.conf import settings
+from django.http import (FileResponse, HttpResponse, HttpResponseNotModified,
+                         StreamingHttpResponse)
+from django.utils.http import parse_http_date_safe
+
+# Заголовок Cache-Control для файлов, имя которых содержит хэш содержимого
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Поддерживается только один диапазон: bytes=0-99, bytes=100-, bytes=-100
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# Размер блока при потоковой отдаче части файла
+RANGE_CHUNK_SIZE = 64 * 1024
+
+
+def file_etag(stat_result):
+    """Вернуть слабый ETag файла по размеру и времени изменения."""
+    return 'W/"{:x}-{:x}"'.format(
+        stat_result.st_size, int(stat_result.st_mtime)
+    )
+
+
+def is_not_modified(request, etag, last_modified):
+    """Проверить условные заголовки запроса (If-None-Match и т.д.)."""
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+    if if_none_match is not None:
+        etags = {tag.strip() for tag in if_none_match.split(",")}
+        return "*" in etags or etag in etags
+    if_modified_since = parse_http_date_safe(
+        request.META.get("HTTP_IF_MODIFIED_SINCE", "")
+    )
+    return (
+        if_modified_since is not None
+        and int(last_modified) <= if_modified_since
+    )
+
+
+def parse_range(header, size):
+    """Вернуть диапазон (start, end) включительно из заголовка Range.
+
+    None означает, что заголовок нужно проигнорировать и отдать файл
+    целиком (нет заголовка, несколько диапазонов, другие единицы).
+    Для диапазона за пределами файла возвращается (size, size).
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Суффикс: последние N байт
+        return max(size - int(last), 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start > end:
+        return None if last and start > int(last) else (size, size)
+    return start, end
+
+
+def is_range_current(request, last_modified):
+    """Проверить If-Range: диапазон отдается, только если файл не изменился.
+
+    ETag у файлов слабый, а If-Range требует строгого сравнения,
+    поэтому совпадением считается только дата Last-Modified.
+    """
+    if_range = request.META.get("HTTP_IF_RANGE")
+    return if_range is None or if_range.strip() == last_modified
+
+
+def iter_file_range(path, start, length):
+    """Читать length байт файла начиная с позиции start блоками."""
+    with open(path, "rb") as source:
+        source.seek(start)
+        while length > 0:
+            chunk = source.read(min(RANGE_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def range_response(request, path, content_type, stat_result, last_modified):
+    """Вернуть ответ 206/416 на запрос Range или None для полного файла."""
+    if request.method != "GET" or not is_range_current(
+        request, last_modified
+    ):
+        return None
+    size = stat_result.st_size
+    byte_range = parse_range(request.META.get("HTTP_RANGE"), size)
+    if byte_range is None:
+        return None
+    start, end = byte_range
+    if start >= size:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = "bytes */{}".format(size)
+        return response
+    response = StreamingHttpResponse(
+        iter_file_range(path, start, end - start + 1),
+        status=206,
+        content_type=content_type,
+    )
+    response["Content-Length"] = end - start + 1
+    response["Content-Range"] = "bytes {}-{}/{}".format(start, end, size)
+    return response
+
+
+def file_response(
+    request,
+    path,
+    content_type=None,
+    cache_control=None,
+    stat_result=None,
+    headers=None,
+    allow_ranges=False,
+):
+    """Отдать файл с диска с поддержкой условных запросов.
+
+    Тело ответа читается потоково через FileResponse, в память файл
+    целиком не загружается. Если клиент уже имеет актуальную копию,
+    возвращается 304 без открытия файла. При allow_ranges=True
+    обрабатывается заголовок Range (докачка, перемотка видео и т.п.).
+    """
+    stat_result = stat_result or os.stat(path)
+    etag = file_etag(stat_result)
+    last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+    if content_type is None:
+        content_type = (
+            mimetypes.guess_type(path)[0] or "application/octet-stream"
+        )
+    response = None
+    if is_not_modified(request, etag, stat_result.st_mtime):
+        response = HttpResponseNotModified()
+    elif allow_ranges:
+        response = range_response(
+            request, path, content_type, stat_result, last_modified
+        )
+    if response is None:
+        response = FileResponse(open(path, "rb"), content_type=content_type)
+        response["Content-Length"] = stat_result.st_size
+    if allow_ranges:
+        response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = last_modified
+    if cache_control:
+        response["Cache-Control"] = cache_control
+    for name, value in (headers or {}).items():
+        response[name] = value
+    return response
+
+
+def sendfile_response(
+    request,
+    path,
+    name,
+    content_type=None,
+    cache_control=None,
+):
+    """Отдать файл через веб-сервер (X-Sendfile / X-Accel-Redirect).
+
+    Включается настройкой MEDIA_SENDFILE_HEADER. Приложение только
+    проверяет права и заголовки, а чтение файла, Range и передачу байтов
+    выполняет nginx или Apache. Для X-Accel-Redirect путь строится от
+    внутреннего location MEDIA_ACCEL_REDIRECT_PREFIX. Если выгрузка
+    не настроена, файл отдается приложением (см. file_response).
+    """
+    header = getattr(settings, "MEDIA_SENDFILE_HEADER", None)
+    if not header:
+        return file_response(
+            request,
+            path,
+            content_type=content_type,
+            cache_control=cache_control,
+            allow_ranges=True,
+        )
+    if content_type is None:
+        content_type = (
+            mimetypes.guess_type(path)[0] or "application/octet-stream"
+        )
+    response = HttpResponse(content_type=content_type)
+    if header == "X-Accel-Redirect":
+        response[header] = (
+            settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + name
+        )
+    else:
+        response[header] = os.fspath(path)
+    if cache_control:
+        response["Cache-Control"] = cache_control
+    return response
@@ -0,0 +1,156 @@
+import mimetypes
+import os
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.http import HttpResponseNotAllowed
+from django.utils.cache import patch_vary_headers
+
+from core.http import IMMUTABLE_CACHE_CONTROL, file_response
+from core.storage import is_compressed_variant
+
+# Cache-Control для статики без хэша в имени (может измениться при деплое)
+DEFAULT_STATIC_CACHE_CONTROL = "public, max-age=60"
+
+# Сжатые копии в порядке предпочтения: (кодировка, суффикс файла)
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+StaticFile = namedtuple(
+    "StaticFile", ["path", "stat", "content_type", "variants", "immutable"]
+)
+
+
+def parse_accept_encoding(header):
+    """Вернуть словарь {кодировка: q} из заголовка Accept-Encoding.
+
+    Кодировка без параметра q получает вес 1, неразборчивый q - вес 0.
+    """
+    weights = {}
+    for item in header.split(","):
+        name, *params = item.split(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name] = weight
+    return weights
+
+
+def choose_variant(variants, header):
+    """Вернуть сжатую копию с наибольшим весом q или None.
+
+    Копии с q=0 не отдаются; "*" задает вес для неперечисленных
+    кодировок; при равных весах действует порядок ENCODINGS.
+    """
+    weights = parse_accept_encoding(header)
+    best, best_weight = None, 0.0
+    for variant in variants:
+        weight = weights.get(variant[0], weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = variant, weight
+    return best
+
+
+class StaticFilesMiddleware:
+    """Раздача собранной статики (STATIC_ROOT) самим приложением.
+
+    Работает без CDN и отдельного веб-сервера:
+    - список файлов строится один раз при первом запросе, поэтому поиск
+      файла стоит один поиск в словаре без обращения к диску;
+    - клиенту отдается сжатая копия .br или .gz в зависимости от
+      заголовка Accept-Encoding;
+    - файлы с хэшем содержимого в имени кэшируются браузером навсегда
+      (Cache-Control: immutable), для остальных задан короткий срок;
+    - поддерживаются условные запросы (ETag, If-Modified-Since).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL
+        self.files = None
+
+    def __call__(self, request):
+        if request.path_info.startswith(self.prefix):
+            static_file = self.get_files().get(
+                request.path_info[len(self.prefix):]
+            )
+            if static_file is not None:
+                return self.serve(request, static_file)
+        return self.get_response(request)
+
+    def get_files(self):
+        if self.files is None:
+            self.files = self.scan(settings.STATIC_ROOT)
+        return self.files
+
+    @staticmethod
+    def get_immutable_names():
+        """Вернуть имена файлов с хэшем содержимого из манифеста."""
+        hashed_names = getattr(staticfiles_storage, "hashed_names", None)
+        if hashed_names is None:
+            return set()
+        return hashed_names()
+
+    def scan(self, root):
+        """Построить словарь {имя файла: StaticFile} по каталогу root."""
+        files = {}
+        if not root or not os.path.isdir(root):
+            return files
+        immutable_names = self.get_immutable_names()
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                if is_compressed_variant(path):
+                    continue
+                name = os.path.relpath(path, root).replace(os.sep, "/")
+                variants = []
+                for encoding, suffix in ENCODINGS:
+                    if os.path.exists(path + suffix):
+                        variants.append(
+                            (encoding, path + suffix, os.stat(path + suffix))
+                        )
+                files[name] = StaticFile(
+                    path=path,
+                    stat=os.stat(path),
+                    content_type=(
+                        mimetypes.guess_type(path)[0]
+                        or "application/octet-stream"
+                    ),
+                    variants=variants,
+                    immutable=name in immutable_names,
+                )
+        return files
+
+    def serve(self, request, static_file):
+        if request.method not in ("GET", "HEAD"):
+            return HttpResponseNotAllowed(["GET", "HEAD"])
+        path, stat_result, headers = static_file.path, static_file.stat, {}
+        variant = choose_variant(
+            static_file.variants, request.META.get("HTTP_ACCEPT_ENCODING", "")
+        )
+        if variant is not None:
+            encoding, path, stat_result = variant
+            headers["Content-Encoding"] = encoding
+        response = file_response(
+            request,
+            path,
+            content_type=static_file.content_type,
+            cache_control=(
+                IMMUTABLE_CACHE_CONTROL
+                if static_file.immutable
+                else DEFAULT_STATIC_CACHE_CONTROL
+            ),
+            stat_result=stat_result,
+            headers=headers,
+        )
+        if static_file.variants:
+            patch_vary_headers(response, ("Accept-Encoding",))
+        return response
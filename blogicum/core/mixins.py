@@ -1,13 +1,16 @@
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db.models import BooleanField, ExpressionWrapper, Q
+from django.http import Http404
 from django.shortcuts import redirect
 from django.urls import reverse
+from django.utils import timezone
 from django.views import View
 
+from blog.mixins import OwnedObjectMixin
 from blog.models import Comment
-from core.utils import get_post_data
 
 
-class CommentMixinView(LoginRequiredMixin, View):
+class CommentMixinView(LoginRequiredMixin, OwnedObjectMixin, View):
     """Mixin для редактирования и удаления комментария.
 
     Атрибуты:
@@ -17,6 +20,8 @@ class CommentMixinView(LoginRequiredMixin, View):
         комментария.
 
     Методы:
+        - get_queryset(): Комментарии поста из URL с признаками автора
+        и доступности поста (одним запросом).
         - dispatch(request, *args, **kwargs): Проверяет, является ли
         пользователь автором комментария.
         - get_success_url(): Возвращает URL-адрес перенаправления после
@@ -27,10 +32,34 @@ class CommentMixinView(LoginRequiredMixin, View):
     template_name = "blog/comment.html"
     pk_url_kwarg = "comment_pk"
 
+    def get_queryset(self):
+        """Вернуть комментарии поста с признаком его доступности.
+
+        Условия те же, что в core.utils.get_post_data, но проверяются
+        в запросе комментария, без отдельного запроса поста.
+        """
+        return (
+            super()
+            .get_queryset()
+            .filter(post_id=self.kwargs["pk"])
+            .annotate(
+                post_is_available=ExpressionWrapper(
+                    Q(
+                        post__pub_date__lte=timezone.now(),
+                        post__is_published=True,
+                        post__category__is_published=True,
+                    ),
+                    output_field=BooleanField(),
+                )
+            )
+        )
+
     def dispatch(self, request, *args, **kwargs):
-        if self.get_object().author != request.user:
+        comment = self.get_object()
+        if not comment.is_owner:
             return redirect("blog:post_detail", pk=self.kwargs["pk"])
-        get_post_data(self.kwargs)
+        if not comment.post_is_available:
+            raise Http404
         return super().dispatch(request, *args, **kwargs)
 
     def get_success_url(self):
@@ -0,0 +1,127 @@
+import gzip
+import hashlib
+import os
+import posixpath
+import re
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Расширения файлов, которые имеет смысл сжимать
+COMPRESSIBLE_EXTENSIONS = (
+    ".css", ".js", ".json", ".map", ".svg", ".txt", ".xml", ".html", ".ico",
+)
+
+# Имя файла в ContentHashStorage: <каталог>/ab/ab...(64 символа).ext
+CONTENT_HASH_RE = re.compile(r"(^|/)([0-9a-f]{2})/\2[0-9a-f]{62}(\.\w+)?$")
+
+# Сжатая копия сохраняется, только если она меньше оригинала хотя бы на 5%
+MIN_COMPRESSION_RATIO = 0.95
+
+
+def compress_file(path):
+    """Создать рядом с файлом копии .gz и .br (если установлен brotli).
+
+    Возвращает список путей созданных файлов.
+    """
+    with open(path, "rb") as source:
+        data = source.read()
+    variants = [(".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", brotli.compress(data)))
+    created = []
+    for suffix, compressed in variants:
+        if len(compressed) >= len(data) * MIN_COMPRESSION_RATIO:
+            continue
+        with open(path + suffix, "wb") as target:
+            target.write(compressed)
+        created.append(path + suffix)
+    return created
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Хранилище статики с хэшами в именах и предварительным сжатием.
+
+    При collectstatic к каждому файлу добавляется хэш содержимого
+    (css/bootstrap.min.css -> css/bootstrap.min.1a2b3c4d5e6f.css),
+    а для текстовых файлов создаются сжатые копии .gz и .br, которые
+    отдает core.middleware.StaticFilesMiddleware.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for name in set(self.hashed_files.values()):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                compress_file(self.path(name))
+
+    def hashed_names(self):
+        """Вернуть множество имен файлов, содержащих хэш содержимого."""
+        return set(self.load_manifest().values())
+
+
+def is_compressed_variant(path):
+    """Проверить, является ли файл сжатой копией другого файла."""
+    base, extension = os.path.splitext(path)
+    return extension in (".gz", ".br") and base.endswith(
+        COMPRESSIBLE_EXTENSIONS
+    )
+
+
+def is_content_hashed(name):
+    """Проверить, сохранен ли файл под именем из хэша содержимого."""
+    return bool(name) and CONTENT_HASH_RE.search(name) is not None
+
+
+@deconstructible
+class ContentHashStorage(FileSystemStorage):
+    """Файловое хранилище, в котором имя файла - SHA-256 содержимого.
+
+    Повторная загрузка того же файла не создает копию: возвращается имя
+    уже сохраненного файла. Содержимое по имени никогда не меняется,
+    поэтому такие файлы можно кэшировать как immutable. Удалять файлы
+    может только сборщик мусора (см. blog.images.collect_image_garbage),
+    так как на один файл ссылаются несколько записей.
+    """
+
+    def content_hash(self, content):
+        """Вернуть SHA-256 содержимого, читая файл блоками."""
+        digest = hashlib.sha256()
+        if hasattr(content, "seek"):
+            content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        if hasattr(content, "seek"):
+            content.seek(0)
+        return digest.hexdigest()
+
+    def hashed_name(self, name, content):
+        """Вернуть имя файла по хэшу, сохранив каталог и расширение."""
+        digest = self.content_hash(content)
+        directory, filename = posixpath.split(name.replace("\\", "/"))
+        extension = os.path.splitext(filename)[1].lower()
+        return posixpath.join(directory, digest[:2], digest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = self.hashed_name(self.generate_filename(name), content)
+        if self.exists(name):
+            # Файл снова используется: обновляем время изменения, чтобы
+            # сборщик мусора не удалил его в течение льготного периода
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length=max_length)
+
+
+post_images_storage = ContentHashStorage()
@@ -0,0 +1,39 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.template import engines
+from django.template.exceptions import TemplateSyntaxError
+
+
+def iter_template_names(template_dir):
+    """Вернуть имена всех шаблонов в каталоге относительно его корня."""
+    for path in sorted(template_dir.rglob('*')):
+        if path.is_file():
+            yield path.relative_to(template_dir).as_posix()
+
+
+def warmup_templates():
+    """Скомпилировать все шаблоны из каталога templates/.
+
+    При кэширующем загрузчике скомпилированные шаблоны остаются в памяти
+    процесса, поэтому первый запрос не тратит время на разбор шаблонов.
+    Возвращает количество скомпилированных шаблонов.
+    """
+    compiled = 0
+    for engine in engines.all():
+        for template_dir in engine.dirs:
+            for name in iter_template_names(Path(template_dir)):
+                try:
+                    engine.get_template(name)
+                except TemplateSyntaxError:
+                    # Шаблоны другого движка пропускаются
+                    continue
+                compiled += 1
+    return compiled
+
+
+def warmup_if_enabled():
+    """Прогреть шаблоны, если включена настройка TEMPLATE_WARMUP."""
+    if getattr(settings, 'TEMPLATE_WARMUP', False):
+        return warmup_templates()
+    return 0
@@ -41,6 +41,36 @@ def enable_debug_false():
         yield
 
 
+@pytest.fixture(autouse=True)
+def reset_rate_limits():
+    from blog.ratelimit import reset_store
+    reset_store()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def reset_view_buffer():
+    from blog.counters import reset_buffer
+    reset_buffer()
+    yield
+    reset_buffer()
+
+
+@pytest.fixture(autouse=True)
+def reset_like_buffer():
+    from blog.reactions import reset_buffer
+    reset_buffer()
+    yield
+    reset_buffer()
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    from django.core.cache import cache
+    cache.clear()
+    yield
+
+
 class SafeImportFromContextManager:
     def __init__(
             self,
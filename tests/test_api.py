@@ -0,0 +1,84 @@
+import json
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def published_posts(mixer, user, published_category):
+    now = timezone.now()
+    return [
+        mixer.blend(
+            "blog.Post",
+            author=user,
+            category=published_category,
+            is_published=True,
+            pub_date=now - timedelta(minutes=n),
+        )
+        for n in range(1, 6)
+    ]
+
+
+def read_json(response):
+    if response.streaming:
+        return json.loads(b"".join(response.streaming_content))
+    return json.loads(response.content)
+
+
+def collect_ids(client, url):
+    ids = []
+    while url:
+        data = read_json(client.get(url))
+        ids += [item["id"] for item in data["results"]]
+        url = data["next"]
+    return ids
+
+
+@pytest.mark.parametrize("stream_threshold", [100, 1])
+def test_cursor_pagination_walks_whole_feed(
+        client, settings, published_posts, stream_threshold
+):
+    settings.BLOG_API_STREAM_THRESHOLD = stream_threshold
+    expected = [post.id for post in published_posts]
+    assert collect_ids(client, "/api/posts/?limit=2") == expected
+
+
+def test_feed_uses_published_only_rules(
+        client, mixer, user, published_category, published_posts
+):
+    hidden = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=False,
+    )
+    future = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True, pub_date=timezone.now() + timedelta(days=1),
+    )
+    ids = collect_ids(client, "/api/posts/")
+    assert hidden.id not in ids and future.id not in ids
+    url = f"/api/categories/{published_category.slug}/posts/"
+    assert collect_ids(client, url) == [post.id for post in published_posts]
+
+
+def test_post_detail_and_etag(client, user_client, comment_to_a_post):
+    post = comment_to_a_post.post
+    url = f"/api/posts/{post.id}/"
+    response = client.get(url)
+    data = read_json(response)
+    assert data["text"] == post.text
+    assert data["comment_count"] == 1
+    assert data["author"] == post.author.username
+    response = client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+    assert response.status_code == 304
+
+    comments = read_json(client.get(f"/api/posts/{post.id}/comments/"))
+    assert [c["id"] for c in comments["results"]] == [comment_to_a_post.id]
+
+    post.is_published = False
+    post.save()
+    assert client.get(url).status_code == 404
+    assert client.get(f"/api/posts/{post.id}/comments/").status_code == 404
+    assert user_client.get(url).status_code == 200
@@ -0,0 +1,125 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from blog.models import AuthorStats, Post
+from blog.moderation import delete_posts
+from blog.stats import compute_author_stats
+
+pytestmark = [pytest.mark.django_db]
+
+
+def get_stats(user):
+    return AuthorStats.objects.get(user=user)
+
+
+def published_post(mixer, category, **kwargs):
+    return mixer.blend(
+        "blog.Post", category=category, is_published=True,
+        pub_date=timezone.now(), **kwargs
+    )
+
+
+def test_stats_follow_posts_and_comments(mixer, user, another_user,
+                                         published_category):
+    first = published_post(mixer, published_category, author=user)
+    second = published_post(mixer, published_category, author=user)
+    mixer.blend("blog.Post", author=user, is_published=False)
+    mixer.cycle(3).blend("blog.Comment", post=first, author=another_user)
+    stats = get_stats(user)
+    assert stats.post_count == 2
+    assert stats.comment_count == 3
+    assert stats.last_post_at == second.pub_date
+
+    second.is_published = False
+    second.save()
+    stats = get_stats(user)
+    assert stats.post_count == 1
+    assert stats.last_post_at == first.pub_date
+
+    first.comments.first().delete()
+    assert get_stats(user).comment_count == 2
+
+    first.delete()
+    stats = get_stats(user)
+    assert (stats.post_count, stats.comment_count) == (0, 0)
+
+
+def test_bulk_delete_recomputes_stats(mixer, user, published_category):
+    for _ in range(3):
+        published_post(mixer, published_category, author=user)
+    delete_posts(Post.objects.filter(author=user))
+    assert get_stats(user).post_count == 0
+
+
+def test_incremental_stats_match_full_rebuild(
+        mixer, user, another_user, comment_to_a_post, published_category
+):
+    for _ in range(4):
+        published_post(mixer, published_category, author=another_user)
+    mixer.cycle(2).blend("blog.Post", author=another_user, is_published=True)
+    expected = list(AuthorStats.objects.order_by("pk").values())
+    compute_author_stats()
+    assert list(AuthorStats.objects.order_by("pk").values()) == expected
+
+
+def test_profile_header_does_not_scan_posts(client, mixer, user,
+                                            published_category):
+    for _ in range(25):
+        published_post(mixer, published_category, author=user)
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(f"/profile/{user.username}/")
+    content = response.content.decode()
+    assert "Публикаций: 25" in content
+    assert response.context["stats"].post_count == 25
+    stats_queries = [
+        q["sql"] for q in ctx.captured_queries
+        if '"blog_authorstats"' in q["sql"]
+    ]
+    assert len(stats_queries) == 1 and "auth_user" in stats_queries[0]
+
+
+def test_stats_follow_published_only_rules(mixer, user, published_category):
+    post = published_post(mixer, published_category, author=user)
+    mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True, pub_date=timezone.now() + timedelta(days=1),
+    )
+    mixer.blend(
+        "blog.Post", author=user, category=None, is_published=True,
+        pub_date=timezone.now(),
+    )
+    stats = get_stats(user)
+    assert (stats.post_count, stats.last_post_at) == (1, post.pub_date)
+
+    published_category.is_published = False
+    published_category.save()
+    assert get_stats(user).post_count == 0
+
+    published_category.is_published = True
+    published_category.save()
+    post.pub_date = timezone.now() + timedelta(days=1)
+    post.save()
+    assert get_stats(user).post_count == 0
+
+
+def test_scheduled_post_is_counted_when_due(
+        client, mixer, user, published_category
+):
+    post = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True, pub_date=timezone.now() + timedelta(hours=1),
+    )
+    stats = get_stats(user)
+    assert (stats.post_count, stats.next_post_at) == (0, post.pub_date)
+    # Прошел час: дата публикации наступила, сигналов не было
+    due = timezone.now() - timedelta(minutes=1)
+    Post.objects.filter(pk=post.pk).update(pub_date=due)
+    AuthorStats.objects.filter(user=user).update(next_post_at=due)
+    response = client.get(f"/profile/{user.username}/")
+    assert response.context["stats"].post_count == 1
+    stats = get_stats(user)
+    assert (stats.last_post_at, stats.next_post_at) == (due, None)
@@ -0,0 +1,108 @@
+import pytest
+from django.db import connection
+from django.http import Http404
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.views.generic import UpdateView
+
+from blog.forms import CommentForm
+from core.mixins import CommentMixinView
+
+pytestmark = [pytest.mark.django_db]
+
+
+def capture(client, method, url, data=None):
+    with CaptureQueriesContext(connection) as ctx:
+        response = getattr(client, method)(url, data or {})
+    return response, [q["sql"] for q in ctx.captured_queries]
+
+
+def object_selects(queries, table):
+    return [
+        sql for sql in queries
+        if sql.startswith("SELECT") and f'FROM "{table}"' in sql
+    ]
+
+
+def test_post_change_views_load_post_once(
+        user_client, post_with_published_location
+):
+    post = post_with_published_location
+    # Сессия, пользователь, пост (с местоположением)
+    response, queries = capture(
+        user_client, "get", f"/posts/{post.id}/delete/"
+    )
+    assert response.status_code == 200
+    assert len(queries) == 3
+    assert len(object_selects(queries, "blog_post")) == 1
+
+    # Сессия, пользователь, пост; варианты категорий и местоположений
+    # формы читаются из кэша после первого запроса
+    user_client.get(f"/posts/{post.id}/edit/")
+    response, queries = capture(user_client, "get", f"/posts/{post.id}/edit/")
+    assert response.status_code == 200
+    assert len(queries) == 3
+    assert len(object_selects(queries, "blog_post")) == 1
+
+
+def test_not_author_is_redirected_without_loading_author(
+        another_user_client, post_with_published_location
+):
+    post = post_with_published_location
+    response, queries = capture(
+        another_user_client, "post", f"/posts/{post.id}/delete/"
+    )
+    assert response.status_code == 302
+    assert len(queries) == 3
+    assert type(post).objects.filter(pk=post.pk).exists()
+
+
+def test_comment_change_views(user_client, another_user_client, mixer, user):
+    comment = mixer.blend(
+        "blog.Comment", author=user, post__is_published=True,
+        post__category__is_published=True,
+    )
+    url = f"/posts/{comment.post_id}/edit_comment/{comment.id}/"
+    response, queries = capture(user_client, "get", url)
+    assert response.status_code == 200
+    assert len(queries) == 3
+    assert len(object_selects(queries, "blog_comment")) == 1
+
+    response, _ = capture(another_user_client, "get", url)
+    assert response.status_code == 302
+
+    other_post = mixer.blend("blog.Post")
+    response = user_client.get(
+        f"/posts/{other_post.id}/edit_comment/{comment.id}/"
+    )
+    assert response.status_code == 404
+
+    response, queries = capture(
+        user_client, "post",
+        f"/posts/{comment.post_id}/delete_comment/{comment.id}/",
+    )
+    assert response.status_code == 302
+    # Комментарий загружается один раз; остальные запросы выбирают
+    # только id ответов (ветвь удаляется вместе с ним)
+    assert len([
+        sql for sql in object_selects(queries, "blog_comment")
+        if '"blog_comment"."text"' in sql
+    ]) == 1
+    assert not type(comment).objects.filter(pk=comment.pk).exists()
+
+
+class CoreCommentUpdateView(CommentMixinView, UpdateView):
+    form_class = CommentForm
+
+
+def test_core_comment_mixin_checks_post_in_same_query(mixer, user):
+    comment = mixer.blend(
+        "blog.Comment", author=user, post__is_published=False,
+    )
+    request = RequestFactory().get("/")
+    request.user = user
+    view = CoreCommentUpdateView.as_view()
+    with CaptureQueriesContext(connection) as ctx:
+        with pytest.raises(Http404):
+            view(request, pk=comment.post_id, comment_pk=comment.id)
+    assert len(ctx.captured_queries) == 1
@@ -0,0 +1,118 @@
+import pytest
+from django.utils import timezone
+
+from blog import threads
+from blog.models import Comment
+from blog.moderation import delete_comments
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def post(mixer, user, published_category):
+    return mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True, pub_date=timezone.now(),
+    )
+
+
+def reply(client, post, text, parent=None):
+    data = {"text": text}
+    if parent is not None:
+        data["parent"] = parent.id
+    response = client.post(f"/posts/{post.id}/comment/", data)
+    assert response.status_code == 302
+    return Comment.objects.get(text=text)
+
+
+def texts(comments):
+    return [comment.text for comment in comments]
+
+
+@pytest.fixture
+def tree(user_client, another_user_client, post):
+    first = reply(user_client, post, "1")
+    second = reply(user_client, post, "2")
+    first_a = reply(another_user_client, post, "1a", first)
+    reply(user_client, post, "1a-i", first_a)
+    reply(another_user_client, post, "2a", second)
+    return first, second, first_a
+
+
+def test_detail_renders_threads_in_order(user_client, post, tree):
+    response = user_client.get(f"/posts/{post.id}/")
+    comments = list(response.context["comments"])
+    assert texts(comments) == ["1", "1a", "1a-i", "2", "2a"]
+    assert [comment.depth for comment in comments] == [0, 1, 2, 0, 1]
+
+
+def test_subtree_is_one_range_query(post, tree, django_assert_num_queries):
+    first, _, first_a = tree
+    with django_assert_num_queries(1):
+        assert texts(threads.subtree(first)) == ["1", "1a", "1a-i"]
+    assert texts(threads.subtree(first)[1:]) == ["1a", "1a-i"]
+    assert threads.ancestor_ids(
+        Comment.objects.get(text="1a-i").path
+    ) == [first.id, first_a.id, Comment.objects.get(text="1a-i").id]
+
+
+def test_reply_to_other_post_is_rejected(
+        user_client, mixer, user, published_category, post, tree
+):
+    other = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True, pub_date=timezone.now(),
+    )
+    response = user_client.post(
+        f"/posts/{other.id}/comment/", {"text": "x", "parent": tree[0].id}
+    )
+    assert response.status_code == 404
+
+
+def test_deep_replies_attach_to_ancestor(settings, user_client, post):
+    settings.BLOG_COMMENT_MAX_DEPTH = 1
+    root = reply(user_client, post, "root")
+    child = reply(user_client, post, "child", root)
+    grandchild = reply(user_client, post, "grandchild", child)
+    assert grandchild.parent_id == root.id
+    assert grandchild.depth == 1
+
+
+def test_delete_view_removes_branch(another_user_client, user_client, post,
+                                    tree):
+    first = tree[0]
+    response = user_client.post(
+        f"/posts/{post.id}/delete_comment/{first.id}/"
+    )
+    assert response.status_code == 302
+    assert texts(threads.thread(post.id)) == ["2", "2a"]
+
+
+def test_batched_delete_removes_replies(settings, user, post, tree):
+    settings.BLOG_BATCH_SIZE = 1
+    delete_comments(Comment.objects.filter(author=user))
+    assert not Comment.objects.exists()
+
+
+def test_move_branch(post, tree):
+    first, second, first_a = tree
+    threads.move_subtree(first_a, second)
+    assert texts(threads.thread(post.id)) == ["1", "2", "1a", "1a-i", "2a"]
+    threads.move_subtree(first_a)
+    assert texts(threads.thread(post.id)) == ["1", "2", "2a", "1a", "1a-i"]
+    moved = Comment.objects.get(text="1a-i")
+    assert moved.depth == 1
+    assert moved.path.startswith(first_a.path)
+    with pytest.raises(ValueError):
+        threads.move_subtree(first_a, moved)
+
+
+def test_move_checks_depth_with_current_rows(settings, post, tree):
+    settings.BLOG_COMMENT_MAX_DEPTH = 2
+    first, second, first_a = tree
+    stale_second = Comment.objects.get(pk=second.pk)
+    # Ветвь 2 переносится глубже, пока у вызывающего старый экземпляр
+    threads.move_subtree(second, first)
+    with pytest.raises(ValueError):
+        threads.move_subtree(first_a, stale_second)
+    assert Comment.objects.get(text="1a-i").depth == 2
@@ -0,0 +1,67 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from blog.models import AuthorStats, Comment
+from core.db import configure_sqlite
+
+pytestmark = [pytest.mark.django_db]
+
+
+def statements(ctx):
+    return [
+        q["sql"] for q in ctx.captured_queries
+        if not q["sql"].startswith(("SAVEPOINT", "RELEASE"))
+    ]
+
+
+def test_comment_is_written_without_loading_post(
+        user_client, user, another_user, mixer, published_category
+):
+    post = mixer.blend(
+        "blog.Post", author=another_user, category=published_category,
+        is_published=True,
+    )
+    with CaptureQueriesContext(connection) as ctx:
+        response = user_client.post(
+            f"/posts/{post.id}/comment/", {"text": "Комментарий"}
+        )
+    assert response.status_code == 302
+    queries = statements(ctx)
+    # Сессия, пользователь, EXISTS, комментарий, путь в ветке,
+    # статистика, HTML
+    assert len(queries) == 7
+    assert not [
+        sql for sql in queries
+        if sql.startswith('SELECT "blog_post"')
+    ]
+    comment = Comment.objects.get(post=post)
+    assert comment.author == user
+    assert comment.rendered.html
+    assert AuthorStats.objects.get(user=another_user).comment_count == 1
+
+
+def test_comment_follows_post_visibility(
+        user_client, another_user_client, mixer, user
+):
+    hidden = mixer.blend("blog.Post", author=user, is_published=False)
+    url = f"/posts/{hidden.id}/comment/"
+    assert another_user_client.post(url, {"text": "a"}).status_code == 404
+    assert user_client.post(url, {"text": "b"}).status_code == 302
+    assert user_client.post(
+        "/posts/100500/comment/", {"text": "c"}
+    ).status_code == 404
+    assert list(
+        Comment.objects.values_list("text", flat=True)
+    ) == ["b"]
+
+
+def test_sqlite_pragmas_are_applied(settings):
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA cache_size")
+        default = cursor.fetchone()[0]
+        settings.SQLITE_PRAGMAS = {"cache_size": default * 2}
+        configure_sqlite(sender=None, connection=connection)
+        cursor.execute("PRAGMA cache_size")
+        assert cursor.fetchone()[0] == default * 2
+        cursor.execute(f"PRAGMA cache_size = {default}")
@@ -0,0 +1,151 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from blog.deletion import resume_deletion_jobs, run_deletion_job
+from blog.models import AuthorStats, Comment, DeletionJob, Post, User
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture(autouse=True)
+def background_tasks(settings):
+    # Фоновые задачи стартуют после коммита, которого в тесте нет:
+    # задачи запускаются вручную
+    settings.BLOG_TASKS_EAGER = False
+    settings.BLOG_BATCH_SIZE = 2
+
+
+@pytest.fixture
+def post_with_comments(mixer, user, another_user, published_category):
+    post = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True,
+    )
+    mixer.cycle(5).blend("blog.Comment", post=post, author=another_user)
+    return post
+
+
+def test_post_is_hidden_then_deleted_in_batches(
+        user_client, user, post_with_comments
+):
+    post = post_with_comments
+    response = user_client.post(f"/posts/{post.id}/delete/")
+    assert response.status_code == 302
+    assert not Post.objects.filter(pk=post.pk).exists()
+    assert user_client.get(f"/posts/{post.id}/").status_code == 404
+    assert AuthorStats.objects.get(user=user).post_count == 0
+
+    job = DeletionJob.objects.get()
+    assert (job.status, job.total) == (DeletionJob.PENDING, 6)
+    with CaptureQueriesContext(connection) as ctx:
+        run_deletion_job(job.pk)
+    comment_deletes = [
+        q["sql"] for q in ctx.captured_queries
+        if q["sql"].startswith('DELETE FROM "blog_comment"')
+    ]
+    assert len(comment_deletes) == 3
+
+    job.refresh_from_db()
+    assert job.status == DeletionJob.DONE
+    assert (job.deleted, job.progress) == (6, 100)
+    assert not Post._base_manager.filter(pk=post.pk).exists()
+    assert not Comment.objects.filter(post_id=post.pk).exists()
+
+
+def test_user_deletion_from_admin(
+        admin_client, mixer, user, another_user, post_with_comments
+):
+    other_post = mixer.blend("blog.Post", author=another_user)
+    mixer.blend("blog.Comment", post=other_post, author=user)
+    response = admin_client.post(
+        f"/admin/auth/user/{user.pk}/delete/", {"post": "yes"}
+    )
+    assert response.status_code == 302
+    user.refresh_from_db()
+    assert not user.is_active
+    assert not Post.objects.filter(author=user).exists()
+
+    call_command("run_deletion_jobs", stdout=StringIO())
+    job = DeletionJob.objects.get()
+    assert job.status == DeletionJob.DONE
+    assert job.deleted == job.total == 8
+    assert not User.objects.filter(pk=user.pk).exists()
+    assert not Post._base_manager.filter(author_id=user.pk).exists()
+    assert list(Comment.objects.all()) == []
+    assert Post.objects.filter(pk=other_post.pk).exists()
+
+
+def test_failed_job_can_be_resumed(
+        monkeypatch, user_client, post_with_comments
+):
+    user_client.post(f"/posts/{post_with_comments.id}/delete/")
+    job = DeletionJob.objects.get()
+
+    def broken(job):
+        raise RuntimeError("сбой")
+
+    monkeypatch.setattr("blog.deletion.delete_target", broken)
+    run_deletion_job(job.pk)
+    job.refresh_from_db()
+    assert job.status == DeletionJob.FAILED and "сбой" in job.error
+    monkeypatch.undo()
+
+    run_deletion_job(job.pk)
+    job.refresh_from_db()
+    assert job.status == DeletionJob.DONE
+    assert not Post._base_manager.filter(pk=post_with_comments.pk).exists()
+
+
+def test_admin_bulk_delete_creates_one_job(admin_client, mixer, user):
+    users = mixer.cycle(3).blend(User)
+    for author in users:
+        mixer.blend("blog.Post", author=author)
+    response = admin_client.post(
+        "/admin/auth/user/",
+        {
+            "action": "delete_selected",
+            "_selected_action": [u.pk for u in users],
+            "post": "yes",
+        },
+    )
+    assert response.status_code == 302
+    job = DeletionJob.objects.get()
+    assert sorted(job.object_ids) == sorted(u.pk for u in users)
+    assert not User.objects.filter(pk__in=job.object_ids, is_active=True)
+
+    assert run_deletion_job(job.pk)
+    job.refresh_from_db()
+    assert job.status == DeletionJob.DONE
+    assert job.deleted == job.total == 6
+    assert not User.objects.filter(pk__in=job.object_ids).exists()
+    assert User.objects.filter(pk=user.pk).exists()
+
+
+def test_running_job_is_claimed_only_after_lease(
+        settings, user_client, post_with_comments
+):
+    settings.BLOG_DELETION_LEASE = 60
+    user_client.post(f"/posts/{post_with_comments.id}/delete/")
+    job = DeletionJob.objects.get()
+    # Задачу выполняет другой воркер
+    DeletionJob.objects.filter(pk=job.pk).update(
+        status=DeletionJob.RUNNING, heartbeat_at=timezone.now()
+    )
+    assert not run_deletion_job(job.pk)
+    assert resume_deletion_jobs() == 0
+    assert Post._base_manager.filter(pk=post_with_comments.pk).exists()
+
+    # Воркер пропал: аренда истекла
+    DeletionJob.objects.filter(pk=job.pk).update(
+        heartbeat_at=timezone.now() - timedelta(seconds=61)
+    )
+    assert resume_deletion_jobs() == 1
+    job.refresh_from_db()
+    assert job.status == DeletionJob.DONE
+    assert not Post._base_manager.filter(pk=post_with_comments.pk).exists()
@@ -0,0 +1,43 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from blog.models import Post
+
+pytestmark = [pytest.mark.django_db]
+
+LONG_TEXT = " ".join(f"слово{i}" for i in range(50))
+
+
+def test_excerpt_is_maintained_on_save(post_with_published_location):
+    post = post_with_published_location
+    post.text = LONG_TEXT
+    post.save()
+    post.refresh_from_db()
+    assert post.excerpt == " ".join(f"слово{i}" for i in range(10)) + " …"
+
+
+def test_feed_does_not_load_full_text(
+        client, post_with_published_location
+):
+    Post.objects.update(text=LONG_TEXT, excerpt="Краткий текст")
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get("/")
+    assert "Краткий текст" in response.content.decode()
+    feed_queries = [
+        q["sql"] for q in ctx.captured_queries
+        if '"blog_post"."title"' in q["sql"]
+    ]
+    assert feed_queries
+    assert all('"blog_post"."text"' not in sql for sql in feed_queries), (
+        "Лента не должна загружать полный текст постов."
+    )
+
+
+def test_rebuild_excerpts_command(post_with_published_location):
+    Post.objects.update(text=LONG_TEXT, excerpt="")
+    call_command("rebuild_excerpts", batch_size=1, stdout=StringIO())
+    assert Post.objects.get().excerpt.startswith("слово0 слово1")
@@ -0,0 +1,150 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from blog.models import AuthorStats, FeedEntry, Follow
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def author_posts(mixer, another_user, published_category):
+    now = timezone.now()
+    return [
+        mixer.blend(
+            "blog.Post", author=another_user, category=published_category,
+            is_published=True, pub_date=now - timedelta(hours=n),
+        )
+        for n in range(1, 4)
+    ]
+
+
+def feed_ids(client):
+    response = client.get("/following/")
+    assert response.status_code == 200
+    return [post.id for post in response.context["page_obj"]]
+
+
+def follower_count(user):
+    return AuthorStats.objects.get(user=user).follower_count
+
+
+def test_follow_backfills_feed(user_client, user, another_user, author_posts):
+    response = user_client.post(f"/profile/{another_user.username}/follow/")
+    assert response.status_code == 302
+    assert follower_count(another_user) == 1
+    assert feed_ids(user_client) == [post.id for post in author_posts]
+    response = user_client.get(f"/profile/{another_user.username}/")
+    assert response.context["is_following"] is True
+
+
+def test_new_post_is_fanned_out_to_followers(
+        mixer, user_client, user, another_user, published_category
+):
+    Follow.objects.create(follower=user, author=another_user)
+    post = mixer.blend(
+        "blog.Post", author=another_user, category=published_category,
+        is_published=True, pub_date=timezone.now(),
+    )
+    scheduled = mixer.blend(
+        "blog.Post", author=another_user, category=published_category,
+        is_published=True, pub_date=timezone.now() + timedelta(days=1),
+    )
+    assert FeedEntry.objects.filter(user=user).count() == 2
+    assert feed_ids(user_client) == [post.id]
+
+    post.is_published = False
+    post.save()
+    assert list(
+        FeedEntry.objects.values_list("post_id", flat=True)
+    ) == [scheduled.id]
+
+
+def test_unfollow_clears_feed(user_client, user, another_user, author_posts):
+    user_client.post(f"/profile/{another_user.username}/follow/")
+    user_client.post(f"/profile/{another_user.username}/unfollow/")
+    assert follower_count(another_user) == 0
+    assert not FeedEntry.objects.exists()
+    assert feed_ids(user_client) == []
+
+
+def test_cannot_follow_self(user_client, user):
+    user_client.post(f"/profile/{user.username}/follow/")
+    assert not Follow.objects.exists()
+
+
+def test_popular_authors_are_read_on_request(
+        settings, mixer, user_client, user, another_user, author_posts,
+        published_category
+):
+    user_client.post(f"/profile/{another_user.username}/follow/")
+    settings.BLOG_FEED_FANOUT_LIMIT = 0
+    post = mixer.blend(
+        "blog.Post", author=another_user, category=published_category,
+        is_published=True, pub_date=timezone.now(),
+    )
+    assert not FeedEntry.objects.filter(post=post).exists()
+    # Разложенные ранее посты не повторяются
+    assert feed_ids(user_client) == [
+        post.id, *(post.id for post in author_posts)
+    ]
+
+
+def test_feed_requires_login(client):
+    response = client.get("/following/")
+    assert response.status_code == 302
+
+
+def test_deleting_followed_user(user, another_user, mixer, author_posts):
+    Follow.objects.create(follower=user, author=another_user)
+    Follow.objects.create(follower=another_user, author=user)
+    another_user.delete()
+    assert not Follow.objects.exists()
+    assert not FeedEntry.objects.exists()
+    assert not AuthorStats.objects.filter(user_id=another_user.pk).exists()
+    assert follower_count(user) == 0
+
+
+def test_deletion_job_removes_follows_in_batches(
+        settings, mixer, user, another_user, author_posts
+):
+    from blog.deletion import run_deletion_job, schedule_user_deletion
+    from blog.models import DeletionJob, User
+
+    settings.BLOG_BATCH_SIZE = 1
+    followers = mixer.cycle(3).blend(User)
+    for follower in followers:
+        Follow.objects.create(follower=follower, author=another_user)
+    Follow.objects.create(follower=another_user, author=user)
+    settings.BLOG_TASKS_EAGER = False
+    job = schedule_user_deletion(another_user)
+    run_deletion_job(job.pk)
+    job.refresh_from_db()
+    assert job.status == DeletionJob.DONE
+    assert job.deleted == job.total
+    assert not User.objects.filter(pk=another_user.pk).exists()
+    assert not Follow.objects.exists()
+    assert follower_count(user) == 0
+
+
+def test_feed_count_is_not_recomputed_per_page(
+        user_client, user, another_user, author_posts
+):
+    user_client.post(f"/profile/{another_user.username}/follow/")
+
+    def count_queries():
+        with CaptureQueriesContext(connection) as ctx:
+            assert user_client.get("/following/").status_code == 200
+        return [
+            q["sql"] for q in ctx.captured_queries
+            if "COUNT(" in q["sql"] and "UNION" in q["sql"]
+        ]
+
+    assert len(count_queries()) == 1
+    assert count_queries() == []
+    # Отписка меняет ленту: количество считается заново
+    user_client.post(f"/profile/{another_user.username}/unfollow/")
+    assert len(count_queries()) == 1
@@ -0,0 +1,58 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from blog.forms import PostForm
+
+pytestmark = [pytest.mark.django_db]
+
+
+def form_data(category, location=None):
+    return {
+        "title": "Заголовок",
+        "text": "Текст",
+        "pub_date": timezone.now().strftime("%Y-%m-%dT%H:%M"),
+        "category": category.pk,
+        "location": location.pk if location else "",
+    }
+
+
+def choice_labels(form, name):
+    return [label for value, label in form.fields[name].choices]
+
+
+def test_choices_are_read_from_cache(mixer, published_category):
+    location = mixer.blend("blog.Location")
+    PostForm().as_p()
+    with CaptureQueriesContext(connection) as ctx:
+        html = PostForm().as_p()
+        form = PostForm(data=form_data(published_category, location))
+        assert form.is_valid(), form.errors
+    assert len(ctx.captured_queries) == 0
+    assert str(published_category) in html and str(location) in html
+    assert form.cleaned_data["category"].pk == published_category.pk
+    assert form.cleaned_data["location"].pk == location.pk
+
+
+def test_unknown_choice_is_rejected(published_category):
+    data = form_data(published_category)
+    data["category"] = published_category.pk + 100
+    form = PostForm(data=data)
+    assert not form.is_valid()
+    assert "category" in form.errors
+
+
+def test_choices_follow_category_changes(mixer, published_category):
+    assert str(published_category) in choice_labels(PostForm(), "category")
+    new_category = mixer.blend("blog.Category", title="Новая")
+    assert "Новая" in choice_labels(PostForm(), "category")
+
+    new_category.title = "Другая"
+    new_category.save()
+    labels = choice_labels(PostForm(), "category")
+    assert "Другая" in labels and "Новая" not in labels
+
+    new_category.delete()
+    assert "Другая" not in choice_labels(PostForm(), "category")
+    assert not PostForm(data=form_data(new_category)).is_valid()
@@ -0,0 +1,71 @@
+from io import BytesIO, StringIO
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from PIL import Image
+
+from blog.images import collect_image_garbage
+from blog.models import ImageBlob, Post
+from core.storage import is_content_hashed
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture(autouse=True)
+def media_root(tmp_path, settings):
+    settings.MEDIA_ROOT = str(tmp_path)
+    return tmp_path
+
+
+def image_content(color):
+    buffer = BytesIO()
+    Image.new("RGB", (10, 10), color).save(buffer, format="JPEG")
+    return ContentFile(buffer.getvalue())
+
+
+def test_same_image_is_stored_once(mixer, media_root):
+    first, second = mixer.cycle(2).blend("blog.Post", image="")
+    first.image.save("a.jpg", image_content("red"))
+    second.image.save("b.jpg", image_content("red"))
+    assert first.image.name == second.image.name
+    assert is_content_hashed(first.image.name)
+    assert len(list(media_root.glob("post_images/*/*.jpg"))) == 1
+    assert ImageBlob.objects.get(name=first.image.name).refcount == 2
+
+    second.image.save("c.jpg", image_content("blue"))
+    assert ImageBlob.objects.get(name=first.image.name).refcount == 1
+    first.delete()
+    assert ImageBlob.objects.get(name=first.image.name).refcount == 0
+
+
+def test_gc_removes_only_unreferenced_files(mixer, media_root):
+    kept, dropped = mixer.cycle(2).blend("blog.Post", image="")
+    kept.image.save("a.jpg", image_content("red"))
+    dropped.image.save("b.jpg", image_content("blue"))
+    # Массовое удаление обходит сигналы: gc сам пересчитывает ссылки
+    Post.objects.filter(pk=dropped.pk).update(image="")
+
+    assert collect_image_garbage(grace_seconds=3600) == []
+    assert collect_image_garbage(grace_seconds=-1) == [dropped.image.name]
+    assert not (media_root / dropped.image.name).exists()
+    assert (media_root / kept.image.name).exists()
+    assert not ImageBlob.objects.filter(name=dropped.image.name).exists()
+
+
+def test_migrate_command_merges_existing_files(mixer, media_root):
+    (media_root / "post_images").mkdir()
+    data = image_content("green").read()
+    for name in ("old1.jpg", "old2.jpg"):
+        (media_root / "post_images" / name).write_bytes(data)
+    mixer.blend("blog.Post", image="post_images/old1.jpg")
+    mixer.blend("blog.Post", image="post_images/old2.jpg")
+
+    call_command("migrate_post_images", "--delete-old", stdout=StringIO())
+
+    names = set(Post.objects.values_list("image", flat=True))
+    assert len(names) == 1
+    name = names.pop()
+    assert is_content_hashed(name)
+    assert ImageBlob.objects.get(name=name).refcount == 2
+    assert not (media_root / "post_images" / "old1.jpg").exists()
@@ -0,0 +1,64 @@
+from io import BytesIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageFile
+
+from blog.forms import PostForm
+from blog.images import process_upload
+
+
+def make_upload(size=(100, 100), image_format="JPEG", exif=None, **kwargs):
+    buffer = BytesIO()
+    image = Image.new("RGB", size, color=(73, 109, 137))
+    if exif is not None:
+        kwargs["exif"] = exif
+    image.save(buffer, format=image_format, **kwargs)
+    return SimpleUploadedFile(
+        "photo." + image_format.lower(), buffer.getvalue()
+    )
+
+
+def test_large_image_is_downscaled_and_exif_stripped(settings):
+    settings.BLOG_IMAGE_MAX_SIZE = (200, 200)
+    exif = Image.Exif()
+    exif[0x010F] = "Camera maker"
+    result = process_upload(make_upload((1000, 500), exif=exif))
+    assert result.name == "photo.jpg"
+    with Image.open(result) as image:
+        assert image.size == (200, 100)
+        assert not image.getexif()
+
+
+def test_transparent_png_stays_png():
+    buffer = BytesIO()
+    Image.new("RGBA", (10, 10), (0, 0, 0, 0)).save(buffer, format="PNG")
+    result = process_upload(SimpleUploadedFile("logo.png", buffer.getvalue()))
+    assert result.name == "logo.png"
+    assert result.content_type == "image/png"
+
+
+def test_pixel_limit_is_checked_before_decoding(settings, monkeypatch):
+    settings.BLOG_IMAGE_MAX_PIXELS = 100 * 100
+    upload = make_upload((101, 100))
+    monkeypatch.setattr(
+        ImageFile.ImageFile, "load", lambda self: pytest.fail("decoded")
+    )
+    form = PostForm(files={"image": upload})
+    form.is_valid()
+    assert form.has_error("image", "image_too_many_pixels")
+
+
+def test_byte_limit(settings):
+    settings.BLOG_IMAGE_MAX_BYTES = 100
+    form = PostForm(files={"image": make_upload()})
+    form.is_valid()
+    assert form.has_error("image", "image_too_large")
+
+
+def test_not_an_image_is_rejected():
+    form = PostForm(
+        files={"image": SimpleUploadedFile("fake.jpg", b"not an image")}
+    )
+    form.is_valid()
+    assert form.has_error("image", "invalid_image")
@@ -0,0 +1,66 @@
+import re
+
+import pytest
+from django.test import override_settings
+from django.utils import timezone
+
+pytest.importorskip("jinja2")
+
+pytestmark = [pytest.mark.django_db]
+
+
+def normalize(html: str) -> str:
+    html = re.sub(r"\s+", " ", html)
+    return re.sub(r">\s+<", "><", html).strip()
+
+
+def render_both(client, url):
+    pages = []
+    for engine in (None, "jinja2"):
+        with override_settings(BLOG_FEED_TEMPLATE_ENGINE=engine):
+            response = client.get(url)
+        assert response.status_code == 200
+        pages.append(normalize(response.content.decode()))
+    return pages
+
+
+@pytest.mark.parametrize("client_name", ["user_client", "unlogged_client"])
+def test_feeds_render_identically(
+        request, client_name, user, many_posts_with_published_locations,
+        published_category
+):
+    client = request.getfixturevalue(client_name)
+    for url in (
+        "/",
+        "/?page=2",
+        f"/category/{published_category.slug}/",
+        f"/profile/{user.username}/",
+    ):
+        django_html, jinja_html = render_both(client, url)
+        assert django_html == jinja_html, (
+            f"Страница {url} в Jinja2 отличается от шаблонов Django."
+        )
+
+
+def test_non_ascii_username_urls_match(client, mixer, published_category):
+    author = mixer.blend("auth.User", username="Иван")
+    mixer.blend(
+        "blog.Post", author=author, category=published_category,
+        is_published=True, pub_date=timezone.now(),
+    )
+    django_html, jinja_html = render_both(client, "/")
+    assert "/profile/%D0%98%D0%B2%D0%B0%D0%BD/" in django_html
+    assert django_html == jinja_html
+
+
+@pytest.mark.parametrize("username", ["Иван", "a.b-c_d", "user@mail", "x+y"])
+def test_url_helper_matches_reverse_without_resolving(username):
+    from django.urls import reverse
+
+    from blogicum import jinja2
+
+    profile_url = jinja2.url_helper("blog:profile")
+    jinja2.url_parts.cache_clear()
+    assert profile_url(username) == reverse("blog:profile", args=[username])
+    profile_url(username)
+    assert jinja2.url_parts.cache_info().misses == 1
@@ -0,0 +1,96 @@
+import pytest
+from django.test import override_settings
+
+from blog.models import Post
+
+pytestmark = [pytest.mark.django_db]
+
+IMAGE_NAME = "post_images/picture.jpg"
+IMAGE_URL = "/media/" + IMAGE_NAME
+IMAGE_DATA = bytes(range(256)) * 4
+
+
+@pytest.fixture
+def media_root(tmp_path, settings):
+    settings.MEDIA_ROOT = str(tmp_path)
+    (tmp_path / "post_images").mkdir()
+    (tmp_path / IMAGE_NAME).write_bytes(IMAGE_DATA)
+    return tmp_path
+
+
+@pytest.fixture
+def published_image(media_root, post_with_published_location):
+    Post.objects.filter(pk=post_with_published_location.pk).update(
+        image=IMAGE_NAME
+    )
+    return post_with_published_location
+
+
+def test_published_image_is_served_with_cache_headers(
+        client, published_image
+):
+    response = client.get(IMAGE_URL)
+    assert response.status_code == 200
+    assert b"".join(response.streaming_content) == IMAGE_DATA
+    assert response["Accept-Ranges"] == "bytes"
+    assert response["Cache-Control"].startswith("public")
+
+    response = client.get(IMAGE_URL, HTTP_IF_NONE_MATCH=response["ETag"])
+    assert response.status_code == 304
+
+
+def test_range_request(client, published_image):
+    response = client.get(IMAGE_URL, HTTP_RANGE="bytes=10-19")
+    assert response.status_code == 206
+    assert response["Content-Range"] == f"bytes 10-19/{len(IMAGE_DATA)}"
+    assert b"".join(response.streaming_content) == IMAGE_DATA[10:20]
+
+    response = client.get(IMAGE_URL, HTTP_RANGE="bytes=-5")
+    assert b"".join(response.streaming_content) == IMAGE_DATA[-5:]
+
+    response = client.get(IMAGE_URL, HTTP_RANGE="bytes=5000-")
+    assert response.status_code == 416
+    assert response["Content-Range"] == f"bytes */{len(IMAGE_DATA)}"
+
+
+def test_unpublished_image_visible_only_to_author(
+        client, user_client, published_image
+):
+    Post.objects.filter(pk=published_image.pk).update(is_published=False)
+    assert client.get(IMAGE_URL).status_code == 404
+    response = user_client.get(IMAGE_URL)
+    assert response.status_code == 200
+    assert response["Cache-Control"].startswith("private")
+
+
+def test_unknown_image_is_not_found(client, media_root):
+    assert client.get(IMAGE_URL).status_code == 404
+
+
+@override_settings(
+    MEDIA_SENDFILE_HEADER="X-Accel-Redirect",
+    MEDIA_ACCEL_REDIRECT_PREFIX="/protected-media/",
+)
+def test_accel_redirect_offload(client, published_image):
+    response = client.get(IMAGE_URL)
+    assert response.status_code == 200
+    assert response["X-Accel-Redirect"] == "/protected-media/" + IMAGE_NAME
+    assert response.content == b""
+
+
+def test_image_is_read_from_field_storage(
+        client, published_image, monkeypatch, tmp_path_factory
+):
+    from django.core.files.storage import FileSystemStorage
+
+    location = tmp_path_factory.mktemp("images")
+    (location / "post_images").mkdir()
+    (location / IMAGE_NAME).write_bytes(IMAGE_DATA[::-1])
+    monkeypatch.setattr(
+        Post._meta.get_field("image"),
+        "storage",
+        FileSystemStorage(location=str(location)),
+    )
+    response = client.get(IMAGE_URL)
+    assert response.status_code == 200
+    assert b"".join(response.streaming_content) == IMAGE_DATA[::-1]
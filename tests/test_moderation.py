@@ -0,0 +1,124 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.test import override_settings
+from django.test.client import Client
+
+from blog import moderation
+from blog.models import Comment, Post
+from blog.signals import posts_bulk_changed
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def admin_client(mixer):
+    admin = mixer.blend(
+        "auth.User", is_staff=True, is_superuser=True, is_active=True
+    )
+    client = Client()
+    client.force_login(admin)
+    return client
+
+
+def test_update_posts_single_statement_per_batch(
+        mixer, user, published_category
+):
+    mixer.cycle(5).blend("blog.Post", author=user, category=published_category)
+    received = []
+
+    def receiver(sender, post_ids, **kwargs):
+        received.append(post_ids)
+
+    posts_bulk_changed.connect(receiver)
+    try:
+        with CaptureQueriesContext(connection) as ctx:
+            updated = moderation.update_posts(
+                Post.objects.all(), is_published=False
+            )
+    finally:
+        posts_bulk_changed.disconnect(receiver)
+    assert updated == 5
+    updates = [q for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]
+    assert len(updates) == 1, "Пачка постов должна обновляться одним UPDATE."
+    assert not Post.objects.filter(is_published=True).exists()
+    assert sorted(sum(received, [])) == sorted(
+        Post.objects.values_list("pk", flat=True)
+    ), "Сигнал posts_bulk_changed должен получить все обновлённые посты."
+
+
+@override_settings(BLOG_BATCH_SIZE=2)
+def test_delete_posts_by_authors_in_batches(
+        mixer, user, another_user, published_category
+):
+    posts = mixer.cycle(5).blend(
+        "blog.Post", author=user, category=published_category
+    )
+    other_post = mixer.blend(
+        "blog.Post", author=another_user, category=published_category
+    )
+    mixer.cycle(3).blend("blog.Comment", post=posts[0], author=another_user)
+    mixer.blend("blog.Comment", post=other_post, author=user)
+
+    assert moderation.delete_posts_by_authors([user.pk]) == 5
+    assert list(Post.objects.all()) == [other_post]
+    assert Comment.objects.count() == 1
+
+
+def test_admin_publish_and_move_actions(
+        admin_client, mixer, user, published_category, another_category
+):
+    posts = mixer.cycle(3).blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=False,
+    )
+    ids = [post.pk for post in posts]
+    admin_client.post(
+        "/admin/blog/post/",
+        {"action": "publish", "_selected_action": ids},
+    )
+    assert Post.objects.filter(pk__in=ids, is_published=True).count() == 3
+
+    admin_client.post(
+        "/admin/blog/post/",
+        {
+            "action": "move_to_category",
+            "_selected_action": ids[:2],
+            "category": another_category.pk,
+        },
+    )
+    assert Post.objects.filter(category=another_category).count() == 2
+
+
+def unpublish_in_admin(admin_client, posts):
+    return admin_client.post(
+        "/admin/blog/post/",
+        {"action": "unpublish", "_selected_action": [p.pk for p in posts]},
+        follow=True,
+    ).content.decode()
+
+
+@override_settings(BLOG_BULK_SYNC_LIMIT=1, BLOG_TASKS_EAGER=False)
+def test_large_selection_runs_as_background_task(
+        admin_client, mixer, user, published_category
+):
+    posts = mixer.cycle(3).blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True,
+    )
+    content = unpublish_in_admin(admin_client, posts)
+    assert "поставлена в очередь" in content
+    assert "Обработано записей" not in content
+
+
+@override_settings(BLOG_BULK_SYNC_LIMIT=1, BLOG_TASKS_EAGER=True)
+def test_eager_background_task_reports_count(
+        admin_client, mixer, user, published_category
+):
+    posts = mixer.cycle(3).blend(
+        "blog.Post", author=user, category=published_category
+    )
+    content = unpublish_in_admin(admin_client, posts)
+    assert "в фоне" not in content
+    assert "Обработано записей: 3." in content
+    assert not Post.objects.filter(is_published=True).exists()
@@ -0,0 +1,105 @@
+import threading
+from http import HTTPStatus
+
+import pytest
+from django.test import override_settings
+
+from blog.models import Comment
+from blog.ratelimit import CacheStore, TokenBucket, parse_rate
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_token_bucket_refills_over_time():
+    capacity, refill_rate = parse_rate("2/m")
+    bucket = TokenBucket(capacity, refill_rate, updated=0)
+    assert bucket.consume(0) == 0
+    assert bucket.consume(0) == 0
+    assert bucket.consume(0) == pytest.approx(30)
+    assert bucket.consume(30) == 0
+
+
+@override_settings(BLOG_RATE_LIMITS={"comment_create": "2/h"})
+def test_comment_creation_is_rate_limited(
+        user_client, post_with_published_location
+):
+    url = f"/posts/{post_with_published_location.id}/comment/"
+    for _ in range(2):
+        response = user_client.post(url, {"text": "Комментарий"})
+        assert response.status_code == HTTPStatus.FOUND
+    response = user_client.post(url, {"text": "Комментарий"})
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS, (
+        "Убедитесь, что при превышении лимита возвращается статус 429."
+    )
+    assert int(response["Retry-After"]) > 0
+    assert Comment.objects.count() == 2
+
+
+@override_settings(BLOG_RATE_LIMITS={"post_create": "1/h"})
+def test_personal_rate_limit_overrides_scope(user, user_client):
+    with override_settings(
+        BLOG_RATE_LIMIT_USERS={user.username: {"post_create": None}}
+    ):
+        for _ in range(3):
+            response = user_client.post("/posts/create/", {})
+            assert response.status_code == HTTPStatus.OK
+
+
+@override_settings(
+    BLOG_RATE_LIMIT_STORE="blog.ratelimit.CacheStore",
+    BLOG_RATE_LIMITS={"comment_create": "2/h"},
+)
+def test_cache_store_limits_and_clears_only_own_keys(
+        user_client, post_with_published_location
+):
+    from django.core.cache import cache
+
+    from blog.ratelimit import get_store
+
+    cache.set("unrelated", "value")
+    url = f"/posts/{post_with_published_location.id}/comment/"
+    statuses = [
+        user_client.post(url, {"text": "Комментарий"}).status_code
+        for _ in range(3)
+    ]
+    assert statuses == [
+        HTTPStatus.FOUND, HTTPStatus.FOUND, HTTPStatus.TOO_MANY_REQUESTS
+    ]
+    get_store().clear()
+    assert cache.get("unrelated") == "value"
+    response = user_client.post(url, {"text": "Комментарий"})
+    assert response.status_code == HTTPStatus.FOUND
+
+
+def test_cache_store_refills_like_token_bucket(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("blog.ratelimit.time.time", lambda: now[0])
+    store = CacheStore()
+    store.clear()
+    capacity, refill_rate = parse_rate("2/m")
+    assert store.consume("key", capacity, refill_rate) == 0
+    assert store.consume("key", capacity, refill_rate) == 0
+    assert store.consume("key", capacity, refill_rate) == pytest.approx(30)
+    # Токен появляется через полпериода, а не в начале следующего окна
+    now[0] += 30
+    assert store.consume("key", capacity, refill_rate) == 0
+    assert store.consume("key", capacity, refill_rate) > 0
+
+
+def test_cache_store_does_not_spend_token_twice():
+    store = CacheStore()
+    store.clear()
+    capacity, refill_rate = parse_rate("10/d")
+    results = []
+    barrier = threading.Barrier(20)
+
+    def consume():
+        barrier.wait()
+        results.append(store.consume("key", capacity, refill_rate))
+
+    threads = [threading.Thread(target=consume) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count(0) == capacity
@@ -0,0 +1,127 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from blog import reactions
+from blog.models import Comment, CommentLike, Post, PostLike
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture(autouse=True)
+def flush_settings(settings):
+    settings.BLOG_LIKE_FLUSH_THRESHOLD = 3
+    settings.BLOG_LIKE_FLUSH_INTERVAL = 3600
+
+
+@pytest.fixture
+def posts(mixer, user, published_category):
+    return mixer.cycle(10).blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True, pub_date=timezone.now(),
+    )
+
+
+def like_count(post):
+    return Post.objects.values_list("like_count", flat=True).get(pk=post.pk)
+
+
+def test_likes_are_unique_and_counted_in_batches(
+        user_client, another_user_client, posts
+):
+    post = posts[0]
+    url = f"/posts/{post.id}/like/"
+    assert user_client.post(url).status_code == 302
+    user_client.post(url)  # Повторная отметка не учитывается
+    another_user_client.post(url)
+    assert PostLike.objects.filter(post=post).count() == 2
+    assert like_count(post) == 0
+    another_user_client.post(f"/posts/{post.id}/unlike/")
+    assert like_count(post) == 1
+
+
+def test_recount_is_one_update_per_batch(user, another_user, posts):
+    for post in posts[:3]:
+        PostLike.objects.create(user=user, post=post)
+    PostLike.objects.create(user=another_user, post=posts[0])
+    with CaptureQueriesContext(connection) as ctx:
+        reactions.write_like_counts(
+            {("post", post.pk): 1 for post in posts[:4]}
+        )
+    assert len(ctx.captured_queries) == 1
+    assert [like_count(post) for post in posts[:4]] == [2, 1, 1, 0]
+
+
+def test_feed_page_liked_lookup_is_one_query(
+        user, user_client, posts, django_assert_num_queries
+):
+    for post in posts[:2]:
+        reactions.set_like(user, "post", post.pk)
+    reactions.get_cache().clear()
+    post_ids = [post.pk for post in posts]
+    with django_assert_num_queries(1):
+        liked = reactions.liked_ids(user, "post", post_ids)
+    assert liked == {posts[0].pk, posts[1].pk}
+    with django_assert_num_queries(0):
+        assert reactions.liked_ids(user, "post", post_ids) == liked
+
+    response = user_client.get("/")
+    assert response.status_code == 200
+    assert {
+        post.pk for post in response.context["page_obj"] if post.is_liked
+    } == liked
+
+
+def test_comment_like_and_saving_keeps_count(
+        user, user_client, mixer, posts
+):
+    comment = mixer.blend("blog.Comment", post=posts[0], author=user)
+    response = user_client.post(
+        f"/posts/{posts[0].id}/like_comment/{comment.id}/",
+        {"next": "https://example.com/"},
+    )
+    assert response.status_code == 302
+    assert response.url == f"/posts/{posts[0].id}/"
+    assert CommentLike.objects.filter(comment=comment).exists()
+    reactions.flush_likes()
+    comment = Comment.objects.get(pk=comment.pk)
+    assert comment.like_count == 1
+    comment.text = "Новый текст"
+    comment.save()
+    assert Comment.objects.get(pk=comment.pk).like_count == 1
+
+    response = user_client.get(f"/posts/{posts[0].id}/")
+    assert [c.is_liked for c in response.context["comments"]] == [True]
+
+
+def test_like_hidden_post_is_not_found(another_user_client, posts):
+    post = posts[0]
+    Post.objects.filter(pk=post.pk).update(is_published=False)
+    response = another_user_client.post(f"/posts/{post.id}/like/")
+    assert response.status_code == 404
+    assert not PostLike.objects.exists()
+
+
+def test_single_like_is_counted_by_timer(
+        monkeypatch, another_user_client, posts
+):
+    timers = []
+
+    class FakeTimer:
+        def __init__(self, interval, function):
+            self.interval, self.function = interval, function
+
+        def start(self):
+            timers.append(self)
+
+        def cancel(self):
+            pass
+
+    monkeypatch.setattr("blog.counters.threading.Timer", FakeTimer)
+    another_user_client.post(f"/posts/{posts[0].id}/like/")
+    assert like_count(posts[0]) == 0
+    # Новых отметок нет: счетчик пересчитывается по таймеру
+    assert [timer.interval for timer in timers] == [3600]
+    timers[0].function()
+    assert like_count(posts[0]) == 1
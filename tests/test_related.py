@@ -0,0 +1,115 @@
+import pytest
+from django.utils import timezone
+
+from blog import related
+from blog.models import RelatedPost
+
+pytestmark = [pytest.mark.django_db]
+
+TEXTS = (
+    ("Python и Django", "django python orm queryset миграции"),
+    ("Django ORM", "django orm queryset индексы python"),
+    ("Суп", "рецепт суп овощи кастрюля ужин"),
+)
+
+
+@pytest.fixture(autouse=True)
+def related_root(settings, tmp_path):
+    settings.BLOG_RELATED_ROOT = tmp_path
+
+
+@pytest.fixture
+def posts(mixer, user, published_category):
+    return [
+        mixer.blend(
+            "blog.Post", author=user, category=published_category,
+            is_published=True, pub_date=timezone.now(),
+            title=title, text=text,
+        )
+        for title, text in TEXTS
+    ]
+
+
+def related_ids(post):
+    return list(
+        RelatedPost.objects.filter(post=post).values_list(
+            "related_id", flat=True
+        )
+    )
+
+
+def test_detail_shows_stored_related_posts(client, mixer, posts):
+    RelatedPost.objects.create(
+        post=posts[0], related=posts[2], score=0.9, rank=0
+    )
+    RelatedPost.objects.create(
+        post=posts[0], related=posts[1], score=0.5, rank=1
+    )
+    posts[2].is_published = False
+    posts[2].save()
+    response = client.get(f"/posts/{posts[0].id}/")
+    assert [post.id for post in response.context["related_posts"]] == [
+        posts[1].id
+    ]
+    assert posts[1].title in response.content.decode()
+
+
+def test_rebuild_ranks_similar_text_first(posts):
+    pytest.importorskip("scipy")
+    assert related.rebuild_related_posts(block_size=2) == 3
+    assert related_ids(posts[0])[0] == posts[1].id
+    assert related_ids(posts[1])[0] == posts[0].id
+    assert posts[2].id not in related_ids(posts[0])[:1]
+
+
+def test_new_post_is_added_incrementally(mixer, user, published_category,
+                                         posts):
+    pytest.importorskip("scipy")
+    related.rebuild_related_posts()
+    new_post = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True, pub_date=timezone.now(),
+        title="Ужин", text="суп на ужин рецепт",
+    )
+    assert related_ids(new_post)[0] == posts[2].id
+    assert related_ids(posts[2])[0] == new_post.id
+
+
+def test_without_index_saving_is_noop(posts):
+    posts[0].title = "Новый заголовок"
+    posts[0].save()
+    assert not RelatedPost.objects.exists()
+
+
+def test_index_lock_blocks_other_processes(tmp_path):
+    fcntl = pytest.importorskip("fcntl")
+    with related.index_lock():
+        with open(tmp_path / "index.lock", "a") as lock_file:
+            with pytest.raises(BlockingIOError):
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    with open(tmp_path / "index.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+def test_publishing_draft_adds_it_to_related_lists(
+        mixer, user, published_category, posts
+):
+    pytest.importorskip("scipy")
+    draft = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=False, pub_date=timezone.now(),
+        title="Ужин", text="суп на ужин рецепт",
+    )
+    related.rebuild_related_posts()
+    assert draft.id not in related_ids(posts[2])
+
+    draft.is_published = True
+    draft.save()
+    assert related_ids(draft)[0] == posts[2].id
+    assert related_ids(posts[2])[0] == draft.id
+
+    draft.is_published = False
+    draft.save()
+    assert not related_ids(draft)
+    assert draft.id not in related_ids(posts[2])
+    assert draft.id not in related.load_index()["ids"]
@@ -0,0 +1,47 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from blog.models import Comment, RenderedCommentText, RenderedPostText
+from blog.rendering import RENDERER_VERSION
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_html_is_rendered_on_save(comment_to_a_post):
+    post = comment_to_a_post.post
+    post.text = "<b>жирный</b>\nвторая строка"
+    post.save()
+    rendered = RenderedPostText.objects.get(post=post)
+    assert rendered.html == "&lt;b&gt;жирный&lt;/b&gt;<br>вторая строка"
+    assert rendered.version == RENDERER_VERSION
+    assert RenderedCommentText.objects.filter(
+        comment_id=comment_to_a_post.id, version=RENDERER_VERSION
+    ).exists()
+
+
+def test_detail_page_outputs_stored_html(
+        client, comment_to_a_post, post_with_published_location
+):
+    RenderedPostText.objects.update(html="сохранённый <br>html")
+    RenderedCommentText.objects.update(html="комментарий <br>html")
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(f"/posts/{post_with_published_location.id}/")
+    content = response.content.decode()
+    assert "сохранённый <br>html" in content
+    assert "комментарий <br>html" in content
+    assert not any(
+        '"blog_comment"."text"' in q["sql"] for q in ctx.captured_queries
+    ), "Страница поста не должна загружать исходный текст комментариев."
+
+
+def test_rebuild_command_updates_stale_rows(comment_to_a_post):
+    Comment.objects.update(text="a\nb")
+    RenderedCommentText.objects.update(html="", version=0)
+    call_command("rebuild_rendered_text", stdout=StringIO())
+    rendered = RenderedCommentText.objects.get()
+    assert rendered.html == "a<br>b"
+    assert rendered.version == RENDERER_VERSION
@@ -0,0 +1,157 @@
+import os
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from blog.models import AuthorStats, Post, User
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture(autouse=True)
+def sitemap_root(settings, tmp_path):
+    settings.BLOG_SITEMAP_ROOT = tmp_path
+    settings.BLOG_SITEMAP_CHUNK_SIZE = 2
+    return tmp_path
+
+
+def read(response):
+    return b"".join(response.streaming_content).decode()
+
+
+@pytest.fixture
+def posts(mixer, user, published_category):
+    return mixer.cycle(5).blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True,
+    )
+
+
+def test_index_lists_chunks_of_each_section(client, posts, published_category):
+    content = read(client.get("/sitemap.xml"))
+    low, high = posts[0].pk // 2, posts[-1].pk // 2
+    for chunk in range(low, high + 1):
+        assert f"/sitemap-posts-{chunk}.xml" in content
+    assert f"/sitemap-categories-{published_category.pk // 2}.xml" in content
+
+
+def test_chunk_lists_published_posts_only(
+        client, mixer, user, published_category, posts
+):
+    hidden = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=False,
+    )
+    chunks = {post.pk // 2 for post in posts + [hidden]}
+    content = "".join(
+        read(client.get(f"/sitemap-posts-{chunk}.xml")) for chunk in chunks
+    )
+    for post in posts:
+        assert f"/posts/{post.pk}/</loc>" in content
+    assert f"/posts/{hidden.pk}/</loc>" not in content
+
+    profile = read(client.get(f"/sitemap-profiles-{user.pk // 2}.xml"))
+    assert f"/profile/{user.username}/" in profile
+    assert client.get("/sitemap-unknown-0.xml").status_code == 404
+
+
+def test_only_changed_chunk_is_regenerated(client, posts, sitemap_root):
+    first, last = posts[0], posts[-1]
+    first_url = f"/sitemap-posts-{first.pk // 2}.xml"
+    last_url = f"/sitemap-posts-{last.pk // 2}.xml"
+    client.get(first_url)
+    response = client.get(last_url)
+    with CaptureQueriesContext(connection) as ctx:
+        cached = client.get(
+            last_url, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+    assert cached.status_code == 304
+    # Только проверка отложенных публикаций части
+    assert len(ctx.captured_queries) == 1
+
+    first.is_published = False
+    first.save()
+    chunk_dir = sitemap_root / "2"
+    assert not (chunk_dir / f"posts-{first.pk // 2}.xml").exists()
+    assert (chunk_dir / f"posts-{last.pk // 2}.xml").exists()
+    assert f"/posts/{first.pk}/<" not in read(client.get(first_url))
+
+
+def test_scheduled_post_appears_when_due(
+        client, mixer, user, published_category, sitemap_root
+):
+    post = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True, pub_date=timezone.now() + timedelta(hours=1),
+    )
+    url = f"/sitemap-posts-{post.pk // 2}.xml"
+    assert f"/posts/{post.pk}/<" not in read(client.get(url))
+    # Прошел час: файл записан до даты публикации, сигналов не было
+    path = sitemap_root / "2" / f"posts-{post.pk // 2}.xml"
+    written_at = (timezone.now() - timedelta(hours=1)).timestamp()
+    os.utime(path, (written_at, written_at))
+    Post.objects.filter(pk=post.pk).update(
+        pub_date=timezone.now() - timedelta(minutes=1)
+    )
+    assert f"/posts/{post.pk}/<" in read(client.get(url))
+
+
+def test_scheduled_post_adds_profile_when_due(
+        client, mixer, user, published_category, sitemap_root
+):
+    post = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True, pub_date=timezone.now() + timedelta(hours=1),
+    )
+    url = f"/sitemap-profiles-{user.pk // 2}.xml"
+    assert f"/profile/{user.username}/" not in read(client.get(url))
+    # Прошел час: дата отложенного поста наступила, сигналов не было
+    path = sitemap_root / "2" / f"profiles-{user.pk // 2}.xml"
+    written_at = (timezone.now() - timedelta(hours=1)).timestamp()
+    os.utime(path, (written_at, written_at))
+    due = timezone.now() - timedelta(minutes=1)
+    Post.objects.filter(pk=post.pk).update(pub_date=due)
+    AuthorStats.objects.filter(user=user).update(next_post_at=due)
+    assert f"/profile/{user.username}/" in read(client.get(url))
+    assert AuthorStats.objects.get(user=user).post_count == 1
+
+
+def test_chunks_outside_id_range_are_not_written(
+        client, settings, posts, sitemap_root
+):
+    settings.BLOG_SITEMAP_BASE_URL = "https://blog.example.com/"
+    chunk = posts[0].pk // 2
+    content = read(client.get(f"/sitemap-posts-{chunk}.xml"))
+    assert f"<loc>https://blog.example.com/posts/{posts[0].pk}/</loc>" in content
+    assert "<loc>https://blog.example.com/sitemap-posts-" in read(
+        client.get("/sitemap.xml")
+    )
+    assert client.get("/sitemap-posts-999999.xml").status_code == 404
+    assert not (sitemap_root / "2" / "posts-999999.xml").exists()
+
+
+def test_login_keeps_profile_chunk(
+        client, mixer, user, published_category, sitemap_root
+):
+    mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True, pub_date=timezone.now(),
+    )
+    user.set_password("secret-password")
+    user.save()
+    client.get(f"/sitemap-profiles-{user.pk // 2}.xml")
+    path = sitemap_root / "2" / f"profiles-{user.pk // 2}.xml"
+    assert path.exists()
+    assert client.login(username=user.username, password="secret-password")
+    assert path.exists()
+
+    user = User.objects.get(pk=user.pk)
+    user.username = "renamed"
+    user.save()
+    assert not path.exists()
+    assert "/profile/renamed/" in read(
+        client.get(f"/sitemap-profiles-{user.pk // 2}.xml")
+    )
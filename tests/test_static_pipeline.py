@@ -0,0 +1,83 @@
+import gzip
+from io import StringIO
+
+import pytest
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import override_settings
+from django.test.client import Client
+
+from blogicum import settings_production
+from core.middleware import choose_variant
+
+
+@pytest.fixture
+def collected_static(tmp_path):
+    with override_settings(
+        STATIC_ROOT=str(tmp_path),
+        STATICFILES_STORAGE=settings_production.STATICFILES_STORAGE,
+        MIDDLEWARE=settings_production.MIDDLEWARE,
+    ):
+        staticfiles_storage._setup()
+        call_command("collectstatic", interactive=False, stdout=StringIO())
+        yield tmp_path
+    staticfiles_storage._setup()
+
+
+def test_collectstatic_creates_hashed_compressed_files(collected_static):
+    hashed_css = staticfiles_storage.stored_name("css/bootstrap.min.css")
+    assert hashed_css != "css/bootstrap.min.css"
+    assert (collected_static / (hashed_css + ".gz")).exists()
+
+
+@pytest.mark.django_db
+def test_middleware_serves_compressed_immutable_file(collected_static):
+    client = Client()
+    url = staticfiles_storage.url("css/bootstrap.min.css")
+    response = client.get(url, HTTP_ACCEPT_ENCODING="gzip, deflate")
+    assert response.status_code == 200
+    assert response["Content-Encoding"] == "gzip"
+    assert "immutable" in response["Cache-Control"]
+    assert "Accept-Encoding" in response["Vary"]
+    body = gzip.decompress(b"".join(response.streaming_content))
+    assert body.startswith(b'@charset "UTF-8"')
+
+    response = client.get(
+        url,
+        HTTP_ACCEPT_ENCODING="gzip, deflate",
+        HTTP_IF_NONE_MATCH=response["ETag"],
+    )
+    assert response.status_code == 304
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip;q=0, deflate", None),
+        ("br;q=0, gzip;q=0", None),
+        ("GZIP; q=0.5", "gzip"),
+        ("*;q=0.1", "gzip"),
+        ("*, gzip;q=0", None),
+    ],
+)
+def test_middleware_respects_accept_encoding_weights(
+        collected_static, accept_encoding, expected
+):
+    url = staticfiles_storage.url("css/bootstrap.min.css")
+    response = Client().get(url, HTTP_ACCEPT_ENCODING=accept_encoding)
+    assert response.status_code == 200
+    assert response.get("Content-Encoding") == expected
+
+
+def test_choose_variant_prefers_highest_weight():
+    variants = [("br", "a.br", None), ("gzip", "a.gz", None)]
+    assert choose_variant(variants, "br;q=0.5, gzip")[0] == "gzip"
+    assert choose_variant(variants, "gzip, br")[0] == "br"
+    assert choose_variant(variants, "br;q=0, gzip;q=0") is None
+    assert choose_variant(variants, "") is None
+
+@pytest.mark.django_db
+def test_pages_link_local_bootstrap(client):
+    response = client.get("/")
+    assert "cdn.jsdelivr.net" not in response.content.decode()
@@ -0,0 +1,118 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from blog.models import Post
+from blog.moderation import update_posts
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def published_posts(mixer, user, published_category):
+    now = timezone.now()
+    return [
+        mixer.blend(
+            "blog.Post",
+            author=user,
+            category=published_category,
+            is_published=True,
+            pub_date=now - timedelta(minutes=n),
+        )
+        for n in range(1, 4)
+    ]
+
+
+@pytest.mark.parametrize(
+    "feed_format, content_type",
+    [("rss", "application/rss+xml"), ("atom", "application/atom+xml")],
+)
+def test_feed_lists_published_posts(
+        client, mixer, user, published_posts, feed_format, content_type
+):
+    hidden = mixer.blend(
+        "blog.Post", author=user, category=published_posts[0].category,
+        is_published=False, title="Скрытый пост",
+    )
+    response = client.get(f"/feeds/{feed_format}/")
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith(content_type)
+    content = response.content.decode()
+    for post in published_posts:
+        assert f"/posts/{post.id}/" in content
+    assert f"/posts/{hidden.id}/" not in content
+
+
+def test_category_and_profile_feeds(
+        client, mixer, user, another_user, published_category, published_posts
+):
+    other = mixer.blend(
+        "blog.Post", author=another_user, is_published=True,
+        category__is_published=True,
+    )
+    category_feed = client.get(
+        f"/feeds/rss/category/{published_category.slug}/"
+    ).content.decode()
+    profile_feed = client.get(
+        f"/feeds/atom/profile/{user.username}/"
+    ).content.decode()
+    for content in (category_feed, profile_feed):
+        assert f"/posts/{published_posts[0].id}/" in content
+        assert f"/posts/{other.id}/" not in content
+    assert client.get("/feeds/json/").status_code == 404
+    assert client.get("/feeds/rss/profile/nobody/").status_code == 404
+
+
+def test_cached_snapshot_and_conditional_get(client, published_posts):
+    response = client.get("/feeds/rss/")
+    with CaptureQueriesContext(connection) as ctx:
+        cached = client.get("/feeds/rss/")
+        not_modified = client.get(
+            "/feeds/rss/", HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+    assert len(ctx.captured_queries) == 0
+    assert cached.content == response.content
+    assert not_modified.status_code == 304
+    assert client.get("/feeds/atom/")["ETag"] != response["ETag"]
+
+
+def test_post_changes_reset_snapshot(
+        client, mixer, user, published_category, published_posts
+):
+    etag = client.get("/feeds/rss/")["ETag"]
+    post = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True,
+    )
+    response = client.get("/feeds/rss/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert f"/posts/{post.id}/" in response.content.decode()
+
+    post.is_published = False
+    post.save()
+    assert f"/posts/{post.id}/" not in client.get(
+        "/feeds/rss/"
+    ).content.decode()
+
+
+def test_category_changes_reset_related_snapshots(
+        client, user, published_category, another_category, published_posts
+):
+    post = published_posts[0]
+    category_url = f"/feeds/rss/category/{another_category.slug}/"
+    profile_url = f"/feeds/rss/profile/{user.username}/"
+    assert f"/posts/{post.id}/" not in client.get(category_url).content.decode()
+    assert f"/posts/{post.id}/" in client.get(profile_url).content.decode()
+
+    update_posts(Post.objects.filter(pk=post.pk),
+                 category_id=another_category.pk)
+    assert f"/posts/{post.id}/" in client.get(category_url).content.decode()
+
+    another_category.is_published = False
+    another_category.save()
+    assert f"/posts/{post.id}/" not in client.get(
+        profile_url
+    ).content.decode()
@@ -0,0 +1,121 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from blog.models import Post
+from blog.moderation import update_posts
+from blog.timeline import INDEX_FEED, category_feed, get_timeline
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def published_posts(mixer, user, published_category):
+    now = timezone.now()
+    return [
+        mixer.blend(
+            "blog.Post",
+            author=user,
+            category=published_category,
+            is_published=True,
+            pub_date=now - timedelta(hours=n),
+        )
+        for n in range(1, 16)
+    ]
+
+
+def page_ids(response):
+    return [post.id for post in response.context["page_obj"]]
+
+
+def test_cached_feed_costs_one_query(client, published_posts):
+    first = client.get("/")
+    with CaptureQueriesContext(connection) as ctx:
+        second = client.get("/")
+    assert page_ids(second) == page_ids(first)
+    assert page_ids(second) == [post.id for post in published_posts[:10]]
+    assert len(ctx.captured_queries) == 1
+
+
+def test_publish_and_unpublish_update_cached_feeds(
+        client, mixer, user, published_category, published_posts
+):
+    client.get("/")
+    category_url = f"/category/{published_category.slug}/"
+    client.get(category_url)
+
+    post = mixer.blend(
+        "blog.Post",
+        author=user,
+        category=published_category,
+        is_published=True,
+        pub_date=timezone.now() - timedelta(minutes=1),
+    )
+    for feed in (INDEX_FEED, category_feed(published_category.id)):
+        timeline = get_timeline(feed)
+        assert timeline["entries"][0][1] == post.id
+        assert timeline["count"] == len(published_posts) + 1
+    assert page_ids(client.get(category_url))[0] == post.id
+
+    post.is_published = False
+    post.save()
+    assert page_ids(client.get("/"))[0] == published_posts[0].id
+    assert get_timeline(INDEX_FEED)["count"] == len(published_posts)
+
+
+def test_scheduled_post_appears_after_pub_date(
+        client, mixer, user, published_category, published_posts, monkeypatch
+):
+    pub_date = timezone.now() + timedelta(hours=1)
+    post = mixer.blend(
+        "blog.Post",
+        author=user,
+        category=published_category,
+        is_published=True,
+        pub_date=pub_date,
+    )
+    assert post.id not in page_ids(client.get("/"))
+    assert get_timeline(INDEX_FEED)["valid_until"] == pub_date.timestamp()
+
+    later = pub_date + timedelta(minutes=1)
+    monkeypatch.setattr(timezone, "now", lambda: later)
+    assert page_ids(client.get("/"))[0] == post.id
+
+
+def test_pages_beyond_cache_are_read_from_database(
+        client, settings, published_posts
+):
+    settings.BLOG_TIMELINE_PAGES = 1
+    response = client.get("/?page=2")
+    assert page_ids(response) == [post.id for post in published_posts[10:]]
+
+
+def test_bulk_changes_invalidate_feeds(client, published_posts):
+    client.get("/")
+    update_posts(
+        Post.objects.filter(pk=published_posts[0].pk), is_published=False
+    )
+    assert published_posts[0].id not in page_ids(client.get("/"))
+
+
+def test_admin_move_invalidates_destination_category(
+        admin_client, client, published_posts, another_category
+):
+    feed = category_feed(another_category.pk)
+    assert get_timeline(feed)["count"] == 0
+    ids = [post.pk for post in published_posts[:3]]
+    response = admin_client.post(
+        "/admin/blog/post/",
+        {
+            "action": "move_to_category",
+            "_selected_action": ids,
+            "category": another_category.pk,
+        },
+    )
+    assert response.status_code == 302
+    assert get_timeline(feed)["count"] == 3
+    response = client.get(f"/category/{another_category.slug}/")
+    assert sorted(page_ids(response)) == sorted(ids)
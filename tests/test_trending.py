@@ -0,0 +1,112 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from blog import counters, trending
+from blog.models import Comment
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def posts(mixer, user, published_category):
+    return mixer.cycle(3).blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True, pub_date=timezone.now() - timedelta(days=1),
+    )
+
+
+def comment(mixer, post, author):
+    return mixer.blend(
+        "blog.Comment", post=post, author=author, is_published=True
+    )
+
+
+def page_ids(response):
+    return [post.id for post in response.context["page_obj"]]
+
+
+def test_feed_ranks_by_recent_comments(client, mixer, user, posts):
+    comment(mixer, posts[1], user)
+    comment(mixer, posts[1], user)
+    comment(mixer, posts[2], user)
+    response = client.get("/trending/")
+    assert response.status_code == 200
+    assert page_ids(response) == [posts[1].id, posts[2].id]
+
+
+def test_new_comments_update_cached_ranking(
+        client, mixer, user, posts, monkeypatch
+):
+    comment(mixer, posts[1], user)
+    client.get("/trending/")
+
+    def fail():
+        raise AssertionError("Рейтинг не должен собираться из БД")
+
+    monkeypatch.setattr(trending, "build_scores", fail)
+    comment(mixer, posts[0], user)
+    comment(mixer, posts[0], user)
+    assert page_ids(client.get("/trending/")) == [posts[0].id, posts[1].id]
+
+
+def test_old_comments_decay(mixer, user, posts, settings):
+    settings.BLOG_TRENDING_HALF_LIFE = 3600
+    for _ in range(3):
+        comment(mixer, posts[0], user)
+    Comment.objects.filter(post=posts[0]).update(
+        created_at=timezone.now() - timedelta(hours=2)
+    )
+    comment(mixer, posts[1], user)
+    # 3 комментария два периода назад весят 3/4 свежего
+    assert trending.get_trending_ids() == [posts[1].id, posts[0].id]
+
+
+def test_deleted_comment_leaves_ranking(client, mixer, user, posts):
+    first = comment(mixer, posts[0], user)
+    comment(mixer, posts[1], user)
+    client.get("/trending/")
+    first.delete()
+    assert trending.get_trending_ids() == [posts[1].id]
+
+
+def test_deleted_comment_cancels_rebuilt_score(mixer, user, posts):
+    first = comment(mixer, posts[0], user)
+    comment(mixer, posts[1], user)
+    # Начало часа: при сборке комментарий учитывается в середине часа
+    Comment.objects.filter(pk=first.pk).update(
+        created_at=(timezone.now() - timedelta(hours=1)).replace(minute=5)
+    )
+    trending.invalidate()
+    trending.get_trending_ids()
+    Comment.objects.get(pk=first.pk).delete()
+    assert trending.get_trending_ids() == [posts[1].id]
+
+
+def test_flushed_views_raise_score(mixer, user, posts):
+    comment(mixer, posts[0], user)
+    trending.get_trending_ids()
+    counters.write_view_counts({posts[1].pk: 20})
+    assert trending.get_trending_ids() == [posts[1].id, posts[0].id]
+
+
+def test_hidden_posts_are_not_shown(client, mixer, user, posts):
+    comment(mixer, posts[0], user)
+    comment(mixer, posts[1], user)
+    posts[0].is_published = False
+    posts[0].save()
+    assert page_ids(client.get("/trending/")) == [posts[1].id]
+
+
+def test_comment_save_updates_ranking_in_background(
+        mixer, user, posts, settings, django_capture_on_commit_callbacks
+):
+    comment(mixer, posts[1], user)
+    trending.get_trending_ids()
+    settings.BLOG_TASKS_EAGER = False
+    with django_capture_on_commit_callbacks() as callbacks:
+        comment(mixer, posts[0], user)
+    # В запросе рейтинг не перезаписывается: это делает фоновая задача
+    assert trending.get_trending_ids() == [posts[1].id]
+    assert len(callbacks) == 1
@@ -0,0 +1,106 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from blog import counters
+from blog.models import Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture(autouse=True)
+def flush_settings(settings):
+    settings.BLOG_VIEW_FLUSH_THRESHOLD = 3
+    settings.BLOG_VIEW_FLUSH_INTERVAL = 3600
+
+
+@pytest.fixture
+def posts(mixer, user, published_category):
+    return mixer.cycle(3).blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True,
+    )
+
+
+def view_count(post):
+    return Post.objects.values_list("view_count", flat=True).get(pk=post.pk)
+
+
+def test_views_are_flushed_by_threshold(
+        client, user_client, another_user_client, posts
+):
+    post = posts[0]
+    url = f"/posts/{post.id}/"
+    client.get(url)
+    another_user_client.get(url)
+    user_client.get(url)  # Просмотр автора не учитывается
+    assert view_count(post) == 0
+    client.get(url)
+    assert view_count(post) == 3
+
+
+def test_flush_is_one_case_update(posts):
+    for post, views in zip(posts, (1, 2, 3)):
+        counters._buffer.restore({post.pk: views})
+    with CaptureQueriesContext(connection) as ctx:
+        counters.flush_views()
+    assert len(ctx.captured_queries) == 1
+    assert "CASE" in ctx.captured_queries[0]["sql"]
+    assert [view_count(post) for post in posts] == [1, 2, 3]
+
+
+def test_saving_post_keeps_flushed_views(posts):
+    post = Post.objects.get(pk=posts[0].pk)
+    counters.write_view_counts({post.pk: 5})
+    post.title = "Новый заголовок"
+    post.save()
+    assert view_count(post) == 5
+
+
+def test_popular_feed_orders_by_views(client, posts):
+    counters.write_view_counts({posts[1].pk: 10, posts[2].pk: 5})
+    response = client.get("/popular/")
+    assert response.status_code == 200
+    assert [post.pk for post in response.context["page_obj"]] == [
+        posts[1].pk, posts[2].pk, posts[0].pk
+    ]
+
+
+class FakeTimer:
+    """Таймер, который срабатывает только по вызову fire() из теста."""
+
+    started = []
+
+    def __init__(self, interval, function):
+        self.interval = interval
+        self.function = function
+        self.daemon = False
+
+    def start(self):
+        self.started.append(self)
+
+    def cancel(self):
+        pass
+
+    def fire(self):
+        self.function()
+
+
+@pytest.fixture
+def fake_timer(monkeypatch):
+    FakeTimer.started = []
+    monkeypatch.setattr(counters.threading, "Timer", FakeTimer)
+    return FakeTimer
+
+
+def test_quiet_views_are_flushed_by_timer(client, posts, fake_timer):
+    post = posts[0]
+    client.get(f"/posts/{post.id}/")
+    client.get(f"/posts/{post.id}/")
+    assert view_count(post) == 0
+    # Таймер заведен один раз на интервал, новых просмотров нет
+    assert [timer.interval for timer in fake_timer.started] == [3600]
+    fake_timer.started[0].fire()
+    assert view_count(post) == 2
+    client.get(f"/posts/{post.id}/")
+    assert len(fake_timer.started) == 2